@@ -0,0 +1,60 @@
+"""
+Compares calldata encoding of hot ERC20 methods through web3 contract functions and precompiled encoders.
+
+Usage:
+   python benchmarks/erc20_encoding.py [--number 1000]
+"""
+import timeit
+import argparse
+import warnings
+
+warnings.simplefilter('ignore', DeprecationWarning)
+
+from web3 import Web3
+from evm_wallet._base_wallet import _BaseWallet
+from evm_wallet.erc20 import encode_transfer, encode_approve, encode_balance_of, encode_allowance
+
+TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+ACCOUNT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+AMOUNT = 10 ** 18
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=1_000)
+    args = parser.parse_args()
+
+    provider = Web3()
+    abi = _BaseWallet._get_erc20_abi()
+    # The contract is built outside of the timed calls, so only encoding is measured
+    functions = provider.eth.contract(address=TOKEN, abi=abi).functions
+
+    cases = {
+        'transfer': (
+            lambda: functions.transfer(ACCOUNT, AMOUNT)._encode_transaction_data(),
+            lambda: encode_transfer(ACCOUNT, AMOUNT)
+        ),
+        'approve': (
+            lambda: functions.approve(ACCOUNT, AMOUNT)._encode_transaction_data(),
+            lambda: encode_approve(ACCOUNT, AMOUNT)
+        ),
+        'balanceOf': (
+            lambda: functions.balanceOf(ACCOUNT)._encode_transaction_data(),
+            lambda: encode_balance_of(ACCOUNT)
+        ),
+        'allowance': (
+            lambda: functions.allowance(ACCOUNT, TOKEN)._encode_transaction_data(),
+            lambda: encode_allowance(ACCOUNT, TOKEN)
+        ),
+    }
+
+    print(f'{"method":<12} {"web3, us":>10} {"precompiled, us":>16} {"speedup":>9}')
+    for name, (web3_encode, precompiled_encode) in cases.items():
+        assert web3_encode() == precompiled_encode()
+        web3_time = timeit.timeit(web3_encode, number=args.number) / args.number * 1e6
+        precompiled_time = timeit.timeit(precompiled_encode, number=args.number) / args.number * 1e6
+        print(f'{name:<12} {web3_time:>10.1f} {precompiled_time:>16.2f} {web3_time / precompiled_time:>8.0f}x')
+
+
+if __name__ == '__main__':
+    main()
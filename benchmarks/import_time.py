@@ -0,0 +1,52 @@
+"""
+Measures import time of the package entry points in fresh interpreters.
+
+Usage:
+   python benchmarks/import_time.py [--runs 5]
+"""
+import sys
+import argparse
+import statistics
+import subprocess
+
+TARGETS = {
+    'web3': 'import web3, eth_account',
+    'package': 'import evm_wallet',
+    'types': 'from evm_wallet import ERC20Token, NetworkInfo',
+    'Wallet': 'from evm_wallet import Wallet',
+    'AsyncWallet': 'from evm_wallet import AsyncWallet',
+}
+
+_SCRIPT = '''
+import time
+started = time.perf_counter()
+{statement}
+print(time.perf_counter() - started)
+'''
+
+
+def measure(statement: str, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-W', 'ignore', '-c', _SCRIPT.format(statement=statement)],
+            text=True
+        )
+        timings.append(float(output))
+
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"target":<12} {"median, ms":>12} {"min, ms":>10}')
+    for name, statement in TARGETS.items():
+        timings = measure(statement, args.runs)
+        print(f'{name:<12} {statistics.median(timings) * 1000:>12.1f} {min(timings) * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -20,10 +20,80 @@ Usage example:
 :license: MIT, see LICENSE for more details.
 """
 import warnings
-from .wallet import Wallet
-from .async_wallet import AsyncWallet
-from .types import NetworkInfo, ERC20Token
-from ._base_wallet import ZERO_ADDRESS
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .wallet import Wallet
+    from .async_wallet import AsyncWallet
+    from .types import (NetworkInfo, ERC20Token, SimulationResult, TransferEvent, TransferCheckpoint,
+                        NetworkSnapshot, PortfolioSnapshot, BroadcastResult, EndpointStats)
+    from ._base_wallet import ZERO_ADDRESS
+    from .cache import ReadCache
+    from .replacement import ReplacementManager, PendingTransaction
+    from .journal import NonceJournal
+    from .offline import OfflineWallet, broadcast_raw_file
+    from .gas import GasEstimateCache
+    from .endpoints import rank_endpoints, probe_endpoints, select_endpoint
+    from .retry import RetryPolicy, CircuitOpenError
+    from .export import ColumnarWriter, export_balances, export_transfers
+    from .units import from_base_units, to_base_units, from_base_units_many, to_base_units_many
+    from .bulk import BulkSender, QueuedTransaction, StageStats, get_sender
+
+_exports = {
+    'Wallet': '.wallet',
+    'AsyncWallet': '.async_wallet',
+    'NetworkInfo': '.types',
+    'ERC20Token': '.types',
+    'SimulationResult': '.types',
+    'TransferEvent': '.types',
+    'TransferCheckpoint': '.types',
+    'NetworkSnapshot': '.types',
+    'PortfolioSnapshot': '.types',
+    'ZERO_ADDRESS': '._base_wallet',
+    'ReadCache': '.cache',
+    'ReplacementManager': '.replacement',
+    'PendingTransaction': '.replacement',
+    'BroadcastResult': '.types',
+    'NonceJournal': '.journal',
+    'OfflineWallet': '.offline',
+    'broadcast_raw_file': '.offline',
+    'GasEstimateCache': '.gas',
+    'EndpointStats': '.types',
+    'rank_endpoints': '.endpoints',
+    'probe_endpoints': '.endpoints',
+    'select_endpoint': '.endpoints',
+    'RetryPolicy': '.retry',
+    'CircuitOpenError': '.retry',
+    'ColumnarWriter': '.export',
+    'export_balances': '.export',
+    'export_transfers': '.export',
+    'from_base_units': '.units',
+    'to_base_units': '.units',
+    'from_base_units_many': '.units',
+    'to_base_units_many': '.units',
+    'BulkSender': '.bulk',
+    'QueuedTransaction': '.bulk',
+    'StageStats': '.bulk',
+    'get_sender': '.bulk',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name: str) -> Any:
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
 
 warnings.warn(
     "This package has been deprecated. You should migrate to `https://github.com/CrocoFactory/ether`, "
@@ -31,5 +101,3 @@ warnings.warn(
     DeprecationWarning,
     stacklevel=2
 )
-
-warnings.simplefilter('always', DeprecationWarning)
@@ -1,17 +1,33 @@
 import os
 import json
+import asyncio
+from decimal import Decimal
 from functools import lru_cache
-from typing import ClassVar, cast, Self, Optional
+from typing import ClassVar, Iterable, cast, Self, Optional, TYPE_CHECKING
 from eth_account import Account
+from eth_account.datastructures import SignedTransaction
 from eth_typing import ChecksumAddress, HexStr
 from abc import ABC, abstractmethod
 from hexbytes import HexBytes
-from web3 import AsyncWeb3, Web3
+from web3 import Web3
 from web3.contract.contract import ContractFunction, Contract
-from web3.contract.async_contract import AsyncContract, AsyncContractFunction
-from web3.types import ABI, Wei, TxParams
-from evm_wallet.types import Network, NetworkInfo, AnyAddress, TokenAmount, ERC20Token
+from web3.exceptions import ContractLogicError
+from web3.types import ABI, Wei, TxParams, RPCResponse
+from evm_wallet.types import Network, NetworkInfo, AnyAddress, TokenAmount, ERC20Token, SimulationResult
 from evm_wallet.utils import _in_literal, _is_network_info
+from evm_wallet._rpc import (make_provider, make_async_provider, batch_request, get_result, acquire_transport,
+                             release_transport, async_release_transport, discard_transport,
+                             is_duplicate_transaction_error)
+from evm_wallet.journal import NonceJournal, JournalEntry
+from evm_wallet.gas import GasEstimateCache
+from evm_wallet.retry import RetryPolicy, DEFAULT_RETRY_POLICY, is_transient_error
+from evm_wallet.endpoints import select_endpoint
+from evm_wallet.units import (AnyAmount, NATIVE_DECIMALS, from_base_units, to_base_units, from_base_units_many,
+                              to_base_units_many, _is_scalar_amount)
+
+if TYPE_CHECKING:
+    from web3 import AsyncWeb3
+    from web3.contract.async_contract import AsyncContract, AsyncContractFunction
 
 ZERO_ADDRESS = Web3.to_checksum_address("0x0000000000000000000000000000000000000000")
 
@@ -119,7 +135,7 @@ class _BaseWallet(ABC):
         'Linea': {
             'network': 'Linea',
             'chain_id': 59144,
-            'rpc': 'https://linea.drpc.org',
+            'rpc': 'https://rpc.linea.build',
             'token': 'ETH',
             'explorer': 'https://lineascan.build/'
         },
@@ -139,14 +155,14 @@ class _BaseWallet(ABC):
         },
         'opBNB': {
             'network': 'opBNB',
-            'chaind_id': 204,
+            'chain_id': 204,
             'rpc': 'https://opbnb-rpc.publicnode.com',
             'token': 'BNB',
             'explorer': 'https://opbnb.bscscan.com/'
         },
         'opBNB Testnet': {
             'network': 'opBNB Testnet',
-            'chaind_id': 5611,
+            'chain_id': 5611,
             'rpc': 'https://opbnb-testnet-rpc.publicnode.com',
             'token': 'BNB',
             'explorer': 'https://opbnb-testnet.bscscan.com'
@@ -160,7 +176,7 @@ class _BaseWallet(ABC):
         },
         'Optimism Sepolia': {
             'network': 'Optimism Sepolia',
-            'chaind_id': 11155420,
+            'chain_id': 11155420,
             'rpc': 'https://optimism-sepolia-rpc.publicnode.com',
             'token': 'ETH',
             'explorer': 'https://sepolia-optimism.etherscan.io/'
@@ -188,15 +204,15 @@ class _BaseWallet(ABC):
         },
         'Scroll': {
             'network': 'Scroll',
-            'chaind_id': 534352,
-            'rpc': 'https://scroll.drpc.org',
+            'chain_id': 534352,
+            'rpc': 'https://rpc.scroll.io',
             'token': 'ETH',
             'explorer': 'https://scrollscan.com'
         },
         'zkSync': {
             'network': 'zkSync',
             'chain_id': 324,
-            'rpc': 'https://zksync.drpc.org',
+            'rpc': 'https://mainnet.era.zksync.io',
             'token': 'ETH',
             'explorer': 'https://explorer.zksync.io'
         }
@@ -206,25 +222,42 @@ class _BaseWallet(ABC):
             self,
             private_key: str,
             network: Network | NetworkInfo,
-            is_async: bool = False
+            is_async: bool = False,
+            journal: Optional[NonceJournal] = None,
+            gas_cache: Optional[GasEstimateCache] = None,
+            retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY
     ):
         network_info = self.__validate_network(network)
         rpc = network_info['rpc']
-
-        temp_provider = Web3(Web3.HTTPProvider(rpc))
+        self._retry_policy = retry_policy
+        self._pending_releases: set[asyncio.Task] = set()
 
         if is_async:
-            self._provider = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc))
+            self._provider = self._make_provider(rpc, True)
+            temp_provider = self._make_provider(rpc)
         else:
+            temp_provider = self._make_provider(rpc)
             self._provider = temp_provider
 
-        self.__validate_chain_id(network_info, temp_provider)
-
+        self._on_provider_change()
         self.__is_async = is_async
-        self.__private_key = private_key
-        self.__account = Account.from_key(private_key)
-        self.__public_key = self._provider.to_checksum_address(self.__account.address)
-        self._nonce = temp_provider.eth.get_transaction_count(self.__public_key)
+        self._closed = False
+
+        try:
+            self.__validate_chain_id(network_info, temp_provider)
+
+            self.__private_key = private_key
+            self.__account = Account.from_key(private_key)
+            self.__public_key = self._provider.to_checksum_address(self.__account.address)
+            self._journal = journal
+            self._gas_cache = gas_cache
+            self._nonce = self._get_start_nonce(network_info['chain_id'], temp_provider)
+        except BaseException:
+            self._release_provider(self._provider)
+            raise
+        finally:
+            if is_async:
+                release_transport(temp_provider)
 
         self._network = network_info
 
@@ -240,7 +273,7 @@ class _BaseWallet(ABC):
         return cls(private_key, network)
 
     @property
-    def provider(self) -> AsyncWeb3 | Web3:
+    def provider(self) -> 'AsyncWeb3 | Web3':
         """
 
         :return:
@@ -269,15 +302,157 @@ class _BaseWallet(ABC):
         rpc = network_info['rpc']
         self._network = network_info
 
-        temp_provider = Web3(Web3.HTTPProvider(rpc))
-        self.__validate_chain_id(network_info, temp_provider)
+        old_provider = self._provider
+        temp_provider = self._make_provider(rpc)
+
+        try:
+            self.__validate_chain_id(network_info, temp_provider)
+        except BaseException:
+            release_transport(temp_provider)
+            raise
 
         if is_async:
-            self._provider = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc))
+            self._provider = self._make_provider(rpc, True)
         else:
             self._provider = temp_provider
 
-        self._nonce = temp_provider.eth.get_transaction_count(self.__public_key)
+        self._on_provider_change()
+        self._release_provider(old_provider)
+
+        try:
+            self._nonce = self._get_start_nonce(network_info['chain_id'], temp_provider)
+        finally:
+            if is_async:
+                release_transport(temp_provider)
+
+    def _make_provider(self, rpc: str, is_async: bool = False) -> 'AsyncWeb3 | Web3':
+        provider = make_async_provider(rpc) if is_async else make_provider(rpc)
+        if self._retry_policy is not None:
+            self._retry_policy.install(provider)
+
+        acquire_transport(provider)
+        return provider
+
+    def _release_provider(self, provider: 'AsyncWeb3 | Web3') -> None:
+        if not self.__is_async:
+            release_transport(provider)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            discard_transport(provider)
+        else:
+            # Referenced until done, so the release isn't garbage collected and aclose can wait for it
+            task = loop.create_task(async_release_transport(provider))
+            self._pending_releases.add(task)
+            task.add_done_callback(self._pending_releases.discard)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        """
+        Retry policy of the wallet's providers
+        :return: RetryPolicy instance or None, if requests are not retried
+        """
+        return self._retry_policy
+
+    def _on_provider_change(self) -> None:
+        pass
+
+    def _get_start_nonce(self, chain_id: int, provider: Web3) -> int:
+        public_key = self.__public_key
+        journal = self._journal
+
+        if journal is None:
+            return provider.eth.get_transaction_count(public_key)
+
+        confirmed, pending = (int(get_result(response), 16) for response in batch_request(provider, [
+            ('eth_getTransactionCount', [public_key, 'latest']),
+            ('eth_getTransactionCount', [public_key, 'pending'])
+        ]))
+
+        journal.confirm(chain_id, public_key, confirmed)
+
+        # Journaled transactions may have reached the node even if it doesn't report them as pending, so their nonces
+        # stay reserved until rebroadcast either delivers them or releases the rejected ones
+        last_nonce = journal.last_nonce(chain_id, public_key)
+        return pending if last_nonce is None else max(pending, last_nonce + 1)
+
+    def _record_transaction(self, tx_params: TxParams, signed_transaction: SignedTransaction) -> None:
+        if self._journal is not None:
+            self._journal.record(
+                self.network['chain_id'],
+                self.__public_key,
+                tx_params['nonce'],
+                signed_transaction.hash,
+                signed_transaction.rawTransaction
+            )
+
+    def _discard_rejected(self, tx_hash: HexBytes, error: Exception) -> None:
+        if self._journal is not None and not is_transient_error(error) and not is_duplicate_transaction_error(error):
+            self._journal.discard(self.network['chain_id'], self.__public_key, tx_hash)
+
+    def _release_unsent(self, entry: JournalEntry, error: Exception) -> None:
+        # The rejected transaction and everything after it can't be mined, so their nonces are reused. After transient
+        # errors the transaction may have reached the node and is kept
+        if not is_transient_error(error):
+            self._journal.discard_from(entry.chain_id, entry.address, entry.nonce)
+            self._nonce = min(self._nonce, entry.nonce)
+
+    def _get_journal(self) -> NonceJournal:
+        if self._journal is None:
+            raise ValueError('Wallet has no nonce journal. Provide NonceJournal instance on creation of the wallet')
+
+        return self._journal
+
+    @property
+    def gas_cache(self) -> Optional[GasEstimateCache]:
+        """
+        Cache of gas estimates per call shape, if provided
+        :return: GasEstimateCache instance or None
+        """
+        return self._gas_cache
+
+    def _get_cached_gas(self, tx_params: TxParams) -> Optional[Wei]:
+        if self._gas_cache is None:
+            return None
+
+        return self._gas_cache.get(self.network['chain_id'], tx_params)
+
+    def _cache_gas(self, tx_params: TxParams, gas: Wei) -> Wei:
+        if self._gas_cache is None:
+            return gas
+
+        return self._gas_cache.put(self.network['chain_id'], tx_params, gas)
+
+    def _merge_gas_estimates(
+            self,
+            tx_params_list: list[TxParams],
+            estimates: list[Optional[Wei]],
+            responses: list[RPCResponse]
+    ) -> list[Wei]:
+        missing = [index for index, gas in enumerate(estimates) if gas is None]
+        for index, response in zip(missing, responses):
+            try:
+                gas = Wei(int(get_result(response), 16))
+            except ValueError as e:
+                raise ValueError(f'Gas estimation of transaction {index} failed: {e}') from e
+
+            estimates[index] = self._cache_gas(tx_params_list[index], gas)
+
+        return estimates
+
+    @property
+    def journal(self) -> Optional[NonceJournal]:
+        """
+        Durable journal of nonces and signed transactions, if provided
+        :return: NonceJournal instance or None
+        """
+        return self._journal
 
     @property
     def private_key(self) -> str:
@@ -332,6 +507,10 @@ class _BaseWallet(ABC):
                 token.lower() == native_token or
                 token == ZERO_ADDRESS)
 
+    @classmethod
+    def _to_network_info(cls, network: Network | NetworkInfo) -> NetworkInfo:
+        return cls.__validate_network(network)
+
     @classmethod
     def __validate_network(
             cls,
@@ -340,6 +519,7 @@ class _BaseWallet(ABC):
         if _in_literal(network, Network):
             network = cast(Network, network)
             network_info = NetworkInfo(**cls.__network_map[network])
+            network_info['rpc'] = select_endpoint(network, network_info['rpc'])
         elif _is_network_info(network):
             network_info = cast(NetworkInfo, network)
         else:
@@ -368,7 +548,7 @@ class _BaseWallet(ABC):
             return json.load(file)
 
     @lru_cache(maxsize=6)
-    def _load_token_contract(self, address: AnyAddress) -> AsyncContract | Contract:
+    def _load_token_contract(self, address: AnyAddress) -> 'AsyncContract | Contract':
         if isinstance(address, bytes):
             address = address.hex()
 
@@ -391,28 +571,79 @@ class _BaseWallet(ABC):
         explorer_url = f'{self.network["explorer"]}/tx/{tx_hash}'
         return explorer_url
 
+    @staticmethod
+    def to_base_units(amount: AnyAmount | Iterable[AnyAmount], token: Optional[ERC20Token] = None) -> int | list[int]:
+        """
+        Converts decimal amount or many amounts of the token or network currency into base units exactly
+        :param amount: Decimal amount or iterable of amounts
+        :param token: ERC20Token instance or None for network currency
+        :return: Amount or list of amounts in base units
+        """
+        decimals = token.decimals if token else NATIVE_DECIMALS
+        if _is_scalar_amount(amount):
+            return to_base_units(amount, decimals)
+
+        return to_base_units_many(amount, decimals)
+
+    @staticmethod
+    def from_base_units(amount: int | Iterable[int], token: Optional[ERC20Token] = None) -> Decimal | list[Decimal]:
+        """
+        Converts amount or many amounts of the token or network currency in base units into exact decimal amounts
+        :param amount: Amount in base units or iterable of amounts
+        :param token: ERC20Token instance or None for network currency
+        :return: Decimal amount or list of amounts
+        """
+        decimals = token.decimals if token else NATIVE_DECIMALS
+        if _is_scalar_amount(amount):
+            return from_base_units(amount, decimals)
+
+        return from_base_units_many(amount, decimals)
+
+    @staticmethod
+    def _simulation_params(tx_params: TxParams, gas: Optional[int]) -> TxParams:
+        # Without gas given, tx_params hold a placeholder limit, which would make heavier calls fail as reverted
+        if gas:
+            return tx_params
+
+        return cast(TxParams, {field: value for field, value in tx_params.items() if field != 'gas'})
+
+    @staticmethod
+    def _raise_for_simulation(result: SimulationResult) -> None:
+        if not result.success:
+            data = result.output.hex() if result.output else None
+            raise ContractLogicError(f'execution reverted: {result.revert_reason}', data)
+
     @abstractmethod
     def get_token(self, address: AnyAddress) -> ERC20Token:
         pass
 
     @abstractmethod
-    def get_balance(self, from_wei: bool = False) -> float | Wei:
+    def get_balance(self, from_wei: bool = False) -> Decimal | Wei:
         pass
 
     @abstractmethod
     def estimate_gas(self, tx_params: TxParams, from_wei: bool = False) -> Wei:
         pass
 
+    @abstractmethod
+    def estimate_gas_many(self, tx_params_list: list[TxParams], use_cache: bool = True) -> list[Wei]:
+        pass
+
     @abstractmethod
     def build_and_transact(
             self,
-            closure: ContractFunction | AsyncContractFunction,
+            closure: 'ContractFunction | AsyncContractFunction',
             value: TokenAmount = 0,
             gas: Optional[int] = None,
-            gas_price: Optional[Wei] = None
+            gas_price: Optional[Wei] = None,
+            simulate: bool = False
     ) -> HexBytes:
         pass
 
+    @abstractmethod
+    def simulate_many(self, tx_params_list: list[TxParams]) -> list[SimulationResult]:
+        pass
+
     @abstractmethod
     def approve(
             self,
@@ -437,6 +668,10 @@ class _BaseWallet(ABC):
     def transact(self, tx_params: TxParams) -> HexBytes:
         pass
 
+    @abstractmethod
+    def rebroadcast(self) -> list[HexBytes]:
+        pass
+
     @abstractmethod
     def transfer(
             self,
@@ -449,5 +684,5 @@ class _BaseWallet(ABC):
         pass
 
     @abstractmethod
-    def get_balance_of(self, token: ERC20Token, convert: bool = False) -> float:
+    def get_balance_of(self, token: ERC20Token, convert: bool = False) -> int | Decimal:
         pass
@@ -0,0 +1,367 @@
+import json
+import weakref
+import asyncio
+import threading
+from typing import Any, Optional, TYPE_CHECKING
+from eth_abi import decode
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3
+from web3.providers.rpc import HTTPProvider
+from web3.providers.ipc import IPCProvider
+from web3.types import RPCEndpoint, RPCResponse, TxParams
+from web3._utils.caching import generate_cache_key
+from evm_wallet.types import SimulationResult
+
+if TYPE_CHECKING:
+    from evm_wallet.retry import RetryPolicy
+
+RPCCall = tuple[RPCEndpoint | str, list[Any]]
+
+# Async and WebSocket transports are imported by the functions using them, so the synchronous Wallet doesn't need them
+_HTTP_PREFIXES = ('http://', 'https://')
+_WEBSOCKET_PREFIXES = ('ws://', 'wss://')
+_CALL_FIELDS = ('from', 'to', 'gas', 'gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas', 'value', 'data')
+_ERROR_SELECTOR = '0x08c379a0'
+_PANIC_SELECTOR = '0x4e487b71'
+
+
+def is_persistent(provider: Web3 | AsyncWeb3) -> bool:
+    if not isinstance(provider, AsyncWeb3):
+        return False
+
+    from evm_wallet._websocket import _ReconnectingWebsocketProvider
+    return isinstance(provider.provider, _ReconnectingWebsocketProvider)
+
+
+def make_provider(rpc: str) -> Web3:
+    """
+    Creates Web3 instance for HTTP, WebSocket or IPC endpoint
+    :param rpc: URL of the endpoint or path to the IPC socket
+    :return: Web3 instance
+    """
+    if rpc.startswith(_HTTP_PREFIXES):
+        return Web3(HTTPProvider(rpc))
+    elif rpc.startswith(_WEBSOCKET_PREFIXES):
+        from web3.providers.websocket import WebsocketProvider
+        return Web3(WebsocketProvider(rpc))
+
+    return Web3(IPCProvider(rpc))
+
+
+def make_async_provider(rpc: str) -> AsyncWeb3:
+    """
+    Creates AsyncWeb3 instance for HTTP or WebSocket endpoint. WebSocket connection is persistent and shared by all
+    requests and subscriptions
+    :param rpc: URL of the endpoint
+    :return: AsyncWeb3 instance
+    """
+    if rpc.startswith(_HTTP_PREFIXES):
+        from web3.providers.async_rpc import AsyncHTTPProvider
+        return AsyncWeb3(AsyncHTTPProvider(rpc))
+    elif rpc.startswith(_WEBSOCKET_PREFIXES):
+        from evm_wallet._websocket import _ReconnectingWebsocketProvider
+        return AsyncWeb3.persistent_websocket(_ReconnectingWebsocketProvider(rpc))
+
+    raise ValueError(f'IPC endpoints are supported only by Wallet, use HTTP or WebSocket endpoint for AsyncWallet. '
+                     f'You provided value: {rpc}')
+
+
+_transport_users: dict[tuple[str, bool], int] = {}
+_retry_policies: weakref.WeakKeyDictionary[Web3 | AsyncWeb3, 'RetryPolicy'] = weakref.WeakKeyDictionary()
+
+
+def set_retry_policy(provider: Web3 | AsyncWeb3, policy: Optional['RetryPolicy']) -> None:
+    """
+    Sets the policy retrying batch requests of the provider, which bypass its middlewares
+    :param provider: Web3 or AsyncWeb3 instance
+    :param policy: RetryPolicy instance or None to send batch requests once
+    :return: None
+    """
+    if policy is None:
+        _retry_policies.pop(provider, None)
+    else:
+        _retry_policies[provider] = policy
+
+
+def _get_transport_key(provider: Web3 | AsyncWeb3) -> tuple[str, bool]:
+    return str(getattr(provider.provider, 'endpoint_uri', '')), isinstance(provider, AsyncWeb3)
+
+
+def discard_transport(provider: Web3 | AsyncWeb3) -> bool:
+    """
+    Unregisters a user of the HTTP sessions of the endpoint without closing them
+    :param provider: Web3 or AsyncWeb3 instance
+    :return: True if the provider was the last user of the sessions
+    """
+    key = _get_transport_key(provider)
+    users = _transport_users.get(key, 0) - 1
+    if users > 0:
+        _transport_users[key] = users
+        return False
+
+    _transport_users.pop(key, None)
+    return True
+
+
+def acquire_transport(provider: Web3 | AsyncWeb3) -> None:
+    """
+    Registers a user of the HTTP sessions of the endpoint. Sessions are shared by all providers of the endpoint and
+    closed when the last user releases them
+    :param provider: Web3 or AsyncWeb3 instance
+    :return: None
+    """
+    if _is_http(provider):
+        key = _get_transport_key(provider)
+        _transport_users[key] = _transport_users.get(key, 0) + 1
+
+
+def _is_http(provider: Web3 | AsyncWeb3) -> bool:
+    if not isinstance(provider, AsyncWeb3):
+        return isinstance(provider.provider, HTTPProvider)
+
+    from web3.providers.async_rpc import AsyncHTTPProvider
+    return isinstance(provider.provider, AsyncHTTPProvider)
+
+
+def release_transport(provider: Web3) -> None:
+    """
+    Closes the connection of WebSocket or IPC provider, and HTTP sessions of the endpoint in all threads if the
+    provider is their last user
+    :param provider: Web3 instance
+    :return: None
+    """
+    transport = provider.provider
+
+    if isinstance(transport, HTTPProvider):
+        if not discard_transport(provider):
+            return
+
+        from web3._utils.request import _session_cache, _session_cache_lock
+        for thread in threading.enumerate():
+            cache_key = generate_cache_key(f'{thread.ident}:{transport.endpoint_uri}')
+            with _session_cache_lock:
+                session = _session_cache.pop(cache_key)
+
+            if session is not None:
+                session.close()
+    elif isinstance(transport, IPCProvider):
+        sock, transport._socket.sock = transport._socket.sock, None
+        if sock is not None:
+            sock.close()
+    else:
+        from web3.providers.websocket import WebsocketProvider
+        if isinstance(transport, WebsocketProvider):
+            ws, transport.conn.ws = transport.conn.ws, None
+            if ws is not None:
+                asyncio.run_coroutine_threadsafe(ws.close(), WebsocketProvider._loop).result()
+
+
+async def async_release_transport(provider: AsyncWeb3) -> None:
+    """
+    Async version of release_transport. HTTP sessions are bound to event loops, so only the session of the current
+    thread is closed
+    :param provider: AsyncWeb3 instance
+    :return: None
+    """
+    from web3.providers.async_rpc import AsyncHTTPProvider
+    from web3._utils.request import _async_session_cache
+    from evm_wallet._websocket import _ReconnectingWebsocketProvider
+    transport = provider.provider
+
+    if isinstance(transport, _ReconnectingWebsocketProvider):
+        if transport.is_open:
+            await transport.disconnect()
+    elif isinstance(transport, AsyncHTTPProvider) and discard_transport(provider):
+        cache_key = generate_cache_key(f'{threading.get_ident()}:{transport.endpoint_uri}')
+        session = _async_session_cache.pop(cache_key)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+def _encode_batch(calls: list[RPCCall]) -> bytes:
+    batch = [
+        {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': request_id}
+        for request_id, (method, params) in enumerate(calls)
+    ]
+    return json.dumps(batch).encode()
+
+
+def _decode_batch(raw_response: bytes, size: int) -> list[RPCResponse]:
+    responses = json.loads(raw_response)
+
+    if isinstance(responses, dict):
+        raise ValueError(f'Batch request was rejected by the provider: {responses.get("error", responses)}')
+
+    ordered: list[Optional[RPCResponse]] = [None] * size
+    for response in responses:
+        ordered[response['id']] = response
+
+    return ordered
+
+
+def _send_batch(provider: Web3, calls: list[RPCCall]) -> list[RPCResponse]:
+    transport = provider.provider
+    if isinstance(transport, HTTPProvider):
+        from web3._utils.request import make_post_request
+        raw_response = make_post_request(
+            transport.endpoint_uri, _encode_batch(calls), **transport.get_request_kwargs()
+        )
+        return _decode_batch(raw_response, len(calls))
+
+    return [transport.make_request(RPCEndpoint(method), params) for method, params in calls]
+
+
+async def _async_send_batch(provider: AsyncWeb3, calls: list[RPCCall]) -> list[RPCResponse]:
+    from web3.providers.async_rpc import AsyncHTTPProvider
+    from web3._utils.request import async_make_post_request
+    transport = provider.provider
+    if isinstance(transport, AsyncHTTPProvider):
+        raw_response = await async_make_post_request(
+            transport.endpoint_uri, _encode_batch(calls), **transport.get_request_kwargs()
+        )
+        return _decode_batch(raw_response, len(calls))
+
+    return list(await asyncio.gather(
+        *(transport.make_request(RPCEndpoint(method), params) for method, params in calls)
+    ))
+
+
+def batch_request(provider: Web3, calls: list[RPCCall]) -> list[RPCResponse]:
+    """
+    Sends JSON-RPC calls in one round trip if the transport supports batches, otherwise one by one. Batches bypass
+    middlewares, so they are retried by the retry policy installed on the provider, if any
+    :param provider: Web3 instance to be used
+    :param calls: Pairs of RPC method and its params
+    :return: Raw RPC responses in the same order as calls
+    """
+    if not calls:
+        return []
+
+    policy = _retry_policies.get(provider)
+    if policy is None:
+        return _send_batch(provider, calls)
+
+    return policy.send_batch(provider, calls, lambda retried: _send_batch(provider, retried))
+
+
+async def async_batch_request(provider: AsyncWeb3, calls: list[RPCCall]) -> list[RPCResponse]:
+    """
+    Async version of batch_request
+    :param provider: AsyncWeb3 instance to be used
+    :param calls: Pairs of RPC method and its params
+    :return: Raw RPC responses in the same order as calls
+    """
+    if not calls:
+        return []
+
+    policy = _retry_policies.get(provider)
+    if policy is None:
+        return await _async_send_batch(provider, calls)
+
+    return await policy.async_send_batch(provider, calls, lambda retried: _async_send_batch(provider, retried))
+
+
+_DUPLICATE_TRANSACTION_MARKERS = ('already known', 'known transaction', 'already imported')
+_KNOWN_TRANSACTION_MARKERS = (*_DUPLICATE_TRANSACTION_MARKERS, 'nonce too low')
+
+
+def get_result(response: RPCResponse) -> Any:
+    """
+    Returns result of the raw RPC response
+    :param response: Raw RPC response
+    :return: Result of the response. Raises ValueError if the response contains an error
+    """
+    if 'error' in response:
+        raise ValueError(response['error'])
+
+    return response['result']
+
+
+def is_known_transaction_error(error: Exception) -> bool:
+    """
+    Returns true if broadcasting failed because the transaction is already in the mempool or its nonce is already used
+    :param error: Exception raised by send_raw_transaction
+    :return: True if the transaction doesn't need to be broadcast again
+    """
+    message = str(error).lower()
+    return any(marker in message for marker in _KNOWN_TRANSACTION_MARKERS)
+
+
+def is_duplicate_transaction_error(error: Exception) -> bool:
+    """
+    Returns true if broadcasting failed because the node already has the same transaction. Unlike
+    is_known_transaction_error, a used nonce isn't treated as the same transaction
+    :param error: Exception raised by send_raw_transaction
+    :return: True if the transaction is already known by the node
+    """
+    message = str(error).lower()
+    return any(marker in message for marker in _DUPLICATE_TRANSACTION_MARKERS)
+
+
+def _to_rpc_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    elif isinstance(value, int):
+        return hex(value)
+    elif isinstance(value, bytes):
+        return HexBytes(value).hex()
+
+    return value
+
+
+def _tx_params_to_call(tx_params: TxParams) -> dict[str, Any]:
+    return {
+        field: _to_rpc_value(tx_params[field])
+        for field in _CALL_FIELDS
+        if tx_params.get(field) is not None
+    }
+
+
+def _decode_revert_reason(data: Optional[str]) -> Optional[str]:
+    if not isinstance(data, str) or len(data) < 10:
+        return None
+
+    selector, payload = data[:10], HexBytes(data[10:])
+
+    try:
+        if selector == _ERROR_SELECTOR:
+            return decode(['string'], payload)[0]
+        elif selector == _PANIC_SELECTOR:
+            return f'Panic({decode(["uint256"], payload)[0]:#x})'
+    except Exception:
+        pass
+
+    return f'Custom error {data}'
+
+
+def _error_data(error: dict[str, Any]) -> Optional[str]:
+    data = error.get('data')
+    if isinstance(data, dict):
+        data = data.get('data') or data.get('result')
+
+    return data
+
+
+def _to_simulation_result(response: RPCResponse) -> SimulationResult:
+    if 'error' not in response:
+        return SimulationResult(success=True, output=HexBytes(response.get('result') or b''))
+
+    error = response['error']
+    if isinstance(error, str):
+        return SimulationResult(success=False, revert_reason=error)
+
+    data = _error_data(error)
+    revert_reason = _decode_revert_reason(data) or error.get('message')
+    return SimulationResult(
+        success=False,
+        output=HexBytes(data) if isinstance(data, str) else None,
+        revert_reason=revert_reason
+    )
+
+
+def _estimate_gas_calls(tx_params_list: list[TxParams]) -> list[RPCCall]:
+    return [('eth_estimateGas', [_tx_params_to_call(tx_params)]) for tx_params in tx_params_list]
+
+
+def _simulation_calls(tx_params_list: list[TxParams]) -> list[RPCCall]:
+    return [('eth_call', [_tx_params_to_call(tx_params), 'pending']) for tx_params in tx_params_list]
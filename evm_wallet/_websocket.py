@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any
+from websockets.exceptions import ConnectionClosed
+from web3.providers import WebsocketProviderV2
+from web3.types import RPCEndpoint, RPCResponse
+
+
+class _ReconnectingWebsocketProvider(WebsocketProviderV2):
+    """
+    Persistent WebSocket provider, connecting on the first request and transparently reconnecting when the connection
+    is lost
+    """
+
+    def __init__(self, endpoint_uri: str, **kwargs: Any):
+        super().__init__(endpoint_uri, **kwargs)
+        self._connection_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def ensure_connected(self, reconnect: bool = False) -> None:
+        async with self._connection_lock:
+            if self.is_open and not reconnect:
+                return
+
+            if self._ws is not None:
+                await self.disconnect()
+
+            await self.connect()
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        await self.ensure_connected()
+
+        try:
+            return await super().make_request(method, params)
+        except ConnectionClosed:
+            await self.ensure_connected()
+            return await super().make_request(method, params)
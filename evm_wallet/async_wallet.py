@@ -1,49 +1,200 @@
-from typing import Optional
-from eth_typing import HexStr
+import asyncio
+from decimal import Decimal
+from typing import Optional, Any, Callable, Awaitable, Hashable, AsyncIterator, Self
+from eth_typing import ChecksumAddress, HexStr
 from hexbytes import HexBytes
 from web3 import AsyncWeb3
 from web3.contract.async_contract import AsyncContractFunction, AsyncContract
-from web3.types import TxParams, Wei
+from web3.exceptions import TransactionNotFound
+from web3.types import TxParams, Wei, BlockIdentifier, TxReceipt
 from evm_wallet._base_wallet import _BaseWallet
-from evm_wallet.types import Network, NetworkInfo, TokenAmount, AnyAddress, ERC20Token
+from evm_wallet.journal import NonceJournal
+from evm_wallet.gas import GasEstimateCache
+from evm_wallet.retry import RetryPolicy, DEFAULT_RETRY_POLICY, is_transient_error
+from evm_wallet.cache import ReadCache
+from evm_wallet.subscriptions import HeadWatcher
+from evm_wallet.indexer import TransferIndexer, Direction
+from evm_wallet.portfolio import take_snapshot
+from evm_wallet._rpc import (async_batch_request, async_release_transport, is_persistent,
+                             is_duplicate_transaction_error, _estimate_gas_calls, _simulation_calls,
+                             _to_simulation_result)
+from evm_wallet.types import (Network, NetworkInfo, TokenAmount, AnyAddress, ERC20Token, SimulationResult,
+                              TransferEvent, TransferCheckpoint, PortfolioSnapshot)
 from evm_wallet.utils import is_checksum_address
+from evm_wallet.units import from_base_units
+from evm_wallet.erc20 import encode_transfer, encode_approve, encode_balance_of, decode_uint256
 
 
 class AsyncWallet(_BaseWallet):
     """
     Async version of Wallet, interacting with your ethereum digital wallet.
-    You can change a network of the wallet at any time using network setter
+    You can change a network of the wallet at any time using network setter.
+    If the network is connected through WebSocket endpoint, newHeads subscription drives refreshing of gas price and
+    resolving of transaction receipts instead of polling
     """
 
     def __init__(
             self,
             private_key: str,
             network: Network | NetworkInfo = 'Ethereum',
+            read_cache: Optional[ReadCache] = None,
+            journal: Optional[NonceJournal] = None,
+            gas_cache: Optional[GasEstimateCache] = None,
+            retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY
     ):
         """
         :param private_key: Private key of existing account
         :param network: Name of supported network to be interacted or custom information about network represented as
         type NetworkInfo
+        :param read_cache: Block-scoped cache of balance reads. It can be shared by many wallets to deduplicate their
+        identical reads within a block
+        :param journal: Durable journal of nonces and signed transactions. If provided, the nonce is reconciled with
+        the journal and the pending transaction count on creation. Unconfirmed transactions of the journal are sent
+        again by rebroadcast
+        :param gas_cache: Cache of gas estimates per call shape, used by build_and_transact and estimate_gas_many
+        :param retry_policy: Policy of retrying transient RPC failures, shared by wallets using the same endpoints.
+        Requests are not retried if None is provided
         """
-        super().__init__(private_key, network, True)
+        self._read_cache = read_cache
+        self._head_watcher: Optional[HeadWatcher] = None
+        self._gas_price: Optional[Wei] = None
+        self._receipt_waiters: dict[HexBytes, asyncio.Future] = {}
+        self._snapshot_providers: dict[str, AsyncWeb3] = {}
+        super().__init__(private_key, network, True, journal, gas_cache, retry_policy)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
 
     @property
     def provider(self) -> AsyncWeb3:
         return self._provider
 
+    async def aclose(self) -> None:
+        """
+        Stops following block heads, cancels receipt waiters and releases connections of the wallet, including the
+        ones of previous networks still being released. HTTP sessions shared with other wallets are closed by the last
+        of them. Read cache and nonce journal are left open
+        :return: None
+        """
+        if self._closed:
+            return
+
+        self._closed = True
+        if self._head_watcher is not None:
+            await self._head_watcher.stop()
+
+        for waiter in self._receipt_waiters.values():
+            waiter.cancel()
+        self._receipt_waiters.clear()
+
+        await async_release_transport(self.provider)
+        await asyncio.gather(*self._pending_releases)
+
+        providers, self._snapshot_providers = self._snapshot_providers, {}
+        for provider in providers.values():
+            await async_release_transport(provider)
+
+    @property
+    def read_cache(self) -> Optional[ReadCache]:
+        """
+        Block-scoped cache of balance reads, if provided
+        :return: ReadCache instance or None
+        """
+        return self._read_cache
+
+    @property
+    def head_watcher(self) -> Optional[HeadWatcher]:
+        """
+        Follower of block heads, available if the network is connected through WebSocket endpoint
+        :return: HeadWatcher instance or None
+        """
+        return self._head_watcher
+
     def _load_token_contract(self, address: AnyAddress) -> AsyncContract:
         return super()._load_token_contract(address)
 
-    async def get_balance(self, from_wei: bool = False) -> float | Wei:
+    def _on_provider_change(self) -> None:
+        if self._head_watcher is not None:
+            self._head_watcher.cancel()
+
+        self._gas_price = None
+        for waiter in self._receipt_waiters.values():
+            waiter.cancel()
+        self._receipt_waiters.clear()
+
+        if is_persistent(self.provider):
+            self._head_watcher = HeadWatcher(self.provider)
+            self._head_watcher.add_listener(self._on_new_head)
+        else:
+            self._head_watcher = None
+
+    def _watch_heads(self) -> bool:
+        watcher = self._head_watcher
+        if watcher is None:
+            return False
+
+        watcher.start()
+        return True
+
+    async def _on_new_head(self, header: dict[str, Any]) -> None:
+        if self._read_cache is not None:
+            self._read_cache.advance(self.network['chain_id'], self._head_watcher.head)
+
+        provider = self.provider
+        self._gas_price = await provider.eth.gas_price
+
+        waiters = [(tx_hash, waiter) for tx_hash, waiter in self._receipt_waiters.items() if not waiter.done()]
+        receipts = await asyncio.gather(
+            *(provider.eth.get_transaction_receipt(tx_hash) for tx_hash, _ in waiters),
+            return_exceptions=True
+        )
+
+        # Receipts of transactions not mined yet or failed to be fetched transiently are polled on the next head
+        for (tx_hash, waiter), receipt in zip(waiters, receipts):
+            if not isinstance(receipt, BaseException):
+                waiter.set_result(receipt)
+            elif not isinstance(receipt, TransactionNotFound) and not is_transient_error(receipt):
+                waiter.set_exception(receipt)
+
+    async def _get_gas_price(self) -> Wei:
+        if self._watch_heads() and self._gas_price is not None:
+            return self._gas_price
+
+        self._gas_price = await self.provider.eth.gas_price
+        return self._gas_price
+
+    async def _cached_read(
+            self,
+            method: str,
+            params: Hashable,
+            fetch: Callable[[BlockIdentifier], Awaitable[Any]]
+    ) -> Any:
+        cache = self._read_cache
+        if cache is None:
+            return await fetch('latest')
+
+        chain_id = self.network['chain_id']
+        block = await cache.head(chain_id, lambda: self.provider.eth.block_number)
+        return await cache.get((chain_id, method, params, block), lambda: fetch(block))
+
+    async def get_balance(self, from_wei: bool = False) -> Decimal | Wei:
         """
         Returns the balance of the current account in ethereum or wei units.
-        :param from_wei: Whether to convert balance to Ether units (default: False)
+        :param from_wei: Whether to convert balance to Ether units exactly (default: False)
         :return: Balance of the current account in ethereum units
         """
         provider = self.provider
-        balance = await provider.eth.get_balance(self.public_key)
+        public_key = self.public_key
+        balance = await self._cached_read(
+            'eth_getBalance',
+            public_key,
+            lambda block: provider.eth.get_balance(public_key, block)
+        )
 
-        return balance if not from_wei else provider.from_wei(balance, 'ether')
+        return balance if not from_wei else from_base_units(balance)
 
     async def estimate_gas(self, tx_params: TxParams, from_wei: bool = False) -> Wei:
         """
@@ -56,12 +207,27 @@ class AsyncWallet(_BaseWallet):
         gas = Wei(int(await provider.eth.estimate_gas(tx_params)))
         return gas if not from_wei else provider.from_wei(gas, 'ether')
 
+    async def estimate_gas_many(self, tx_params_list: list[TxParams], use_cache: bool = True) -> list[Wei]:
+        """
+        Returns estimated gas of many transactions in Wei units. Estimates absent in the gas cache are requested in one
+        batch request and stored in the cache. If the wallet has a gas cache, all estimates are multiplied by its
+        safety multiplier
+        :param tx_params_list: Params of built transactions
+        :param use_cache: Whether to take estimates from the gas cache, if the wallet has one (default: True)
+        :return: Estimated gas in the same order as the given params
+        """
+        estimates = [self._get_cached_gas(tx_params) if use_cache else None for tx_params in tx_params_list]
+        missing = [tx_params for tx_params, gas in zip(tx_params_list, estimates) if gas is None]
+        responses = await async_batch_request(self.provider, _estimate_gas_calls(missing))
+        return self._merge_gas_estimates(tx_params_list, estimates, responses)
+
     async def build_and_transact(
             self,
             closure: AsyncContractFunction,
             value: TokenAmount = 0,
             gas: Optional[int] = None,
-            gas_price: Optional[Wei] = None
+            gas_price: Optional[Wei] = None,
+            simulate: bool = False
     ) -> HexBytes:
         """
         If you don't need to check estimated gas or directly use transact, you can call build_and_transact. It's based on getting
@@ -82,18 +248,47 @@ class AsyncWallet(_BaseWallet):
         :param value: Quantity of network currency to be paid in Wei units
         :param gas: Quantity of gas to be spent
         :param gas_price: Price of gas in Wei units
+        :param simulate: Whether to dry-run the transaction against the pending block before signing. Raises
+        ContractLogicError with the decoded revert reason if it would revert (default: False)
         :return: Transaction's hash
         """
         gas_ = Wei(300_000) if not gas else gas
         tx_params = await self.build_tx_params(value=value, gas=gas_, gas_price=gas_price)
         tx_params = await closure.build_transaction(tx_params)
+        return await self._transact_built(tx_params, gas, simulate)
+
+    async def _transact_calldata(
+            self,
+            to: ChecksumAddress,
+            data: HexStr,
+            gas: Optional[Wei] = None,
+            gas_price: Optional[Wei] = None
+    ) -> HexBytes:
+        tx_params = await self.build_tx_params(Wei(0), to, data, gas or Wei(300_000), gas_price)
+        return await self._transact_built(tx_params, gas)
+
+    async def _transact_built(self, tx_params: TxParams, gas: Optional[int], simulate: bool = False) -> HexBytes:
+        if simulate:
+            result, = await self.simulate_many([self._simulation_params(tx_params, gas)])
+            self._raise_for_simulation(result)
 
         if not gas:
-            gas = await self.estimate_gas(tx_params)
+            gas = self._get_cached_gas(tx_params)
+            if gas is None:
+                gas = self._cache_gas(tx_params, await self.estimate_gas(tx_params))
             tx_params['gas'] = gas
 
         return await self.transact(tx_params)
 
+    async def simulate_many(self, tx_params_list: list[TxParams]) -> list[SimulationResult]:
+        """
+        Dry-runs transactions with eth_call against the pending block. All simulations are sent in one batch request
+        :param tx_params_list: Params of built transactions
+        :return: Simulation results in the same order as the given params, containing decoded revert reasons
+        """
+        responses = await async_batch_request(self.provider, _simulation_calls(tx_params_list))
+        return [_to_simulation_result(response) for response in responses]
+
     async def approve(
             self,
             token: ERC20Token,
@@ -110,11 +305,8 @@ class AsyncWallet(_BaseWallet):
         if not is_checksum_address(contract_address):
             raise ValueError('Invalid contract address is provided')
 
-        token = self._load_token_contract(token.address)
         contract_address = self.provider.to_checksum_address(contract_address)
-        return await self.build_and_transact(
-            token.functions.approve(contract_address, token_amount)
-        )
+        return await self._transact_calldata(token.address, encode_approve(contract_address, token_amount))
 
     async def build_tx_params(
             self,
@@ -141,7 +333,7 @@ class AsyncWallet(_BaseWallet):
             'nonce': self.nonce,
             'value': value,
             'gas': gas,
-            'gasPrice': gas_price if gas_price else await provider.eth.gas_price,
+            'gasPrice': gas_price if gas_price else await self._get_gas_price(),
         }
 
         if recipient:
@@ -158,13 +350,73 @@ class AsyncWallet(_BaseWallet):
         :param tx_params: Built transaction's params
         :return: Transaction's hash
         """
-        provider = self.provider
-        signed_transaction = provider.eth.account.sign_transaction(tx_params, self.private_key)
-        tx_hash = await provider.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        tx_hash = await self._send_transaction(tx_params)
         self._nonce += 1
 
         return tx_hash
 
+    async def _send_transaction(self, tx_params: TxParams) -> HexBytes:
+        provider = self.provider
+        signed_transaction = provider.eth.account.sign_transaction(tx_params, self.private_key)
+        self._record_transaction(tx_params, signed_transaction)
+        try:
+            return await provider.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        except Exception as e:
+            self._discard_rejected(signed_transaction.hash, e)
+            raise
+
+    async def rebroadcast(self) -> list[HexBytes]:
+        """
+        Broadcasts again signed transactions from the nonce journal, which are not confirmed yet, e.g. after a restart.
+        Transactions are sent in nonce order as they were signed, so their nonces and hashes don't change. If the node
+        rejects one, it and all later transactions are discarded from the journal, the nonce of the wallet is moved
+        back to it and the error is raised. After transient errors transactions are kept to be rebroadcast again
+        :return: Hashes of rebroadcast transactions
+        """
+        journal = self._get_journal()
+        provider = self.provider
+        chain_id = self.network['chain_id']
+
+        journal.confirm(chain_id, self.public_key, await provider.eth.get_transaction_count(self.public_key))
+        entries = journal.unconfirmed(chain_id, self.public_key)
+
+        for entry in entries:
+            try:
+                await provider.eth.send_raw_transaction(entry.raw_tx)
+            except Exception as e:
+                if not is_duplicate_transaction_error(e):
+                    self._release_unsent(entry, e)
+                    raise
+
+        return [entry.tx_hash for entry in entries]
+
+    async def wait_for_receipt(self, tx_hash: HexBytes, timeout: float = 120) -> TxReceipt:
+        """
+        Waits for the transaction to be included in a block. Receipts are resolved on new block heads if the network is
+        connected through WebSocket endpoint, otherwise they are polled
+        :param tx_hash: Transaction hash
+        :param timeout: Maximum time to wait in seconds
+        :return: Transaction receipt
+        """
+        provider = self.provider
+
+        if not self._watch_heads():
+            return await provider.eth.wait_for_transaction_receipt(tx_hash, timeout)
+
+        tx_hash = HexBytes(tx_hash)
+        waiter = self._receipt_waiters.get(tx_hash)
+        if waiter is None:
+            waiter = asyncio.get_running_loop().create_future()
+            self._receipt_waiters[tx_hash] = waiter
+
+        try:
+            try:
+                return await provider.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        finally:
+            self._receipt_waiters.pop(tx_hash, None)
+
     async def transfer(
             self,
             token: ERC20Token,
@@ -185,23 +437,28 @@ class AsyncWallet(_BaseWallet):
         if not is_checksum_address(recipient):
             raise ValueError('Invalid recipient address is provided')
 
-        token_contract = self._load_token_contract(token.address)
         recipient = self.provider.to_checksum_address(recipient)
-        closure = token_contract.functions.transfer(recipient, token_amount)
-        return await self.build_and_transact(closure, Wei(0), gas, gas_price)
+        return await self._transact_calldata(token.address, encode_transfer(recipient, token_amount), gas, gas_price)
+
+    async def _call_uint256(self, call: TxParams, block: BlockIdentifier) -> int:
+        return decode_uint256(await self.provider.eth.call(call, block))
 
-    async def get_balance_of(self, token: ERC20Token, convert: bool = False) -> float:
+    async def get_balance_of(self, token: ERC20Token, convert: bool = False) -> int | Decimal:
         """
         Returns balance of specified token in ethereum or wei units
         :param token: ERC20Token instance
-        :param convert: Whether to divide token balance by its decimals (default: False)
+        :param convert: Whether to divide token balance by its decimals exactly (default: False)
         :return: Balance of specified token in ethereum or wei units
         """
-        token_contract = self._load_token_contract(token.address)
-        balance = await token_contract.functions.balanceOf(self.public_key).call()
+        call = {'to': token.address, 'data': encode_balance_of(self.public_key)}
+        balance = await self._cached_read(
+            'balanceOf',
+            (token.address, self.public_key),
+            lambda block: self._call_uint256(call, block)
+        )
 
         if convert:
-            balance /= 10 ** token.decimals
+            balance = token.from_base_units(balance)
 
         return balance
 
@@ -220,3 +477,98 @@ class AsyncWallet(_BaseWallet):
         decimals = await token_contract.functions.decimals().call()
 
         return ERC20Token(address=address, symbol=symbol, decimals=decimals)
+
+    async def iter_transfers(
+            self,
+            from_block: int = 0,
+            to_block: Optional[int] = None,
+            tokens: Optional[list[ERC20Token | AnyAddress]] = None,
+            direction: Direction = 'both',
+            checkpoint: Optional[TransferCheckpoint] = None,
+            window: int = 2_000,
+            concurrency: int = 4
+    ) -> AsyncIterator[TransferEvent]:
+        """
+        Streams ERC20 Transfer events of the current account across the block range using eth_getLogs. Windows of
+        blocks are fetched in parallel and shrunk or grown according to result limits of the provider
+
+        Usage Example
+        ----------
+            checkpoint = TransferCheckpoint(next_block=19_000_000)
+
+            async for transfer in wallet.iter_transfers(checkpoint=checkpoint):
+                print(transfer.token, transfer.amount)
+
+        :param from_block: First block of the range (default: 0)
+        :param to_block: Last block of the range. The latest block is used if not provided
+        :param tokens: Tokens to be watched. All tokens are watched if not provided
+        :param direction: Whether to stream incoming ('in'), outgoing ('out') or both transfers (default: 'both')
+        :param checkpoint: Checkpoint to resume from. If provided, it overrides from_block and is advanced as transfers
+        are yielded, so it can be saved and used to resume later
+        :param window: Initial number of blocks requested by one eth_getLogs call
+        :param concurrency: Maximum number of windows fetched at the same time
+        :return: Async iterator of TransferEvent
+        """
+        provider = self.provider
+
+        if checkpoint is not None:
+            from_block = checkpoint.next_block
+
+        if to_block is None:
+            to_block = await provider.eth.block_number
+
+        token_addresses = [
+            token.address if isinstance(token, ERC20Token) else provider.to_checksum_address(token)
+            for token in tokens
+        ] if tokens else None
+
+        indexer = TransferIndexer(provider, self.public_key, window=window, concurrency=concurrency)
+        async for event in indexer.stream(from_block, to_block, token_addresses, direction, checkpoint):
+            yield event
+
+    async def snapshot(
+            self,
+            networks: Optional[list[Network | NetworkInfo]] = None,
+            tokens: Optional[dict[str, list[AnyAddress]]] = None,
+            timeout: float = 10.0
+    ) -> PortfolioSnapshot:
+        """
+        Returns native and token balances of the current account on many networks at once. Networks are queried
+        concurrently, each one through its own provider kept by the wallet until it is closed, so a slow or failed
+        network doesn't block the rest. A token, whose balance can't be read, is reported in token_errors
+
+        Usage Example
+        ----------
+            snapshot = await wallet.snapshot(
+                ['Ethereum', 'Arbitrum'],
+                {'Ethereum': ['0xdAC17F958D2ee523a2206206994597C13D831ec7']}
+            )
+
+            for name, network_snapshot in snapshot.networks.items():
+                print(name, network_snapshot.native_balance, network_snapshot.elapsed, network_snapshot.error)
+
+        :param networks: Names of supported networks or custom information about networks represented as type
+        NetworkInfo. All supported networks are queried if not provided
+        :param tokens: Addresses of tokens to be queried per network name
+        :param timeout: Maximum time to query one network in seconds
+        :return: PortfolioSnapshot instance, containing per-network balances, timings and errors
+        """
+        if networks is None:
+            networks = list(self.get_network_map())
+
+        network_infos = [self._to_network_info(network) for network in networks]
+        token_addresses = {
+            network: [self.provider.to_checksum_address(token) for token in network_tokens]
+            for network, network_tokens in (tokens or {}).items()
+        }
+
+        return await take_snapshot(
+            self.public_key, network_infos, token_addresses, timeout, self._get_snapshot_provider
+        )
+
+    def _get_snapshot_provider(self, rpc: str) -> AsyncWeb3:
+        provider = self._snapshot_providers.get(rpc)
+        if provider is None:
+            provider = self._snapshot_providers[rpc] = self._make_provider(rpc, True)
+
+        return provider
@@ -0,0 +1,539 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Optional, Self, TYPE_CHECKING
+from hexbytes import HexBytes
+from eth_typing import ChecksumAddress
+from eth_utils import keccak
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+from web3.types import TxParams
+from web3._utils.method_formatters import receipt_formatter
+from evm_wallet.types import AnyAddress, ERC20Token
+from evm_wallet.erc20 import encode_transfer
+from evm_wallet._rpc import async_batch_request, is_duplicate_transaction_error
+from evm_wallet.retry import is_transient_error
+
+if TYPE_CHECKING:
+    from evm_wallet.async_wallet import AsyncWallet
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('build', 'sign', 'broadcast', 'receipt')
+
+_senders: dict[tuple[int, ChecksumAddress], 'BulkSender'] = {}
+
+
+@dataclass(kw_only=True)
+class StageStats:
+    processed: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        """
+        Mean time of processing one transaction by the stage
+        :return: Time in seconds
+        """
+        count = self.processed + self.errors
+        return self.total_time / count if count else 0.0
+
+    def record(self, elapsed: float, failed: bool = False) -> None:
+        if failed:
+            self.errors += 1
+        else:
+            self.processed += 1
+
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+
+@dataclass(kw_only=True)
+class QueuedTransaction:
+    tx_params: TxParams
+    tx_hash: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    receipt: Optional[asyncio.Future] = None
+    raw_tx: Optional[HexBytes] = None
+
+    @property
+    def nonce(self) -> Optional[int]:
+        return self.tx_params.get('nonce')
+
+    def fail(self, error: BaseException) -> None:
+        for future in (self.tx_hash, self.receipt):
+            if future is not None and not future.done():
+                future.set_exception(error)
+
+    def cancel(self) -> None:
+        for future in (self.tx_hash, self.receipt):
+            if future is not None:
+                future.cancel()
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class BulkSender:
+    """
+    Send queue of one wallet on one network. Submitted transactions pass through pipelined stages connected by bounded
+    queues: build fills gas price and gas, estimating missing gas in batch requests through the gas cache, sign assigns
+    consecutive nonces, and broadcast sends raw transactions with bounded concurrency, shaped to the given rate.
+    Receipts, if requested, are polled in batch requests once per new block. A full queue makes submit wait, so
+    producers are slowed down to the speed of the pipeline instead of piling up requests. Transactions failed before
+    signing don't consume nonces, and signed transactions are broadcast before the sender stops. If the last
+    transactions are rejected by the node, the nonce of the wallet is rolled back to the first of them. A rejected
+    transaction followed by accepted ones leaves a nonce gap, which blocks them until it is filled, e.g. by
+    ReplacementManager.cancel. The wallet shouldn't transact outside the sender while it is running
+
+    Usage Example
+    ----------
+        async with BulkSender(wallet, rate=20, wait_for_receipts=True) as sender:
+            queued = [await sender.submit_transfer(usdt, recipient, amount) for recipient, amount in payouts]
+
+        receipts = await asyncio.gather(*(transaction.receipt for transaction in queued))
+        print(sender.stats['broadcast'].mean_time)
+    """
+
+    def __init__(
+            self,
+            wallet: 'AsyncWallet',
+            rate: Optional[float] = None,
+            burst: int = 1,
+            queue_size: int = 1000,
+            batch_size: int = 100,
+            broadcast_concurrency: int = 16,
+            wait_for_receipts: bool = False,
+            receipt_timeout: float = 120,
+            receipt_poll_interval: float = 1.0
+    ):
+        """
+        :param wallet: AsyncWallet instance sending transactions
+        :param rate: Maximum number of broadcast transactions per second. Not limited if not provided
+        :param burst: Number of transactions, which can be broadcast at once after the sender was idle
+        :param queue_size: Maximum number of transactions waiting for every stage
+        :param batch_size: Maximum number of gas estimates in one batch request
+        :param broadcast_concurrency: Maximum number of broadcast requests in flight
+        :param wait_for_receipts: Whether submitted transactions wait for receipts by default (default: False)
+        :param receipt_timeout: Maximum time to wait for a receipt in seconds
+        :param receipt_poll_interval: Seconds between checks of the block head, after which receipts of pending
+        transactions are requested in batches if a new block is mined
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError('Rate must be a positive number of transactions per second')
+
+        self._wallet = wallet
+        self._chain_id = wallet.network['chain_id']
+        self._bucket = _TokenBucket(rate, max(1, burst)) if rate else None
+        self._batch_size = batch_size
+        self._broadcast_concurrency = broadcast_concurrency
+        self._wait_for_receipts = wait_for_receipts
+        self._receipt_timeout = receipt_timeout
+        self._receipt_poll_interval = receipt_poll_interval
+        self._queue_size = queue_size
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+        self._pending_receipts: dict[HexBytes, tuple[QueuedTransaction, float]] = {}
+        self._rejected: dict[int, HexBytes] = {}
+        self._stats = {stage: StageStats() for stage in STAGES}
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type: Optional[type], *args: Any) -> None:
+        if exc_type is None:
+            await self.join()
+
+        await self.stop()
+
+    @property
+    def wallet(self) -> 'AsyncWallet':
+        return self._wallet
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def stats(self) -> dict[str, StageStats]:
+        """
+        Timing of stages: build, sign, broadcast and receipt
+        :return: Dictionary of stage names and their StageStats
+        """
+        return self._stats
+
+    @property
+    def queue_sizes(self) -> dict[str, int]:
+        """
+        Number of transactions waiting for every stage
+        :return: Dictionary of stage names and sizes of their queues
+        """
+        sizes = {stage: queue.qsize() for stage, queue in self._queues.items()}
+        sizes['receipt'] = len(self._pending_receipts)
+        return sizes
+
+    def start(self) -> None:
+        """
+        Starts stages in background tasks of the running event loop
+        :return: None
+        """
+        if self._tasks:
+            return
+
+        key = (self._chain_id, self._wallet.public_key)
+        running = _senders.get(key)
+        if running is not None and running is not self:
+            raise ValueError(f'Wallet {key[1]} already has a running sender on chain {key[0]}')
+
+        _senders[key] = self
+        loop = asyncio.get_running_loop()
+        self._stopping = False
+        self._rejected = {}
+        self._queues = {stage: asyncio.Queue(self._queue_size) for stage in ('build', 'sign', 'broadcast')}
+        self._tasks = [
+            loop.create_task(self._run_build()),
+            loop.create_task(self._run_sign()),
+            loop.create_task(self._run_receipts()),
+            *(loop.create_task(self._run_broadcast()) for _ in range(self._broadcast_concurrency))
+        ]
+
+    async def join(self) -> None:
+        """
+        Waits until all submitted transactions are broadcast and their receipts, if requested, are received
+        :return: None
+        """
+        for queue in self._queues.values():
+            await queue.join()
+
+        receipts = [queued.receipt for queued, _ in self._pending_receipts.values()]
+        if receipts:
+            await asyncio.gather(*receipts, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """
+        Stops stages. Transactions which are not signed yet are cancelled. Signed transactions have nonces allocated,
+        so they are broadcast before stopping, and the nonce of the wallet is rolled back behind rejected ones at the
+        end. Receipts which are not received yet are cancelled
+        :return: None
+        """
+        if not self._tasks:
+            return
+
+        build_task, sign_task, receipt_task, *broadcast_tasks = self._tasks
+        self._stopping = True
+
+        build_task.cancel()
+        await asyncio.gather(build_task, return_exceptions=True)
+        self._cancel_queued(self._queues['build'])
+
+        await self._queues['sign'].join()
+        await self._queues['broadcast'].join()
+
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        pending_receipts, self._pending_receipts = self._pending_receipts, {}
+        for queued, _ in pending_receipts.values():
+            queued.cancel()
+
+        self._rollback_nonce()
+
+        key = (self._chain_id, self._wallet.public_key)
+        if _senders.get(key) is self:
+            del _senders[key]
+
+    @staticmethod
+    def _cancel_queued(queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait().cancel()
+            queue.task_done()
+
+    def _rollback_nonce(self) -> None:
+        wallet = self._wallet
+        journal = wallet.journal
+        while wallet.nonce - 1 in self._rejected:
+            wallet._nonce -= 1
+            tx_hash = self._rejected.pop(wallet.nonce)
+            if journal is not None:
+                journal.discard(self._chain_id, wallet.public_key, tx_hash)
+
+    async def submit(self, tx_params: TxParams, wait_for_receipt: Optional[bool] = None) -> QueuedTransaction:
+        """
+        Queues the transaction, waiting while the queue is full. Missing sender, chain id, value, gas price and gas are
+        filled by the sender, and nonce is always assigned by it
+        :param tx_params: Transaction's params
+        :param wait_for_receipt: Whether to wait for the receipt of the transaction. Defaults to the option of the
+        sender
+        :return: QueuedTransaction instance, whose tx_hash future resolves after broadcast and receipt future, if
+        requested, after the transaction is mined
+        """
+        self.start()
+        if wait_for_receipt is None:
+            wait_for_receipt = self._wait_for_receipts
+
+        queued = QueuedTransaction(tx_params=dict(tx_params))
+        if wait_for_receipt:
+            queued.receipt = asyncio.get_running_loop().create_future()
+
+        await self._queues['build'].put(queued)
+        return queued
+
+    async def submit_transfer(
+            self,
+            token: ERC20Token,
+            recipient: AnyAddress,
+            token_amount: int,
+            wait_for_receipt: Optional[bool] = None
+    ) -> QueuedTransaction:
+        """
+        Queues transfer of the token amount to the recipient
+        :param token: ERC20Token instance
+        :param recipient: Address of the recipient
+        :param token_amount: Quantity of token to be transferred in Wei units
+        :param wait_for_receipt: Whether to wait for the receipt of the transaction
+        :return: QueuedTransaction instance
+        """
+        tx_params = {'to': token.address, 'value': 0, 'data': encode_transfer(recipient, token_amount)}
+        return await self.submit(tx_params, wait_for_receipt)
+
+    def _check_network(self) -> None:
+        if self._wallet.network['chain_id'] != self._chain_id:
+            raise ValueError(f'Network of the wallet was changed, the sender sends to chain {self._chain_id}')
+
+    async def _take_batch(self, queue: asyncio.Queue) -> list[QueuedTransaction]:
+        batch = [await queue.get()]
+        while len(batch) < self._batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        return batch
+
+    async def _run_build(self) -> None:
+        build_queue = self._queues['build']
+        sign_queue = self._queues['sign']
+
+        while True:
+            batch = await self._take_batch(build_queue)
+            started = time.perf_counter()
+
+            try:
+                built = await self._build(batch)
+            except asyncio.CancelledError:
+                for queued in batch:
+                    queued.cancel()
+                raise
+            except Exception as e:
+                built = []
+                for queued in batch:
+                    queued.fail(e)
+
+            elapsed = (time.perf_counter() - started) / len(batch)
+            for queued in batch:
+                self._stats['build'].record(elapsed, queued not in built)
+
+            try:
+                for queued in built:
+                    await sign_queue.put(queued)
+            except asyncio.CancelledError:
+                for queued in built:
+                    queued.cancel()
+                raise
+
+            for _ in batch:
+                build_queue.task_done()
+
+    async def _build(self, batch: list[QueuedTransaction]) -> list[QueuedTransaction]:
+        self._check_network()
+        wallet = self._wallet
+        gas_price = None
+
+        for queued in batch:
+            tx_params = queued.tx_params
+            tx_params.pop('nonce', None)
+            tx_params.setdefault('from', wallet.public_key)
+            tx_params.setdefault('chainId', self._chain_id)
+            tx_params.setdefault('value', 0)
+            if 'to' in tx_params:
+                tx_params['to'] = wallet.provider.to_checksum_address(tx_params['to'])
+
+            if 'gasPrice' not in tx_params and 'maxFeePerGas' not in tx_params:
+                gas_price = gas_price or await wallet._get_gas_price()
+                tx_params['gasPrice'] = gas_price
+
+        missing = [queued for queued in batch if 'gas' not in queued.tx_params]
+        if not missing:
+            return batch
+
+        try:
+            estimates = await wallet.estimate_gas_many([queued.tx_params for queued in missing])
+        except ValueError:
+            if len(missing) == 1:
+                raise
+            # One failed estimate fails the whole batch, so it is repeated one by one to fail only broken transactions
+            estimates = []
+            for queued in missing:
+                try:
+                    estimates.append((await wallet.estimate_gas_many([queued.tx_params]))[0])
+                except ValueError as e:
+                    queued.fail(e)
+                    estimates.append(None)
+
+        for queued, gas in zip(missing, estimates):
+            if gas is not None:
+                queued.tx_params['gas'] = gas
+
+        return [queued for queued in batch if 'gas' in queued.tx_params]
+
+    async def _run_sign(self) -> None:
+        sign_queue = self._queues['sign']
+        broadcast_queue = self._queues['broadcast']
+
+        while True:
+            queued = await sign_queue.get()
+            if self._stopping or queued.tx_hash.cancelled():
+                queued.cancel()
+                sign_queue.task_done()
+                continue
+
+            started = time.perf_counter()
+            try:
+                self._check_network()
+                self._sign(queued)
+            except Exception as e:
+                queued.fail(e)
+                self._stats['sign'].record(time.perf_counter() - started, True)
+            else:
+                self._stats['sign'].record(time.perf_counter() - started)
+                await broadcast_queue.put(queued)
+            finally:
+                sign_queue.task_done()
+
+    def _sign(self, queued: QueuedTransaction) -> None:
+        wallet = self._wallet
+        queued.tx_params['nonce'] = wallet.nonce
+        signed_transaction = wallet.provider.eth.account.sign_transaction(queued.tx_params, wallet.private_key)
+        wallet._record_transaction(queued.tx_params, signed_transaction)
+        wallet._nonce += 1
+        queued.raw_tx = HexBytes(signed_transaction.rawTransaction)
+
+    async def _run_broadcast(self) -> None:
+        broadcast_queue = self._queues['broadcast']
+
+        while True:
+            queued = await broadcast_queue.get()
+            try:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+
+                started = time.perf_counter()
+                try:
+                    tx_hash = await self._broadcast(queued)
+                except Exception as e:
+                    logger.warning(f'Broadcast of transaction with nonce {queued.nonce} failed: {e!r}')
+                    tx_hash = HexBytes(keccak(queued.raw_tx))
+                    self._wallet._discard_rejected(tx_hash, e)
+                    # After transient errors the transaction may have reached the node, so its nonce is kept
+                    if not is_transient_error(e):
+                        self._rejected[queued.nonce] = tx_hash
+                    queued.fail(e)
+                    self._stats['broadcast'].record(time.perf_counter() - started, True)
+                    continue
+
+                self._stats['broadcast'].record(time.perf_counter() - started)
+                if not queued.tx_hash.done():
+                    queued.tx_hash.set_result(tx_hash)
+
+                if queued.receipt is not None:
+                    self._pending_receipts[HexBytes(tx_hash)] = (queued, time.perf_counter())
+            finally:
+                broadcast_queue.task_done()
+
+    async def _broadcast(self, queued: QueuedTransaction) -> HexBytes:
+        try:
+            return await self._wallet.provider.eth.send_raw_transaction(queued.raw_tx)
+        except Exception as e:
+            if not is_duplicate_transaction_error(e):
+                raise
+
+        return HexBytes(keccak(queued.raw_tx))
+
+    async def _run_receipts(self) -> None:
+        provider = self._wallet.provider
+        last_block = None
+
+        while True:
+            await asyncio.sleep(self._receipt_poll_interval)
+            if not self._pending_receipts:
+                continue
+
+            try:
+                block = await provider.eth.block_number
+                if block != last_block:
+                    await self._poll_receipts()
+                    last_block = block
+            except Exception as e:
+                logger.warning(f'Polling of receipts failed: {e!r}')
+
+            now = time.perf_counter()
+            for tx_hash, (queued, broadcast_at) in list(self._pending_receipts.items()):
+                if now - broadcast_at > self._receipt_timeout:
+                    del self._pending_receipts[tx_hash]
+                    queued.fail(TimeExhausted(f'Transaction {tx_hash.hex()} is not in the chain after '
+                                              f'{self._receipt_timeout} seconds'))
+                    self._stats['receipt'].record(now - broadcast_at, True)
+
+    async def _poll_receipts(self) -> None:
+        tx_hashes = list(self._pending_receipts)
+        for offset in range(0, len(tx_hashes), self._batch_size):
+            chunk = tx_hashes[offset:offset + self._batch_size]
+            responses = await async_batch_request(
+                self._wallet.provider,
+                [('eth_getTransactionReceipt', [tx_hash.hex()]) for tx_hash in chunk]
+            )
+
+            now = time.perf_counter()
+            for tx_hash, response in zip(chunk, responses):
+                result = response.get('result')
+                if not result or result.get('blockNumber') is None or tx_hash not in self._pending_receipts:
+                    continue
+
+                queued, broadcast_at = self._pending_receipts.pop(tx_hash)
+                self._stats['receipt'].record(now - broadcast_at)
+                if not queued.receipt.done():
+                    queued.receipt.set_result(AttributeDict.recursive(receipt_formatter(result)))
+
+
+def get_sender(wallet: 'AsyncWallet', **options: Any) -> BulkSender:
+    """
+    Returns the running sender of the wallet on its current network, or a new one created with the given options
+    :param wallet: AsyncWallet instance
+    :param options: Keyword arguments of BulkSender, used only if a new sender is created
+    :return: BulkSender instance
+    """
+    sender = _senders.get((wallet.network['chain_id'], wallet.public_key))
+    if sender is None or sender.wallet is not wallet:
+        sender = BulkSender(wallet, **options)
+
+    return sender
@@ -0,0 +1,141 @@
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+CacheKey = tuple[int, str, Hashable, int]
+
+
+@dataclass(kw_only=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    joined: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.misses + self.joined
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of reads served without sending an own RPC request, either from the cache or by joining a request
+        already in flight
+        :return: Hit rate in range from 0 to 1
+        """
+        requests = self.requests
+        return (self.hits + self.joined) / requests if requests else 0.0
+
+
+class ReadCache:
+    """
+    Block-scoped cache of read-only RPC results, keyed by (chain_id, method, params, block).
+    Entries of a chain are dropped as soon as a newer block head is seen. Concurrent identical reads are deduplicated,
+    so only one request per key is in flight and all callers await it. The request runs in its own task, so
+    cancellation of one caller doesn't cancel the others. The cache can be shared by many AsyncWallet instances
+    """
+
+    def __init__(self, block_ttl: float = 1.0, max_size: int = 100_000):
+        """
+        :param block_ttl: Seconds during which the known block head is considered actual before it is requested again
+        :param max_size: Maximum number of cached results per chain
+        """
+        self._block_ttl = block_ttl
+        self._max_size = max_size
+        self._entries: dict[int, dict[CacheKey, Any]] = {}
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self._heads: dict[int, tuple[int, float]] = {}
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Counters of cache hits, misses and reads joined to requests in flight
+        :return: CacheStats instance
+        """
+        return self._stats
+
+    def get_head(self, chain_id: int) -> int | None:
+        head = self._heads.get(chain_id)
+        return head[0] if head else None
+
+    def advance(self, chain_id: int, block: int) -> None:
+        """
+        Sets the block head of the chain, dropping results of older blocks. Called on new block heads
+        :param chain_id: Chain id of the network
+        :param block: Number of the new block head
+        :return: None
+        """
+        head = self._heads.get(chain_id)
+        if head is not None and block < head[0]:
+            return
+
+        self._heads[chain_id] = (block, time.monotonic())
+        if head is None or block > head[0]:
+            self._entries.pop(chain_id, None)
+
+    async def head(self, chain_id: int, fetch_block_number: Callable[[], Awaitable[int]]) -> int:
+        """
+        Returns the block head of the chain, requesting it if the known one is older than block_ttl
+        :param chain_id: Chain id of the network
+        :param fetch_block_number: Function returning awaitable of the latest block number
+        :return: Number of the block head
+        """
+        head = self._heads.get(chain_id)
+        if head is not None and time.monotonic() - head[1] < self._block_ttl:
+            return head[0]
+
+        block = await self._single_flight((chain_id, 'eth_blockNumber'), fetch_block_number)
+        self.advance(chain_id, block)
+        return self._heads[chain_id][0]
+
+    async def get(self, key: CacheKey, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the cached result for the key or fetches it, joining a request already in flight for the same key
+        :param key: Tuple of chain id, RPC method, hashable params and block number
+        :param fetch: Function returning awaitable of the result
+        :return: Result of the read
+        """
+        chain_id, _, _, block = key
+        entries = self._entries.setdefault(chain_id, {})
+
+        if key in entries:
+            self._stats.hits += 1
+            return entries[key]
+
+        value = await self._single_flight(key, fetch, count=True)
+
+        head = self.get_head(chain_id)
+        if head is None or block >= head:
+            entries = self._entries.setdefault(chain_id, {})
+            if len(entries) >= self._max_size:
+                del entries[next(iter(entries))]
+            entries[key] = value
+
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._heads.clear()
+
+    async def _single_flight(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], count: bool = False) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            if count:
+                self._stats.joined += 1
+        else:
+            if count:
+                self._stats.misses += 1
+
+            task = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self._in_flight[key] = task
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import statistics
+from dataclasses import asdict
+from typing import Any, Optional
+from evm_wallet.types import Network, EndpointStats
+from evm_wallet._rpc import (make_async_provider, async_batch_request, acquire_transport, async_release_transport,
+                             get_result)
+
+RANKING_TTL = 24 * 60 * 60
+
+CANDIDATE_RPCS: dict[Network, tuple[str, ...]] = {
+    'Arbitrum': ('https://arb1.arbitrum.io/rpc', 'https://arbitrum.drpc.org', 'https://rpc.ankr.com/arbitrum'),
+    'Arbitrum Sepolia': ('https://sepolia-rollup.arbitrum.io/rpc',),
+    'Avalanche': ('https://api.avax.network/ext/bc/C/rpc', 'https://avalanche.drpc.org'),
+    'Base': ('https://mainnet.base.org', 'https://base.llamarpc.com', 'https://base.drpc.org'),
+    'Base Sepolia': ('https://sepolia.base.org',),
+    'BSC': ('https://bsc-dataseed.bnbchain.org', 'https://bsc.drpc.org', 'https://rpc.ankr.com/bsc'),
+    'BSC Testnet': ('https://data-seed-prebsc-1-s1.bnbchain.org:8545',),
+    'Ethereum': ('https://eth.llamarpc.com', 'https://rpc.ankr.com/eth', 'https://eth.drpc.org',
+                 'https://cloudflare-eth.com'),
+    'Fantom': ('https://rpcapi.fantom.network', 'https://fantom.drpc.org'),
+    'Fantom Testnet': ('https://rpc.testnet.fantom.network',),
+    'Fuji': ('https://api.avax-test.network/ext/bc/C/rpc',),
+    'Linea': ('https://linea-rpc.publicnode.com', 'https://linea.drpc.org'),
+    'opBNB': ('https://opbnb-mainnet-rpc.bnbchain.org',),
+    'opBNB Testnet': ('https://opbnb-testnet-rpc.bnbchain.org',),
+    'Optimism': ('https://mainnet.optimism.io', 'https://optimism.drpc.org'),
+    'Optimism Sepolia': ('https://sepolia.optimism.io',),
+    'Polygon': ('https://polygon-rpc.com', 'https://polygon.drpc.org'),
+    'Sepolia': ('https://sepolia.drpc.org', 'https://rpc.sepolia.org'),
+    'Scroll': ('https://scroll-rpc.publicnode.com', 'https://scroll.drpc.org'),
+    'zkSync': ('https://zksync.drpc.org',),
+}
+
+_rankings_cache: dict[str, tuple[float, dict[str, Any]]] = {}
+
+
+def get_ranking_path() -> str:
+    """
+    Returns path to the file with persisted rankings of endpoints in the user cache directory. The directory can be
+    overridden by EVM_WALLET_CACHE_DIR environment variable
+    :return: Path to the file
+    """
+    directory = os.environ.get('EVM_WALLET_CACHE_DIR')
+    if not directory:
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+        elif sys.platform == 'darwin':
+            base = os.path.expanduser('~/Library/Caches')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        directory = os.path.join(base, 'evm_wallet')
+
+    return os.path.join(directory, 'endpoints.json')
+
+
+def load_rankings(path: Optional[str] = None) -> dict[str, Any]:
+    """
+    Returns persisted rankings of endpoints per network name. The file is read again only if it was modified
+    :param path: Path to the file (default: get_ranking_path())
+    :return: Dictionary of network names and their rankings
+    """
+    path = path or get_ranking_path()
+    try:
+        modified_at = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    cached = _rankings_cache.get(path)
+    if cached is not None and cached[0] == modified_at:
+        return cached[1]
+
+    try:
+        with open(path) as file:
+            rankings = json.load(file)
+    except (OSError, ValueError):
+        rankings = {}
+
+    _rankings_cache[path] = (modified_at, rankings)
+    return rankings
+
+
+def save_ranking(network: str, ranking: list[EndpointStats], path: Optional[str] = None) -> None:
+    """
+    Persists ranking of endpoints of the network, keeping rankings of other networks
+    :param network: Name of the network
+    :param ranking: Stats of endpoints, the best first
+    :param path: Path to the file (default: get_ranking_path())
+    :return: None
+    """
+    path = path or get_ranking_path()
+    rankings = dict(load_rankings(path))
+    rankings[network] = {'probed_at': time.time(), 'endpoints': [asdict(stats) for stats in ranking]}
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(rankings, file, indent=2)
+    os.replace(temp_path, path)
+
+
+def select_endpoint(network: str, default: str, max_age: float = RANKING_TTL, path: Optional[str] = None) -> str:
+    """
+    Returns the best healthy endpoint of the network according to its persisted ranking
+    :param network: Name of the network
+    :param default: Endpoint returned if the ranking is absent, outdated or has no healthy endpoints
+    :param max_age: Maximum age of the ranking in seconds
+    :param path: Path to the file (default: get_ranking_path())
+    :return: URL of the endpoint
+    """
+    entry = load_rankings(path).get(network)
+    if not entry or time.time() - entry['probed_at'] > max_age:
+        return default
+
+    return next((stats['rpc'] for stats in entry['endpoints'] if stats['healthy']), default)
+
+
+async def _probe_endpoint(
+        rpc: str,
+        chain_id: Optional[int],
+        samples: int,
+        timeout: float
+) -> tuple[list[float], list[int], Optional[str]]:
+    latencies = []
+    heads = []
+    error = None
+
+    try:
+        provider = make_async_provider(rpc)
+    except ValueError as e:
+        return latencies, heads, repr(e)
+
+    provider.provider.middlewares = ()
+    acquire_transport(provider)
+
+    try:
+        for _ in range(samples):
+            started = time.perf_counter()
+            try:
+                chain_response, head_response = await asyncio.wait_for(
+                    async_batch_request(provider, [('eth_chainId', []), ('eth_blockNumber', [])]),
+                    timeout
+                )
+                served_chain_id = int(get_result(chain_response), 16)
+                if chain_id is not None and served_chain_id != chain_id:
+                    raise ValueError(f'Endpoint serves chain {served_chain_id} instead of {chain_id}')
+
+                heads.append(int(get_result(head_response), 16))
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                error = f'Timed out after {timeout} seconds' if isinstance(e, asyncio.TimeoutError) else repr(e)
+    finally:
+        await async_release_transport(provider)
+
+    return latencies, heads, error
+
+
+async def probe_endpoints(
+        candidates: list[str],
+        chain_id: Optional[int] = None,
+        samples: int = 5,
+        timeout: float = 3.0,
+        max_lag: int = 5,
+        max_error_rate: float = 0.2
+) -> list[EndpointStats]:
+    """
+    Measures latency, head freshness and error rate of endpoints concurrently and ranks them. An endpoint is healthy
+    if it serves the right chain, its error rate is acceptable and its head doesn't lag behind the best head
+    :param candidates: URLs of HTTP or WebSocket endpoints
+    :param chain_id: Expected chain id. Endpoints serving another chain fail every sample
+    :param samples: Number of requests sent to every endpoint
+    :param timeout: Maximum time of one request in seconds
+    :param max_lag: Maximum number of blocks, the head of a healthy endpoint can lag behind the best head
+    :param max_error_rate: Maximum share of failed requests of a healthy endpoint
+    :return: Stats of endpoints, healthy ones first ordered by median latency
+    """
+    probes = await asyncio.gather(*(_probe_endpoint(rpc, chain_id, samples, timeout) for rpc in candidates))
+    best_head = max((max(heads) for _, heads, _ in probes if heads), default=None)
+
+    ranking = []
+    for rpc, (latencies, heads, error) in zip(candidates, probes):
+        errors = samples - len(latencies)
+        head = max(heads) if heads else None
+        lag = best_head - head if head is not None else None
+
+        ranking.append(EndpointStats(
+            rpc=rpc,
+            samples=samples,
+            errors=errors,
+            latency=statistics.median(latencies) if latencies else None,
+            head=head,
+            lag=lag,
+            healthy=lag is not None and lag <= max_lag and errors / samples <= max_error_rate,
+            error=error
+        ))
+
+    ranking.sort(key=lambda stats: (not stats.healthy, stats.latency if stats.latency is not None else float('inf')))
+    return ranking
+
+
+async def rank_endpoints(
+        network: Network,
+        candidates: Optional[list[str]] = None,
+        samples: int = 5,
+        timeout: float = 3.0,
+        persist: bool = True
+) -> list[EndpointStats]:
+    """
+    Probes candidate endpoints of the supported network and persists the ranking, so wallets created by the network
+    name use the fastest healthy endpoint
+
+    Usage Example
+    ----------
+        ranking = asyncio.run(rank_endpoints('Ethereum'))
+        wallet = Wallet(private_key, 'Ethereum')  # connected to ranking[0].rpc, if it is healthy
+
+    :param network: Name of the supported network
+    :param candidates: URLs of endpoints. The default endpoint of the network and known public endpoints are probed if
+    not provided
+    :param samples: Number of requests sent to every endpoint
+    :param timeout: Maximum time of one request in seconds
+    :param persist: Whether to save the ranking to the user cache directory (default: True)
+    :return: Stats of endpoints, healthy ones first ordered by median latency
+    """
+    from evm_wallet._base_wallet import _BaseWallet
+
+    network_info = _BaseWallet.get_network_map()[network]
+    if candidates is None:
+        candidates = list(dict.fromkeys([network_info['rpc'], *CANDIDATE_RPCS.get(network, ())]))
+
+    ranking = await probe_endpoints(candidates, network_info.get('chain_id'), samples, timeout)
+    if persist:
+        save_ranking(network, ranking)
+
+    return ranking
@@ -0,0 +1,87 @@
+from eth_typing import HexStr
+from web3.exceptions import BadFunctionCallOutput
+
+TRANSFER_SELECTOR = '0xa9059cbb'
+APPROVE_SELECTOR = '0x095ea7b3'
+BALANCE_OF_SELECTOR = '0x70a08231'
+ALLOWANCE_SELECTOR = '0xdd62ed3e'
+
+MAX_UINT256 = 2 ** 256 - 1
+
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+_ADDRESS_PADDING = '0' * 24
+
+
+def _encode_address(address: str) -> str:
+    if not isinstance(address, str):
+        raise TypeError(f'Address must be a hex string, got {type(address)}')
+
+    if len(address) != 42 or not address.startswith('0x') or not _HEX_DIGITS.issuperset(address[2:]):
+        raise ValueError(f'Invalid address is provided: {address}')
+
+    return _ADDRESS_PADDING + address[2:].lower()
+
+
+def _encode_uint256(value: int) -> str:
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError(f'Amount must be an integer, got {type(value)}')
+
+    if not 0 <= value <= MAX_UINT256:
+        raise ValueError(f'Amount {value} is out of uint256 range')
+
+    return format(value, '064x')
+
+
+def encode_transfer(recipient: str, amount: int) -> HexStr:
+    """
+    Returns calldata of transfer(address,uint256)
+    :param recipient: Address of the recipient
+    :param amount: Quantity of token in Wei units
+    :return: Calldata as HexStr
+    """
+    return HexStr(TRANSFER_SELECTOR + _encode_address(recipient) + _encode_uint256(amount))
+
+
+def encode_approve(spender: str, amount: int) -> HexStr:
+    """
+    Returns calldata of approve(address,uint256)
+    :param spender: Address of the spender
+    :param amount: Quantity of token in Wei units
+    :return: Calldata as HexStr
+    """
+    return HexStr(APPROVE_SELECTOR + _encode_address(spender) + _encode_uint256(amount))
+
+
+def encode_balance_of(account: str) -> HexStr:
+    """
+    Returns calldata of balanceOf(address)
+    :param account: Address of the account
+    :return: Calldata as HexStr
+    """
+    return HexStr(BALANCE_OF_SELECTOR + _encode_address(account))
+
+
+def encode_allowance(owner: str, spender: str) -> HexStr:
+    """
+    Returns calldata of allowance(address,address)
+    :param owner: Address of the owner
+    :param spender: Address of the spender
+    :return: Calldata as HexStr
+    """
+    return HexStr(ALLOWANCE_SELECTOR + _encode_address(owner) + _encode_address(spender))
+
+
+def decode_uint256(data: bytes | str) -> int:
+    """
+    Decodes uint256 returned by balanceOf, allowance, totalSupply and similar methods
+    :param data: Returned data as bytes or hex string
+    :return: Decoded integer. Raises BadFunctionCallOutput if no data is returned, e.g. the contract doesn't exist
+    """
+    if isinstance(data, str):
+        data = bytes.fromhex(data.removeprefix('0x'))
+
+    if len(data) < 32:
+        raise BadFunctionCallOutput(f'Could not decode uint256 from {len(data)} bytes of returned data. Is the '
+                                    f'address a deployed ERC20 contract?')
+
+    return int.from_bytes(data[:32], 'big')
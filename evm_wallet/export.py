@@ -0,0 +1,285 @@
+import csv
+import asyncio
+from itertools import islice
+from typing import Any, AsyncIterable, Iterable, Literal, Optional, Self
+from eth_typing import ChecksumAddress
+from eth_utils import to_checksum_address
+from web3 import AsyncWeb3
+from evm_wallet.types import Network, NetworkInfo, AnyAddress, TransferEvent
+from evm_wallet._base_wallet import _BaseWallet, ZERO_ADDRESS
+from evm_wallet._rpc import async_batch_request, make_async_provider, acquire_transport, async_release_transport
+from evm_wallet.retry import DEFAULT_RETRY_POLICY
+from evm_wallet.portfolio import _balance_of_call, _to_int
+
+ExportFormat = Literal['csv', 'parquet', 'arrow']
+
+BALANCE_COLUMNS = ('network', 'account', 'token', 'balance', 'error')
+TRANSFER_COLUMNS = ('token', 'sender', 'recipient', 'amount', 'block_number', 'log_index', 'tx_hash')
+
+_INT_COLUMNS = {'block_number', 'log_index'}
+_FORMAT_SUFFIXES = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError('pyarrow is required to export Parquet and Arrow files. '
+                          'Install it with `pip install evm-wallet[arrow]`') from e
+
+    return pyarrow
+
+
+def _infer_format(path: str) -> ExportFormat:
+    for suffix, format_ in _FORMAT_SUFFIXES.items():
+        if path.lower().endswith(suffix):
+            return format_
+
+    raise ValueError(f'Cannot infer export format from path {path}, specify it explicitly')
+
+
+class ColumnarWriter:
+    """
+    Streaming writer of rows to CSV, Parquet or Arrow IPC file. Rows are buffered up to the buffer size and then
+    written as one batch, so memory usage doesn't depend on the number of rows. Integers exceeding 64 bits, e.g.
+    balances, are written as strings. Arrow IPC files can be opened with pyarrow.memory_map for zero-copy reading.
+    Parquet and Arrow formats require pyarrow
+    """
+
+    def __init__(
+            self,
+            path: str,
+            columns: tuple[str, ...],
+            format: Optional[ExportFormat] = None,
+            buffer_size: int = 10_000
+    ):
+        """
+        :param path: Path to the output file
+        :param columns: Names of columns
+        :param format: Format of the file. Inferred from the file extension if not provided
+        :param buffer_size: Maximum number of rows kept in memory before being written
+        """
+        self._path = path
+        self._columns = columns
+        self._format = format or _infer_format(path)
+        self._buffer_size = buffer_size
+        self._rows: list[tuple] = []
+        self._rows_written = 0
+
+        if self._format == 'csv':
+            self._file = open(path, 'w', newline='')
+            self._csv_writer = csv.writer(self._file)
+            self._csv_writer.writerow(columns)
+        elif self._format in ('parquet', 'arrow'):
+            pyarrow = self._pyarrow = _import_pyarrow()
+            self._schema = pyarrow.schema([
+                (column, pyarrow.int64() if column in _INT_COLUMNS else pyarrow.string()) for column in columns
+            ])
+
+            if self._format == 'parquet':
+                from pyarrow import parquet
+                self._writer = parquet.ParquetWriter(path, self._schema)
+            else:
+                self._writer = pyarrow.ipc.new_file(path, self._schema)
+        else:
+            raise ValueError(f'Unsupported export format: {format}')
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def rows_written(self) -> int:
+        return self._rows_written + len(self._rows)
+
+    def write(self, row: tuple) -> None:
+        """
+        Adds row to the buffer, writing the buffer if it is full
+        :param row: Values in the order of columns
+        :return: None
+        """
+        self._rows.append(row)
+        if len(self._rows) >= self._buffer_size:
+            self.flush()
+
+    def write_many(self, rows: Iterable[tuple]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """
+        Writes buffered rows to the file
+        :return: None
+        """
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+
+        if self._format == 'csv':
+            self._csv_writer.writerows(rows)
+        else:
+            arrays = [
+                self._pyarrow.array(
+                    values if column in _INT_COLUMNS else [None if value is None else str(value) for value in values],
+                    type=field.type
+                )
+                for column, field, values in zip(self._columns, self._schema, zip(*rows))
+            ]
+            self._writer.write_batch(self._pyarrow.record_batch(arrays, schema=self._schema))
+
+        self._rows_written += len(rows)
+
+    def close(self) -> None:
+        self.flush()
+        if self._format == 'csv':
+            self._file.close()
+        else:
+            self._writer.close()
+
+
+async def export_balances(
+        path: str,
+        accounts: Iterable[AnyAddress],
+        networks: list[Network | NetworkInfo],
+        tokens: Optional[dict[str, list[AnyAddress]]] = None,
+        format: Optional[ExportFormat] = None,
+        batch_size: int = 100,
+        concurrency: int = 8,
+        buffer_size: int = 10_000
+) -> int:
+    """
+    Streams native and token balances of many accounts on many networks to the file. Accounts are consumed lazily and
+    queried in batch requests, a bounded number of them in flight, and rows are written in the order they arrive, so
+    memory usage doesn't depend on the number of accounts. Failed requests are written as rows with an error, while
+    other failures stop the export and are raised
+
+    Usage Example
+    ----------
+        accounts = (line.strip() for line in open('accounts.txt'))
+        await export_balances('balances.parquet', accounts, ['Ethereum', 'Arbitrum'], {'Ethereum': [usdt_address]})
+
+    :param path: Path to the output file
+    :param accounts: Addresses of accounts
+    :param networks: Networks to be queried
+    :param tokens: Addresses of tokens to be queried per network name. Native balance is always queried and written
+    with the zero address as the token
+    :param format: Format of the file. Inferred from the file extension if not provided
+    :param batch_size: Maximum number of calls in one batch request
+    :param concurrency: Maximum number of batch requests in flight
+    :param buffer_size: Maximum number of rows kept in memory before being written
+    :return: Number of written rows
+    """
+    tokens = tokens or {}
+    network_infos = [_BaseWallet._to_network_info(network) for network in networks]
+    network_tokens = {
+        network_info['network']: [to_checksum_address(token) for token in tokens.get(network_info['network'], [])]
+        for network_info in network_infos
+    }
+    max_tokens = max(map(len, network_tokens.values()), default=0)
+    chunk_size = max(1, batch_size // (max_tokens + 1))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+    failed = []
+    providers = {}
+
+    def finish(task: asyncio.Task) -> None:
+        # Failed tasks are kept to be gathered, so their exceptions aren't lost
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            failed.append(task)
+
+    def get_provider(rpc: str) -> AsyncWeb3:
+        provider = providers.get(rpc)
+        if provider is None:
+            provider = providers[rpc] = make_async_provider(rpc)
+            DEFAULT_RETRY_POLICY.install(provider)
+            acquire_transport(provider)
+
+        return provider
+
+    with ColumnarWriter(path, BALANCE_COLUMNS, format, buffer_size) as writer:
+        async def query(network_info: NetworkInfo, chunk: list[ChecksumAddress]) -> None:
+            try:
+                name = network_info['network']
+                token_addresses = network_tokens[name]
+                provider = get_provider(network_info['rpc'])
+
+                pairs = []
+                calls = []
+                for account in chunk:
+                    pairs.append((account, ZERO_ADDRESS))
+                    calls.append(('eth_getBalance', [account, 'latest']))
+                    for token in token_addresses:
+                        pairs.append((account, token))
+                        calls.append(_balance_of_call(token, account))
+
+                try:
+                    responses = await async_batch_request(provider, calls)
+                except Exception as e:
+                    responses = [{'error': repr(e)}] * len(calls)
+
+                for (account, token), response in zip(pairs, responses):
+                    error = response.get('error')
+                    if error is None:
+                        writer.write((name, account, token, _to_int(response.get('result')), None))
+                    else:
+                        error = error.get('message', error) if isinstance(error, dict) else error
+                        writer.write((name, account, token, None, str(error)))
+            finally:
+                semaphore.release()
+
+        accounts = (to_checksum_address(account) for account in accounts)
+        while not failed and (chunk := list(islice(accounts, chunk_size))):
+            for network_info in network_infos:
+                await semaphore.acquire()
+                task = asyncio.create_task(query(network_info, chunk))
+                tasks.add(task)
+                task.add_done_callback(finish)
+
+        try:
+            await asyncio.gather(*tasks, *failed)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            for provider in providers.values():
+                await async_release_transport(provider)
+
+        return writer.rows_written
+
+
+async def export_transfers(
+        path: str,
+        transfers: AsyncIterable[TransferEvent],
+        format: Optional[ExportFormat] = None,
+        buffer_size: int = 10_000
+) -> int:
+    """
+    Streams transfer events, e.g. from AsyncWallet.iter_transfers, to the file
+    :param path: Path to the output file
+    :param transfers: Async iterable of TransferEvent
+    :param format: Format of the file. Inferred from the file extension if not provided
+    :param buffer_size: Maximum number of rows kept in memory before being written
+    :return: Number of written rows
+    """
+    with ColumnarWriter(path, TRANSFER_COLUMNS, format, buffer_size) as writer:
+        async for transfer in transfers:
+            writer.write((
+                transfer.token,
+                transfer.sender,
+                transfer.recipient,
+                transfer.amount,
+                transfer.block_number,
+                transfer.log_index,
+                transfer.tx_hash
+            ))
+
+        return writer.rows_written
@@ -0,0 +1,108 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3.types import TxParams, Wei
+from evm_wallet.cache import CacheStats
+
+GasKey = tuple[int, Optional[ChecksumAddress], str]
+
+
+@dataclass(kw_only=True)
+class _GasEstimate:
+    gas: int
+    uses: int
+    estimated_at: float
+
+
+def _get_selector(tx_params: TxParams) -> str:
+    data = tx_params.get('data') or '0x'
+    if isinstance(data, bytes):
+        data = HexBytes(data).hex()
+
+    return data[:10].lower()
+
+
+class GasEstimateCache:
+    """
+    Cache of gas estimates keyed by (chain_id, to, selector), so repeated calls of the same method, e.g. transfer of
+    the same token with different amounts, don't need estimate_gas every time. Estimates are revalidated after a number
+    of uses or time to live and are multiplied by the safety multiplier both when they are fresh and cached, so
+    wallets get the same gas limit either way.
+
+    A cached estimate may be lower than the call needs, since gas depends on arguments and state. E.g. an ERC20
+    transfer to a new holder writes a new storage slot and costs about 1.5 times more than a transfer to an existing
+    one, so a lower multiplier can make such transactions run out of gas
+    """
+
+    def __init__(self, multiplier: float = 1.5, revalidate_after: int = 100, ttl: float = 300.0):
+        """
+        :param multiplier: Safety multiplier applied to estimates
+        :param revalidate_after: Number of uses of an estimate before it is estimated again
+        :param ttl: Seconds after which an estimate is estimated again
+        """
+        self._multiplier = multiplier
+        self._revalidate_after = revalidate_after
+        self._ttl = ttl
+        self._estimates: dict[GasKey, _GasEstimate] = {}
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    @staticmethod
+    def get_key(chain_id: int, tx_params: TxParams) -> Optional[GasKey]:
+        """
+        Returns the key of the call shape of the transaction
+        :param chain_id: Chain id of the network
+        :param tx_params: Params of built transaction
+        :return: Tuple of chain id, recipient and selector or None for contract deployments, which are not cached
+        """
+        to = tx_params.get('to')
+        if not to:
+            return None
+
+        return chain_id, to, _get_selector(tx_params)
+
+    def get(self, chain_id: int, tx_params: TxParams) -> Optional[Wei]:
+        """
+        Returns cached estimate for the call shape of the transaction, multiplied by the safety multiplier
+        :param chain_id: Chain id of the network
+        :param tx_params: Params of built transaction
+        :return: Gas in Wei units or None if the estimate is absent or has to be revalidated
+        """
+        key = self.get_key(chain_id, tx_params)
+        estimate = self._estimates.get(key) if key else None
+
+        if (estimate is None or
+                estimate.uses >= self._revalidate_after or
+                time.monotonic() - estimate.estimated_at >= self._ttl):
+            self._stats.misses += 1
+            return None
+
+        estimate.uses += 1
+        self._stats.hits += 1
+        return self._apply_multiplier(estimate.gas)
+
+    def put(self, chain_id: int, tx_params: TxParams, gas: int) -> Wei:
+        """
+        Stores fresh estimate for the call shape of the transaction
+        :param chain_id: Chain id of the network
+        :param tx_params: Params of built transaction
+        :param gas: Estimated gas
+        :return: Estimate multiplied by the safety multiplier, the same as get returns for it
+        """
+        key = self.get_key(chain_id, tx_params)
+        if key is not None:
+            self._estimates[key] = _GasEstimate(gas=gas, uses=0, estimated_at=time.monotonic())
+
+        return self._apply_multiplier(gas)
+
+    def _apply_multiplier(self, gas: int) -> Wei:
+        return Wei(math.ceil(gas * self._multiplier))
+
+    def clear(self) -> None:
+        self._estimates.clear()
@@ -0,0 +1,194 @@
+import asyncio
+from collections import deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Literal, Optional
+from eth_typing import ChecksumAddress
+from eth_utils import keccak, to_checksum_address
+from web3 import AsyncWeb3
+from web3.types import RPCResponse
+from evm_wallet.types import TransferEvent, TransferCheckpoint
+from evm_wallet._base_wallet import _BaseWallet
+from evm_wallet._rpc import async_batch_request, RPCCall
+
+Direction = Literal['in', 'out', 'both']
+
+_LIMIT_ERROR_CODES = {-32005, -32602}
+_LIMIT_ERROR_MARKERS = ('limit', 'range', 'too many', 'too large', 'exceed', 'response size', 'timeout', 'timed out')
+
+
+@lru_cache()
+def _get_event_topic(name: str) -> str:
+    abi = next(entry for entry in _BaseWallet._get_erc20_abi() if entry['type'] == 'event' and entry['name'] == name)
+    signature = f'{name}({",".join(arg["type"] for arg in abi["inputs"])})'
+    return '0x' + keccak(text=signature).hex()
+
+
+@lru_cache(maxsize=4096)
+def _topic_to_address(topic: str) -> ChecksumAddress:
+    return to_checksum_address('0x' + topic[-40:])
+
+
+def _address_to_topic(address: str) -> str:
+    return '0x' + address[2:].lower().rjust(64, '0')
+
+
+class LogsQueryError(ValueError):
+    def __init__(self, error: dict[str, Any] | str):
+        self.code = error.get('code') if isinstance(error, dict) else None
+        message = error.get('message', str(error)) if isinstance(error, dict) else error
+        super().__init__(message)
+
+    @property
+    def is_limit_error(self) -> bool:
+        message = str(self).lower()
+        return self.code in _LIMIT_ERROR_CODES or any(marker in message for marker in _LIMIT_ERROR_MARKERS)
+
+
+class TransferIndexer:
+    """
+    Streams ERC20 Transfer events of the account through eth_getLogs. Block range is split into windows fetched in
+    parallel, window size adapts to result limits of the provider
+    """
+
+    def __init__(
+            self,
+            provider: AsyncWeb3,
+            account: ChecksumAddress,
+            window: int = 2_000,
+            max_window: int = 100_000,
+            concurrency: int = 4
+    ):
+        """
+        :param provider: AsyncWeb3 instance to be used
+        :param account: Address of the account, whose transfers are streamed
+        :param window: Initial number of blocks requested by one eth_getLogs call
+        :param max_window: Maximum number of blocks requested by one eth_getLogs call
+        :param concurrency: Maximum number of windows fetched at the same time
+        """
+        self._provider = provider
+        self._account = account
+        self._account_topic = _address_to_topic(account)
+        self._window = window
+        self._max_window = max_window
+        self._concurrency = concurrency
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    async def stream(
+            self,
+            from_block: int,
+            to_block: int,
+            tokens: Optional[list[ChecksumAddress]] = None,
+            direction: Direction = 'both',
+            checkpoint: Optional[TransferCheckpoint] = None
+    ) -> AsyncIterator[TransferEvent]:
+        """
+        Yields transfers in order of block number and log index
+        :param from_block: First block of the range
+        :param to_block: Last block of the range
+        :param tokens: Addresses of tokens to be watched. All tokens are watched if not provided
+        :param direction: Whether to stream incoming, outgoing or both transfers
+        :param checkpoint: Checkpoint advanced after all transfers of a window are yielded
+        :return: Async iterator of TransferEvent
+        """
+        pending: deque[tuple[int, asyncio.Task]] = deque()
+        cursor = from_block
+
+        try:
+            while cursor <= to_block or pending:
+                while cursor <= to_block and len(pending) < self._concurrency:
+                    end = min(cursor + self._window - 1, to_block)
+                    task = asyncio.create_task(self._fetch(cursor, end, tokens, direction))
+                    pending.append((end, task))
+                    cursor = end + 1
+
+                end, task = pending.popleft()
+                for event in await task:
+                    yield event
+
+                if checkpoint is not None:
+                    checkpoint.next_block = end + 1
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _fetch(
+            self,
+            start: int,
+            end: int,
+            tokens: Optional[list[ChecksumAddress]],
+            direction: Direction
+    ) -> list[TransferEvent]:
+        try:
+            responses = await async_batch_request(self._provider, self._get_logs_calls(start, end, tokens, direction))
+            events = self._decode(responses, direction)
+        except LogsQueryError as e:
+            if start == end or not e.is_limit_error:
+                raise
+
+            middle = (start + end) // 2
+            self._window = max(1, min(self._window, middle - start + 1))
+            return (await self._fetch(start, middle, tokens, direction) +
+                    await self._fetch(middle + 1, end, tokens, direction))
+
+        if end - start + 1 >= self._window:
+            self._window = min(self._max_window, self._window + self._window // 4 + 1)
+
+        return events
+
+    def _get_logs_calls(
+            self,
+            start: int,
+            end: int,
+            tokens: Optional[list[ChecksumAddress]],
+            direction: Direction
+    ) -> list[RPCCall]:
+        topic = _get_event_topic('Transfer')
+        topics = []
+        if direction in ('out', 'both'):
+            topics.append([topic, self._account_topic])
+        if direction in ('in', 'both'):
+            topics.append([topic, None, self._account_topic])
+
+        calls = []
+        for log_topics in topics:
+            log_filter = {'fromBlock': hex(start), 'toBlock': hex(end), 'topics': log_topics}
+            if tokens:
+                log_filter['address'] = tokens
+            calls.append(('eth_getLogs', [log_filter]))
+
+        return calls
+
+    def _decode(self, responses: list[RPCResponse], direction: Direction) -> list[TransferEvent]:
+        account = self._account
+        events = []
+
+        for index, response in enumerate(responses):
+            if 'error' in response:
+                raise LogsQueryError(response['error'])
+
+            skip_self_transfers = direction == 'both' and index == 1
+            for log in response['result']:
+                topics = log['topics']
+                if len(topics) != 3 or log.get('removed'):
+                    continue
+
+                sender = _topic_to_address(topics[1])
+                if skip_self_transfers and sender == account:
+                    continue
+
+                data = log['data']
+                events.append(TransferEvent(
+                    token=_topic_to_address(log['address']),
+                    sender=sender,
+                    recipient=_topic_to_address(topics[2]),
+                    amount=int(data, 16) if data != '0x' else 0,
+                    block_number=int(log['blockNumber'], 16),
+                    log_index=int(log['logIndex'], 16),
+                    tx_hash=log['transactionHash']
+                ))
+
+        events.sort(key=lambda event: (event.block_number, event.log_index))
+        return events
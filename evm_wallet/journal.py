@@ -0,0 +1,162 @@
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from hexbytes import HexBytes
+from eth_typing import ChecksumAddress
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    nonce INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    raw_tx BLOB NOT NULL,
+    confirmed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (chain_id, address, tx_hash)
+);
+CREATE INDEX IF NOT EXISTS transactions_nonce ON transactions (chain_id, address, nonce);
+"""
+
+
+@dataclass(frozen=True, kw_only=True)
+class JournalEntry:
+    chain_id: int
+    address: ChecksumAddress
+    nonce: int
+    tx_hash: HexBytes
+    raw_tx: HexBytes
+    created_at: float
+
+
+class NonceJournal:
+    """
+    Durable SQLite journal of allocated nonces and signed raw transactions per (chain_id, address). Transactions are
+    recorded before broadcasting, so after a restart wallets continue from the right nonce and unconfirmed
+    transactions can be rebroadcast without re-signing. Transactions rejected by the node are discarded, and
+    rebroadcast discards the first transaction the node rejects again with all later ones, so failed broadcasts don't
+    leave nonce gaps. Transactions failed with transient errors are kept, since they may have reached the node. One
+    journal can be shared by many wallets and threads
+    """
+
+    def __init__(self, path: str = 'evm_wallet_journal.sqlite3'):
+        """
+        :param path: Path to the SQLite database file
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def record(self, chain_id: int, address: ChecksumAddress, nonce: int, tx_hash: HexBytes, raw_tx: bytes) -> None:
+        """
+        Records signed transaction
+        :param chain_id: Chain id of the network
+        :param address: Address of the sender
+        :param nonce: Nonce of the transaction
+        :param tx_hash: Transaction hash
+        :param raw_tx: Signed raw transaction
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO transactions (chain_id, address, nonce, tx_hash, raw_tx, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (chain_id, address, nonce, HexBytes(tx_hash).hex(), bytes(raw_tx), time.time())
+            )
+
+    def confirm(self, chain_id: int, address: ChecksumAddress, next_nonce: int) -> None:
+        """
+        Marks all transactions with nonce lower than the given one as confirmed
+        :param chain_id: Chain id of the network
+        :param address: Address of the sender
+        :param next_nonce: Confirmed transaction count of the address
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                'UPDATE transactions SET confirmed = 1 WHERE chain_id = ? AND address = ? AND nonce < ? '
+                'AND confirmed = 0',
+                (chain_id, address, next_nonce)
+            )
+
+    def discard(self, chain_id: int, address: ChecksumAddress, tx_hash: HexBytes) -> None:
+        """
+        Removes unconfirmed transaction, e.g. rejected by the node
+        :param chain_id: Chain id of the network
+        :param address: Address of the sender
+        :param tx_hash: Transaction hash
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM transactions WHERE chain_id = ? AND address = ? AND tx_hash = ? AND confirmed = 0',
+                (chain_id, address, HexBytes(tx_hash).hex())
+            )
+
+    def discard_from(self, chain_id: int, address: ChecksumAddress, nonce: int) -> None:
+        """
+        Removes unconfirmed transactions with the given or higher nonce
+        :param chain_id: Chain id of the network
+        :param address: Address of the sender
+        :param nonce: The lowest removed nonce
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM transactions WHERE chain_id = ? AND address = ? AND nonce >= ? AND confirmed = 0',
+                (chain_id, address, nonce)
+            )
+
+    def last_nonce(self, chain_id: int, address: ChecksumAddress) -> Optional[int]:
+        """
+        Returns the highest nonce recorded for the address
+        :param chain_id: Chain id of the network
+        :param address: Address of the sender
+        :return: Nonce or None, if nothing is recorded
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT MAX(nonce) FROM transactions WHERE chain_id = ? AND address = ?',
+                (chain_id, address)
+            ).fetchone()
+
+        return row[0]
+
+    def unconfirmed(self, chain_id: int, address: ChecksumAddress) -> list[JournalEntry]:
+        """
+        Returns the latest recorded transaction of every unconfirmed nonce, ordered by nonce
+        :param chain_id: Chain id of the network
+        :param address: Address of the sender
+        :return: List of JournalEntry
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT nonce, tx_hash, raw_tx, created_at FROM transactions '
+                'WHERE chain_id = ? AND address = ? AND confirmed = 0 ORDER BY nonce, created_at',
+                (chain_id, address)
+            ).fetchall()
+
+        latest = {
+            nonce: JournalEntry(
+                chain_id=chain_id,
+                address=address,
+                nonce=nonce,
+                tx_hash=HexBytes(tx_hash),
+                raw_tx=HexBytes(raw_tx),
+                created_at=created_at
+            )
+            for nonce, tx_hash, raw_tx, created_at in rows
+        }
+        return list(latest.values())
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
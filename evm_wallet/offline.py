@@ -0,0 +1,306 @@
+import os
+import rlp
+import struct
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from hexbytes import HexBytes
+from eth_account import Account
+from eth_account.datastructures import SignedTransaction
+from eth_typing import ChecksumAddress, HexStr
+from eth_utils import keccak, to_checksum_address
+from web3.types import TxParams, Wei
+from evm_wallet.types import AnyAddress, TokenAmount, BroadcastResult
+from evm_wallet._rpc import (async_batch_request, make_async_provider, acquire_transport, async_release_transport,
+                             is_duplicate_transaction_error)
+
+RAW_FILE_MAGIC = b'EVMRAW1\n'
+_LENGTH = struct.Struct('>I')
+
+
+def write_raw_transactions(path: str, raw_transactions: Iterable[bytes]) -> int:
+    """
+    Writes signed raw transactions to the compact binary file. Every record is prefixed with its 4-byte length
+    :param path: Path to the file
+    :param raw_transactions: Signed raw transactions
+    :return: Number of written transactions
+    """
+    count = 0
+    with open(path, 'wb') as file:
+        file.write(RAW_FILE_MAGIC)
+        for raw_transaction in raw_transactions:
+            file.write(_LENGTH.pack(len(raw_transaction)))
+            file.write(raw_transaction)
+            count += 1
+
+    return count
+
+
+def read_raw_transactions(path: str) -> Iterator[bytes]:
+    """
+    Streams signed raw transactions from the file written by write_raw_transactions
+    :param path: Path to the file
+    :return: Iterator of raw transactions
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(RAW_FILE_MAGIC)) != RAW_FILE_MAGIC:
+            raise ValueError(f'File is not a raw transaction file: {path}')
+
+        while header := file.read(_LENGTH.size):
+            raw_transaction = file.read(_LENGTH.unpack(header)[0])
+            yield raw_transaction
+
+
+def _decode_sender_and_nonce(raw_transaction: bytes) -> tuple[str, int]:
+    try:
+        sender = Account.recover_transaction(raw_transaction)
+        if raw_transaction[0] > 0x7f:
+            nonce = rlp.decode(raw_transaction)[0]
+        else:
+            nonce = rlp.decode(raw_transaction[1:])[1]
+    except Exception:
+        # Malformed transactions are still sent, so the node reports why they are invalid
+        return '', 0
+
+    return sender, int.from_bytes(nonce, 'big')
+
+
+def _sign_chunk(private_key: str, chunk: list[TxParams]) -> list[bytes]:
+    account = Account.from_key(private_key)
+    return [bytes(account.sign_transaction(tx_params).rawTransaction) for tx_params in chunk]
+
+
+class OfflineWallet:
+    """
+    Sign-only wallet for hosts without RPC access. Chain id, starting nonce and fees are provided explicitly, so no
+    requests are sent. Signed transactions can be exported to a compact file and broadcast elsewhere by
+    broadcast_raw_file
+
+    Usage Example
+    ----------
+        wallet = OfflineWallet(private_key, chain_id=1, nonce=42, max_fee_per_gas=..., max_priority_fee_per_gas=...)
+
+        transactions = ({'to': recipient, 'value': amount, 'gas': 21_000} for recipient, amount in payouts)
+        wallet.sign_many(transactions, 'payouts.raw')
+    """
+
+    def __init__(
+            self,
+            private_key: str,
+            chain_id: int,
+            nonce: int,
+            gas_price: Optional[Wei] = None,
+            max_fee_per_gas: Optional[Wei] = None,
+            max_priority_fee_per_gas: Optional[Wei] = None
+    ):
+        """
+        :param private_key: Private key of existing account
+        :param chain_id: Chain id of the network, transactions are signed for
+        :param nonce: Nonce of the first signed transaction
+        :param gas_price: Price of gas in Wei units for legacy transactions
+        :param max_fee_per_gas: Max fee per gas in Wei units for EIP-1559 transactions
+        :param max_priority_fee_per_gas: Max priority fee per gas in Wei units for EIP-1559 transactions
+        """
+        is_dynamic_fee = max_fee_per_gas is not None and max_priority_fee_per_gas is not None
+        if (gas_price is None) == (not is_dynamic_fee):
+            raise ValueError('Either gas_price or both max_fee_per_gas and max_priority_fee_per_gas must be provided')
+
+        self.__private_key = private_key
+        self.__account = Account.from_key(private_key)
+        self._chain_id = chain_id
+        self._nonce = nonce
+
+        if is_dynamic_fee:
+            self._fees = {'maxFeePerGas': max_fee_per_gas, 'maxPriorityFeePerGas': max_priority_fee_per_gas}
+        else:
+            self._fees = {'gasPrice': gas_price}
+
+    @property
+    def private_key(self) -> str:
+        return self.__private_key
+
+    @property
+    def public_key(self) -> ChecksumAddress:
+        return self.__account.address
+
+    @property
+    def chain_id(self) -> int:
+        return self._chain_id
+
+    @property
+    def nonce(self) -> int:
+        """
+        Nonce of the next signed transaction
+        :return: Nonce
+        """
+        return self._nonce
+
+    def build_tx_params(
+            self,
+            value: TokenAmount,
+            recipient: Optional[AnyAddress] = None,
+            raw_data: Optional[bytes | HexStr] = None,
+            gas: Wei = Wei(300_000)
+    ) -> TxParams:
+        """
+        Returns transaction's params with the next nonce and fees of the wallet
+        :param value: Quantity of network currency to be paid in Wei units
+        :param recipient: Address of recipient
+        :param raw_data: Transaction's data provided as HexStr or bytes
+        :param gas: Quantity of gas to be spent
+        :return: Transaction's params
+        """
+        tx_params = {'to': recipient, 'value': value, 'gas': gas}
+        if raw_data:
+            tx_params['data'] = raw_data
+
+        return self._complete(tx_params)
+
+    def sign(self, tx_params: TxParams) -> SignedTransaction:
+        """
+        Signs transaction. Nonce, chain id and fees are filled if absent
+        :param tx_params: Transaction's params
+        :return: Signed transaction
+        """
+        return self.__account.sign_transaction(self._complete(tx_params))
+
+    def sign_many(
+            self,
+            transactions: Iterable[TxParams],
+            path: str,
+            processes: Optional[int] = None,
+            chunk_size: int = 500
+    ) -> int:
+        """
+        Signs transactions on all CPU cores and writes them to the compact raw transaction file in the given order.
+        Nonces are allocated sequentially, chain id and fees are filled if absent. Transactions are consumed lazily,
+        only a few chunks per process are held in memory
+        :param transactions: Transactions' params
+        :param path: Path to the output file
+        :param processes: Number of signing processes (default: number of CPUs)
+        :param chunk_size: Number of transactions sent to a process at once
+        :return: Number of signed transactions
+        """
+        chunks = self._chunks(transactions, chunk_size)
+        processes = processes or os.cpu_count() or 1
+
+        if processes == 1:
+            signed_chunks = (_sign_chunk(self.__private_key, chunk) for chunk in chunks)
+            return write_raw_transactions(path, (raw for chunk in signed_chunks for raw in chunk))
+
+        with ProcessPoolExecutor(processes) as executor:
+            return write_raw_transactions(path, self._sign_in_pool(executor, chunks, 2 * processes))
+
+    def _sign_in_pool(
+            self,
+            executor: ProcessPoolExecutor,
+            chunks: Iterator[list[TxParams]],
+            max_pending: int
+    ) -> Iterator[bytes]:
+        pending: deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_sign_chunk, self.__private_key, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+    def _chunks(self, transactions: Iterable[TxParams], chunk_size: int) -> Iterator[list[TxParams]]:
+        transactions = iter(transactions)
+        while chunk := [self._complete(tx_params) for tx_params in islice(transactions, chunk_size)]:
+            yield chunk
+
+    def _complete(self, tx_params: TxParams) -> TxParams:
+        tx_params = {**self._fees, 'chainId': self._chain_id, **tx_params}
+        if tx_params.get('to'):
+            tx_params['to'] = to_checksum_address(tx_params['to'])
+        else:
+            tx_params.pop('to', None)
+
+        if 'nonce' not in tx_params:
+            tx_params['nonce'] = self._nonce
+            self._nonce += 1
+
+        return tx_params
+
+
+async def broadcast_raw_file(
+        path: str,
+        rpc: str,
+        concurrency: int = 16,
+        batch_size: int = 100
+) -> list[BroadcastResult]:
+    """
+    Streams signed raw transactions from the file to the network. Transactions are sent in batch requests, several
+    batches are in flight at the same time. Transactions of one sender are sent in nonce order: a batch is sorted by
+    nonce and waits for earlier batches containing the same senders, so the file is expected to list transactions of
+    every sender in nonce order, as sign_many writes them. Transactions already known by the node are reported as
+    successful, while a used nonce is reported as an error
+    :param path: Path to the file written by OfflineWallet.sign_many
+    :param rpc: URL of HTTP or WebSocket endpoint
+    :param concurrency: Maximum number of batches in flight
+    :param batch_size: Number of transactions in one batch request
+    :return: Results in the order of the file, containing transaction hashes and errors
+    """
+    provider = make_async_provider(rpc)
+    acquire_transport(provider)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[BroadcastResult] = []
+    last_tasks: dict[str, asyncio.Task] = {}
+    tasks = set()
+
+    async def send(transactions: list[tuple[int, str, int, bytes]], previous: set[asyncio.Task]) -> None:
+        try:
+            await asyncio.gather(*previous)
+
+            calls = [('eth_sendRawTransaction', [HexBytes(raw).hex()]) for *_, raw in transactions]
+            try:
+                responses = await async_batch_request(provider, calls)
+            except Exception as e:
+                responses = [{'error': repr(e)}] * len(transactions)
+
+            for (index, _, _, raw), response in zip(transactions, responses):
+                error = response.get('error')
+                if error is not None and is_duplicate_transaction_error(ValueError(error)):
+                    error = None
+
+                results[index] = BroadcastResult(
+                    index=index,
+                    tx_hash=HexBytes(keccak(raw)),
+                    error=None if error is None else str(error)
+                )
+        finally:
+            semaphore.release()
+
+    try:
+        raw_transactions = read_raw_transactions(path)
+        while batch := list(islice(raw_transactions, batch_size)):
+            await semaphore.acquire()
+            offset = len(results)
+            results.extend([None] * len(batch))
+
+            transactions = sorted(
+                ((index, *_decode_sender_and_nonce(raw), raw) for index, raw in enumerate(batch, offset)),
+                key=lambda transaction: transaction[1:3]
+            )
+            senders = {sender for _, sender, _, _ in transactions}
+            previous = {last_tasks[sender] for sender in senders if sender in last_tasks}
+
+            task = asyncio.create_task(send(transactions, previous))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda done, senders=senders: [
+                last_tasks.pop(sender) for sender in senders if last_tasks.get(sender) is done
+            ])
+            for sender in senders:
+                last_tasks[sender] = task
+
+        await asyncio.gather(*tasks)
+    finally:
+        await async_release_transport(provider)
+
+    return results
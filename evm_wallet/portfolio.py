@@ -0,0 +1,99 @@
+import time
+import asyncio
+from typing import Callable, Optional
+from eth_typing import ChecksumAddress
+from web3 import AsyncWeb3
+from web3.types import Wei, RPCResponse
+from evm_wallet.types import NetworkInfo, NetworkSnapshot, PortfolioSnapshot
+from evm_wallet._rpc import async_batch_request
+from evm_wallet.erc20 import encode_balance_of
+
+
+def _balance_of_call(token: ChecksumAddress, account: ChecksumAddress) -> tuple[str, list]:
+    return 'eth_call', [{'to': token, 'data': encode_balance_of(account)}, 'latest']
+
+
+def _to_int(result: str | None) -> int:
+    return int(result, 16) if result and result != '0x' else 0
+
+
+def _get_error(response: RPCResponse) -> Optional[str]:
+    error = response.get('error')
+    if error is None:
+        return None
+
+    return str(error.get('message', error) if isinstance(error, dict) else error)
+
+
+async def _snapshot_network(
+        provider: AsyncWeb3,
+        account: ChecksumAddress,
+        tokens: list[ChecksumAddress]
+) -> tuple[Wei, dict[ChecksumAddress, int], dict[ChecksumAddress, str]]:
+    calls = [('eth_getBalance', [account, 'latest'])]
+    calls.extend(_balance_of_call(token, account) for token in tokens)
+
+    native_response, *token_responses = await async_batch_request(provider, calls)
+    error = _get_error(native_response)
+    if error is not None:
+        raise ValueError(error)
+
+    token_balances = {}
+    token_errors = {}
+    for token, response in zip(tokens, token_responses):
+        error = _get_error(response)
+        if error is None:
+            token_balances[token] = _to_int(response['result'])
+        else:
+            token_errors[token] = error
+
+    return Wei(_to_int(native_response['result'])), token_balances, token_errors
+
+
+async def take_snapshot(
+        account: ChecksumAddress,
+        networks: list[NetworkInfo],
+        tokens: dict[str, list[ChecksumAddress]],
+        timeout: float,
+        get_provider: Callable[[str], AsyncWeb3]
+) -> PortfolioSnapshot:
+    """
+    Queries native and token balances of the account on all networks concurrently. Every network is queried in one batch
+    request. Failed or timed out networks are reported in the result and don't block the rest, and failed balances of
+    single tokens are reported per token
+    :param account: Address of the account
+    :param networks: Information about networks to be queried
+    :param tokens: Addresses of tokens to be queried per network name
+    :param timeout: Maximum time to query one network in seconds
+    :param get_provider: Function returning AsyncWeb3 instance for the endpoint, owned by the caller
+    :return: PortfolioSnapshot instance
+    """
+    async def query(network_info: NetworkInfo) -> NetworkSnapshot:
+        name = network_info['network']
+        started = time.perf_counter()
+
+        try:
+            native_balance, token_balances, token_errors = await asyncio.wait_for(
+                _snapshot_network(get_provider(network_info['rpc']), account, tokens.get(name, [])),
+                timeout
+            )
+        except Exception as e:
+            error = f'Timed out after {timeout} seconds' if isinstance(e, asyncio.TimeoutError) else repr(e)
+            return NetworkSnapshot(network=name, elapsed=time.perf_counter() - started, error=error)
+
+        return NetworkSnapshot(
+            network=name,
+            elapsed=time.perf_counter() - started,
+            native_balance=native_balance,
+            token_balances=token_balances,
+            token_errors=token_errors
+        )
+
+    started = time.perf_counter()
+    snapshots = await asyncio.gather(*(query(network_info) for network_info in networks))
+
+    return PortfolioSnapshot(
+        account=account,
+        elapsed=time.perf_counter() - started,
+        networks={snapshot.network: snapshot for snapshot in snapshots}
+    )
@@ -0,0 +1,249 @@
+import math
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, TYPE_CHECKING
+from hexbytes import HexBytes
+from eth_typing import ChecksumAddress
+from web3.types import TxParams, Wei
+
+if TYPE_CHECKING:
+    from evm_wallet.async_wallet import AsyncWallet
+
+logger = logging.getLogger(__name__)
+
+_MIN_FEE_BUMP = 1.1
+
+
+@dataclass(kw_only=True)
+class PendingTransaction:
+    wallet: 'AsyncWallet'
+    tx_params: TxParams
+    tx_hash: HexBytes
+    sent_at: float
+    hashes: list[HexBytes] = field(default_factory=list)
+    replacements: int = 0
+    mined: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+    @property
+    def nonce(self) -> int:
+        return self.tx_params['nonce']
+
+
+class ReplacementManager:
+    """
+    Tracks pending transactions of many wallets and replaces stuck ones. After the timeout a transaction is re-signed
+    at the same nonce with bumped fees, and it can be cancelled by a zero-value transfer to itself. Transactions are
+    checked with one nonce request per wallet, not per transaction
+
+    Usage Example
+    ----------
+        manager = ReplacementManager(timeout=60)
+        manager.start()
+
+        pending = await manager.transact(wallet, tx_params)
+        await pending.mined
+    """
+
+    def __init__(
+            self,
+            timeout: float = 60.0,
+            fee_bump: float = 1.125,
+            max_replacements: int = 5,
+            poll_interval: float = 5.0,
+            max_gas_price: Optional[Wei] = None
+    ):
+        """
+        :param timeout: Seconds after which a pending transaction is replaced
+        :param fee_bump: Multiplier of fees applied on every replacement. Nodes require at least 1.1
+        :param max_replacements: Maximum number of automatic replacements of one transaction
+        :param poll_interval: Seconds between checks of pending transactions
+        :param max_gas_price: Upper bound of gas price or max fee per gas in Wei units
+        """
+        if fee_bump < _MIN_FEE_BUMP:
+            raise ValueError(f'Fee bump must be at least {_MIN_FEE_BUMP} to be accepted by nodes')
+
+        self._timeout = timeout
+        self._fee_bump = fee_bump
+        self._max_replacements = max_replacements
+        self._poll_interval = poll_interval
+        self._max_gas_price = max_gas_price
+        self._pending: dict[tuple[int, ChecksumAddress], dict[int, PendingTransaction]] = {}
+        self._wallets: dict[tuple[int, ChecksumAddress], 'AsyncWallet'] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> list[PendingTransaction]:
+        return [pending for transactions in self._pending.values() for pending in transactions.values()]
+
+    def start(self) -> None:
+        """
+        Starts checking pending transactions in a background task of the running event loop
+        :return: None
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def track(self, wallet: 'AsyncWallet', tx_params: TxParams, tx_hash: HexBytes) -> PendingTransaction:
+        """
+        Starts tracking of the transaction already sent by the wallet
+        :param wallet: AsyncWallet instance, which sent the transaction
+        :param tx_params: Params of the sent transaction
+        :param tx_hash: Transaction hash
+        :return: PendingTransaction instance
+        """
+        key = self._key(wallet)
+        self._wallets[key] = wallet
+        transactions = self._pending.setdefault(key, {})
+
+        pending = transactions.get(tx_params['nonce'])
+        if pending is None:
+            pending = PendingTransaction(wallet=wallet, tx_params=tx_params, tx_hash=tx_hash, sent_at=time.monotonic())
+            transactions[pending.nonce] = pending
+        else:
+            pending.tx_params, pending.tx_hash, pending.sent_at = tx_params, tx_hash, time.monotonic()
+
+        pending.hashes.append(HexBytes(tx_hash))
+        return pending
+
+    async def transact(self, wallet: 'AsyncWallet', tx_params: TxParams) -> PendingTransaction:
+        """
+        Performs transaction through the wallet and starts tracking it
+        :param wallet: AsyncWallet instance
+        :param tx_params: Built transaction's params
+        :return: PendingTransaction instance
+        """
+        tx_hash = await wallet.transact(tx_params)
+        return self.track(wallet, tx_params, tx_hash)
+
+    async def speed_up(self, wallet: 'AsyncWallet', nonce: int) -> HexBytes:
+        """
+        Re-signs the tracked transaction at the same nonce with bumped fees and broadcasts it
+        :param wallet: AsyncWallet instance, which sent the transaction
+        :param nonce: Nonce of the transaction
+        :return: Hash of the replacement transaction
+        """
+        pending = self._get_pending(wallet, nonce)
+        tx_params = await self._bump_fees(wallet, pending.tx_params)
+        tx_hash = await wallet._send_transaction(tx_params)
+
+        pending.replacements += 1
+        self.track(wallet, tx_params, tx_hash)
+        return tx_hash
+
+    async def cancel(self, wallet: 'AsyncWallet', nonce: int) -> HexBytes:
+        """
+        Cancels the pending transaction by replacing it with zero-value transfer to the wallet itself
+        :param wallet: AsyncWallet instance, which sent the transaction
+        :param nonce: Nonce of the transaction
+        :return: Hash of the cancelling transaction
+        """
+        pending = self._pending.get(self._key(wallet), {}).get(nonce)
+        base_params = pending.tx_params if pending else await wallet.build_tx_params(0)
+
+        tx_params = {
+            name: value for name, value in base_params.items()
+            if name in ('gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas', 'type')
+        }
+        tx_params.update({
+            'from': wallet.public_key,
+            'to': wallet.public_key,
+            'value': 0,
+            'nonce': nonce,
+            'gas': 21_000,
+            'chainId': wallet.network['chain_id'],
+        })
+
+        tx_params = await self._bump_fees(wallet, tx_params)
+        tx_hash = await wallet._send_transaction(tx_params)
+        self.track(wallet, tx_params, tx_hash)
+        return tx_hash
+
+    async def check(self) -> None:
+        """
+        Drops mined transactions and replaces the ones pending longer than the timeout. Sends one nonce request per
+        wallet
+        :return: None
+        """
+        keys = [key for key, transactions in self._pending.items() if transactions]
+        nonces = await asyncio.gather(
+            *(self._wallets[key].provider.eth.get_transaction_count(key[1], 'latest') for key in keys),
+            return_exceptions=True
+        )
+
+        replacements = []
+        for key, confirmed_nonce in zip(keys, nonces):
+            if isinstance(confirmed_nonce, Exception):
+                logger.warning(f'Failed to check pending transactions of {key[1]}: {confirmed_nonce!r}')
+                continue
+
+            transactions = self._pending[key]
+            for nonce in [nonce for nonce in transactions if nonce < confirmed_nonce]:
+                pending = transactions.pop(nonce)
+                if not pending.mined.done():
+                    pending.mined.set_result(None)
+
+            now = time.monotonic()
+            for pending in transactions.values():
+                if now - pending.sent_at >= self._timeout and pending.replacements < self._max_replacements:
+                    replacements.append(self.speed_up(pending.wallet, pending.nonce))
+
+        for result in await asyncio.gather(*replacements, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning(f'Failed to replace pending transaction: {result!r}')
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.exception(f'Failed to check pending transactions: {e!r}')
+
+            await asyncio.sleep(self._poll_interval)
+
+    async def _bump_fees(self, wallet: 'AsyncWallet', tx_params: TxParams) -> TxParams:
+        tx_params = dict(tx_params)
+        bump = self._fee_bump
+
+        if 'maxFeePerGas' in tx_params:
+            priority_fee = tx_params.get('maxPriorityFeePerGas')
+            if priority_fee is None:
+                priority_fee = await wallet.provider.eth.max_priority_fee
+
+            tx_params['maxPriorityFeePerGas'] = self._cap(math.ceil(priority_fee * bump))
+            tx_params['maxFeePerGas'] = self._cap(max(
+                math.ceil(tx_params['maxFeePerGas'] * bump),
+                tx_params['maxPriorityFeePerGas']
+            ))
+        else:
+            gas_price = await wallet.provider.eth.gas_price
+            tx_params['gasPrice'] = self._cap(max(math.ceil(tx_params.get('gasPrice', 0) * bump), gas_price))
+
+        return tx_params
+
+    def _cap(self, fee: int) -> Wei:
+        if self._max_gas_price is not None and fee > self._max_gas_price:
+            raise ValueError(f'Bumped fee {fee} exceeds max gas price {self._max_gas_price}')
+
+        return Wei(fee)
+
+    def _get_pending(self, wallet: 'AsyncWallet', nonce: int) -> PendingTransaction:
+        pending = self._pending.get(self._key(wallet), {}).get(nonce)
+        if pending is None:
+            raise ValueError(f'Transaction with nonce {nonce} of {wallet.public_key} is not tracked')
+
+        return pending
+
+    @staticmethod
+    def _key(wallet: 'AsyncWallet') -> tuple[int, ChecksumAddress]:
+        return wallet.network['chain_id'], wallet.public_key
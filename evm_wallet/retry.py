@@ -0,0 +1,370 @@
+import sys
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Awaitable, Optional
+import requests
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3
+from web3.types import RPCEndpoint, RPCResponse
+from evm_wallet._rpc import RPCCall, is_duplicate_transaction_error, is_persistent, set_retry_policy
+
+logger = logging.getLogger(__name__)
+
+_NOT_RETRIED_METHODS = {'eth_sendTransaction', 'personal_sendTransaction', 'eth_subscribe', 'eth_unsubscribe'}
+_BROADCAST_METHOD = 'eth_sendRawTransaction'
+_BATCH_METHOD = 'batch'
+_TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+_TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    asyncio.TimeoutError,
+    ConnectionError
+)
+_TRANSIENT_MARKERS = ('header not found', 'timeout', 'timed out', 'rate limit', 'too many requests',
+                      'temporarily unavailable', 'service unavailable', 'bad gateway', 'try again')
+
+
+class CircuitOpenError(ConnectionError):
+    def __init__(self, endpoint: str, retry_after: float):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            f'Circuit of {endpoint} is open after repeated failures, retry after {retry_after:.1f} seconds'
+        )
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Returns true if the request failed because of transport errors or node errors, e.g. "header not found", which may
+    disappear on retry
+    :param error: Exception raised by the request
+    :return: True if the request can be retried
+    """
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in _TRANSIENT_STATUSES
+    elif isinstance(error, ValueError) and error.args and isinstance(error.args[0], dict):
+        return is_transient_response({'error': error.args[0]})
+
+    # Errors of aiohttp and websockets can be raised only after they are imported, so they aren't imported to be checked
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in _TRANSIENT_STATUSES
+        elif isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError)):
+            return True
+
+    websockets = sys.modules.get('websockets.exceptions')
+    if websockets is not None and isinstance(error, websockets.ConnectionClosed):
+        return True
+
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+def is_transient_response(response: RPCResponse) -> bool:
+    """
+    Returns true if the node responded with an error, which may disappear on retry, e.g. "header not found"
+    :param response: Raw RPC response
+    :return: True if the request can be retried
+    """
+    error = response.get('error')
+    if error is None:
+        return False
+
+    if isinstance(error, dict) and error.get('code') == 429:
+        return True
+
+    message = str(error.get('message', error) if isinstance(error, dict) else error).lower()
+    return any(marker in message for marker in _TRANSIENT_MARKERS)
+
+
+class _CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+
+        return max(0.0, self._reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """
+    Retries transient RPC failures, e.g. timeouts, 502 and "header not found", with jittered exponential backoff.
+    Retries are limited by a budget, a share of all requests, so they don't multiply load during incidents, and every
+    endpoint has a circuit breaker, rejecting requests after repeated failures. Batch requests are covered too, and
+    only their failed calls are sent again. Reads are retried freely. Raw transactions are retried by sending the same
+    signed transaction again, and the node reporting it as already known on retry is treated as success. A used nonce
+    is still reported as an error, since another transaction may have taken it. Transactions signed by the node and
+    subscriptions are never retried. One policy is shared by wallets and keeps its state per endpoint
+
+    Usage Example
+    ----------
+        policy = RetryPolicy(max_attempts=5, base_delay=0.5)
+        wallet = Wallet(private_key, 'Arbitrum', retry_policy=policy)
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 4,
+            base_delay: float = 0.25,
+            max_delay: float = 8.0,
+            retry_ratio: float = 0.2,
+            retry_budget: int = 10,
+            failure_threshold: int = 10,
+            reset_timeout: float = 30.0
+    ):
+        """
+        :param max_attempts: Maximum number of attempts of one request, including the first one
+        :param base_delay: Delay before the first retry in seconds. Every next delay is doubled and randomized
+        :param max_delay: Maximum delay between attempts in seconds
+        :param retry_ratio: Number of retries earned by every request. 0.2 allows one retry per five requests
+        :param retry_budget: Maximum number of retries that can be saved up. The budget starts full, every request
+        adds retry_ratio to it and every retry takes one
+        :param failure_threshold: Number of consecutive failures of the endpoint, after which its circuit is opened
+        :param reset_timeout: Seconds after which an open circuit lets requests through again
+        """
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._retry_ratio = retry_ratio
+        self._retry_budget = retry_budget
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._tokens = float(retry_budget)
+        self._breakers: dict[str, _CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def install(self, provider: Web3 | AsyncWeb3) -> None:
+        """
+        Adds the policy to the provider as the innermost middleware, replacing the default retries of web3. Persistent
+        WebSocket providers get only batch retries, since web3 formats their responses by request ids, which change
+        on retry, and they restore lost connections themselves
+        :param provider: Web3 or AsyncWeb3 instance
+        :return: None
+        """
+        provider.provider.middlewares = ()
+        set_retry_policy(provider, self)
+        if is_persistent(provider):
+            return
+
+        middleware = self.async_middleware if isinstance(provider, AsyncWeb3) else self.middleware
+        provider.middleware_onion.inject(middleware, 'retry', layer=0)
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Returns randomized delay before the retry
+        :param attempt: Number of the failed attempt starting from 0
+        :return: Delay in seconds
+        """
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    def middleware(self, make_request: Callable[[RPCEndpoint, Any], RPCResponse], w3: Web3) -> Callable:
+        endpoint = self._get_endpoint(w3)
+
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if method in _NOT_RETRIED_METHODS:
+                return make_request(method, params)
+
+            attempt = 0
+            while True:
+                self._check_circuit(endpoint)
+                try:
+                    response = make_request(method, params)
+                except Exception as e:
+                    if not self._should_retry(endpoint, method, attempt, e):
+                        raise
+                else:
+                    response = self._on_response(endpoint, method, params, attempt, response)
+                    if not self._should_retry(endpoint, method, attempt, response):
+                        return response
+
+                time.sleep(self.get_delay(attempt))
+                attempt += 1
+
+        return middleware
+
+    async def async_middleware(
+            self,
+            make_request: Callable[[RPCEndpoint, Any], Awaitable[RPCResponse]],
+            async_w3: AsyncWeb3
+    ) -> Callable:
+        endpoint = self._get_endpoint(async_w3)
+
+        async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if method in _NOT_RETRIED_METHODS:
+                return await make_request(method, params)
+
+            attempt = 0
+            while True:
+                self._check_circuit(endpoint)
+                try:
+                    response = await make_request(method, params)
+                except Exception as e:
+                    if not self._should_retry(endpoint, method, attempt, e):
+                        raise
+                else:
+                    response = self._on_response(endpoint, method, params, attempt, response)
+                    if not self._should_retry(endpoint, method, attempt, response):
+                        return response
+
+                await asyncio.sleep(self.get_delay(attempt))
+                attempt += 1
+
+        return middleware
+
+    def send_batch(
+            self,
+            provider: Web3,
+            calls: list[RPCCall],
+            send: Callable[[list[RPCCall]], list[RPCResponse]]
+    ) -> list[RPCResponse]:
+        """
+        Sends the batch, retrying the whole batch on transport errors and only failed calls on transient responses
+        :param provider: Web3 instance, whose endpoint receives the batch
+        :param calls: Pairs of RPC method and its params
+        :param send: Function sending calls as one batch and returning their responses
+        :return: Raw RPC responses in the same order as calls
+        """
+        if any(method in _NOT_RETRIED_METHODS for method, _ in calls):
+            return send(calls)
+
+        endpoint = self._get_endpoint(provider)
+        responses: list[Optional[RPCResponse]] = [None] * len(calls)
+        pending = list(range(len(calls)))
+        attempt = 0
+
+        while True:
+            self._check_circuit(endpoint)
+            try:
+                batch = send([calls[index] for index in pending])
+            except Exception as e:
+                if not self._should_retry(endpoint, _BATCH_METHOD, attempt, e):
+                    raise
+            else:
+                pending, outcome = self._merge_batch(endpoint, calls, pending, attempt, batch, responses)
+                if not self._should_retry(endpoint, _BATCH_METHOD, attempt, outcome):
+                    return responses
+
+            time.sleep(self.get_delay(attempt))
+            attempt += 1
+
+    async def async_send_batch(
+            self,
+            provider: AsyncWeb3,
+            calls: list[RPCCall],
+            send: Callable[[list[RPCCall]], Awaitable[list[RPCResponse]]]
+    ) -> list[RPCResponse]:
+        """
+        Async version of send_batch
+        :param provider: AsyncWeb3 instance, whose endpoint receives the batch
+        :param calls: Pairs of RPC method and its params
+        :param send: Coroutine function sending calls as one batch and returning their responses
+        :return: Raw RPC responses in the same order as calls
+        """
+        if any(method in _NOT_RETRIED_METHODS for method, _ in calls):
+            return await send(calls)
+
+        endpoint = self._get_endpoint(provider)
+        responses: list[Optional[RPCResponse]] = [None] * len(calls)
+        pending = list(range(len(calls)))
+        attempt = 0
+
+        while True:
+            self._check_circuit(endpoint)
+            try:
+                batch = await send([calls[index] for index in pending])
+            except Exception as e:
+                if not self._should_retry(endpoint, _BATCH_METHOD, attempt, e):
+                    raise
+            else:
+                pending, outcome = self._merge_batch(endpoint, calls, pending, attempt, batch, responses)
+                if not self._should_retry(endpoint, _BATCH_METHOD, attempt, outcome):
+                    return responses
+
+            await asyncio.sleep(self.get_delay(attempt))
+            attempt += 1
+
+    def _merge_batch(
+            self,
+            endpoint: str,
+            calls: list[RPCCall],
+            pending: list[int],
+            attempt: int,
+            batch: list[RPCResponse],
+            responses: list[Optional[RPCResponse]]
+    ) -> tuple[list[int], RPCResponse]:
+        failed = []
+        for index, response in zip(pending, batch):
+            method, params = calls[index]
+            responses[index] = self._on_response(endpoint, method, params, attempt, response)
+            if is_transient_response(responses[index]):
+                failed.append(index)
+
+        return failed, responses[failed[0]] if failed else {}
+
+    @staticmethod
+    def _get_endpoint(provider: Web3 | AsyncWeb3) -> str:
+        return str(getattr(provider.provider, 'endpoint_uri', None) or getattr(provider.provider, 'ipc_path', ''))
+
+    def _get_breaker(self, endpoint: str) -> _CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers.setdefault(endpoint, _CircuitBreaker(self._failure_threshold, self._reset_timeout))
+
+        return breaker
+
+    def _check_circuit(self, endpoint: str) -> None:
+        retry_after = self._get_breaker(endpoint).retry_after()
+        if retry_after > 0:
+            raise CircuitOpenError(endpoint, retry_after)
+
+    @staticmethod
+    def _on_response(endpoint: str, method: str, params: Any, attempt: int, response: RPCResponse) -> RPCResponse:
+        if (attempt > 0 and method == _BROADCAST_METHOD and 'error' in response and
+                is_duplicate_transaction_error(ValueError(response['error']))):
+            logger.info(f'Transaction rebroadcast to {endpoint} is already known by the node')
+            return {'jsonrpc': '2.0', 'id': response.get('id'), 'result': '0x' + keccak(HexBytes(params[0])).hex()}
+
+        return response
+
+    def _should_retry(self, endpoint: str, method: str, attempt: int, outcome: RPCResponse | Exception) -> bool:
+        is_transient = (is_transient_error(outcome) if isinstance(outcome, Exception)
+                        else is_transient_response(outcome))
+
+        with self._lock:
+            if attempt == 0:
+                self._tokens = min(self._tokens + self._retry_ratio, self._retry_budget)
+
+            breaker = self._get_breaker(endpoint)
+            if not is_transient:
+                breaker.record_success()
+                return False
+
+            breaker.record_failure()
+            if attempt + 1 >= self._max_attempts or self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+
+        logger.debug(f'Retrying {method} on {endpoint} after attempt {attempt + 1} failed: {outcome!r}')
+        return True
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
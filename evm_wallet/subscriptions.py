@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import inspect
+from typing import Any, Awaitable, Callable, Optional
+from web3 import AsyncWeb3
+from evm_wallet._rpc import is_persistent
+
+HeadListener = Callable[[dict[str, Any]], Optional[Awaitable[None]]]
+
+logger = logging.getLogger(__name__)
+
+
+class HeadWatcher:
+    """
+    Follows block heads of the network through the newHeads subscription of a persistent WebSocket connection and
+    notifies listeners about every new head. Lost connections are restored and subscription is renewed automatically
+    """
+
+    def __init__(
+            self,
+            provider: AsyncWeb3,
+            reconnect_delay: float = 1.0,
+            max_reconnect_delay: float = 30.0
+    ):
+        """
+        :param provider: AsyncWeb3 instance, connected through WebSocket endpoint
+        :param reconnect_delay: Initial delay in seconds before reconnecting
+        :param max_reconnect_delay: Maximum delay in seconds before reconnecting
+        """
+        if not is_persistent(provider):
+            raise ValueError('Subscriptions require AsyncWeb3 instance, connected through WebSocket endpoint')
+
+        self._provider = provider
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._listeners: list[HeadListener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._head: Optional[int] = None
+
+    @property
+    def head(self) -> Optional[int]:
+        """
+        Number of the last received block head
+        :return: Block number or None, if no head was received yet
+        """
+        return self._head
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add_listener(self, listener: HeadListener) -> None:
+        """
+        Adds function to be called with every new block head. It can be either regular or coroutine function
+        :param listener: Function, accepting block header
+        :return: None
+        """
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """
+        Starts following block heads in a background task of the running event loop
+        :return: None
+        """
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self) -> None:
+        """
+        Stops following block heads and waits for the background task to finish
+        :return: None
+        """
+        task = self._task
+        self.cancel()
+
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        provider = self._provider
+        transport = provider.provider
+        delay = self._reconnect_delay
+        reconnect = False
+
+        while True:
+            try:
+                await transport.ensure_connected(reconnect=reconnect)
+                await provider.eth.subscribe('newHeads')
+                delay = self._reconnect_delay
+
+                async for message in provider.ws.process_subscriptions():
+                    await self._notify(message.get('result', message))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'newHeads subscription to {transport.endpoint_uri} failed: {e!r}. '
+                               f'Reconnecting in {delay} seconds')
+
+            reconnect = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _notify(self, header: dict[str, Any]) -> None:
+        number = header['number']
+        self._head = int(number, 16) if isinstance(number, str) else number
+
+        for listener in self._listeners:
+            try:
+                result = listener(header)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.exception(f'Block head listener failed: {e!r}')
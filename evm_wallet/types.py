@@ -1,9 +1,15 @@
-from web3.types import Wei
-from dataclasses import dataclass
-from eth_typing import Address, HexAddress,  ChecksumAddress
-from typing import Union, Literal, TypedDict, NotRequired
+from decimal import Decimal
+from typing import Union, Literal, TypedDict, NotRequired, Optional, Iterable, TYPE_CHECKING
+from hexbytes import HexBytes
+from dataclasses import dataclass, field
+from eth_typing import Address, HexAddress,  ChecksumAddress, HexStr
 
-TokenAmount = Union[Wei, int]
+from evm_wallet.units import AnyAmount, from_base_units, to_base_units, from_base_units_many, to_base_units_many
+
+if TYPE_CHECKING:
+    from web3.types import Wei
+
+TokenAmount = Union['Wei', int]
 AnyAddress = Union[Address, HexAddress, ChecksumAddress, bytes, str]
 Network = Literal['Arbitrum Goerli', 'Arbitrum Sepolia', 'Arbitrum', 'Avalanche', 'Base', 'Base Sepolia', 'Base Goerli',
                   'BSC', 'BSC Testnet', 'Ethereum', 'Fantom', 'Fantom Testnet', 'Fuji', 'Goerli', 'Linea', 'Linea Goerli',
@@ -17,6 +23,107 @@ class ERC20Token:
     symbol: str
     decimals: int
 
+    def from_base_units(self, amount: int) -> Decimal:
+        """
+        Converts amount of the token in base units into exact decimal amount
+        :param amount: Amount in base units
+        :return: Exact decimal amount
+        """
+        return from_base_units(amount, self.decimals)
+
+    def to_base_units(self, amount: AnyAmount) -> int:
+        """
+        Converts decimal amount of the token into base units
+        :param amount: Decimal amount
+        :return: Amount in base units
+        """
+        return to_base_units(amount, self.decimals)
+
+    def from_base_units_many(self, amounts: Iterable[int]) -> list[Decimal]:
+        return from_base_units_many(amounts, self.decimals)
+
+    def to_base_units_many(self, amounts: Iterable[AnyAmount]) -> list[int]:
+        return to_base_units_many(amounts, self.decimals)
+
+
+@dataclass(frozen=True, kw_only=True)
+class SimulationResult:
+    success: bool
+    output: Optional[HexBytes] = None
+    revert_reason: Optional[str] = None
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class TransferEvent:
+    token: ChecksumAddress
+    sender: ChecksumAddress
+    recipient: ChecksumAddress
+    amount: int
+    block_number: int
+    log_index: int
+    tx_hash: HexStr
+
+
+@dataclass(kw_only=True)
+class TransferCheckpoint:
+    next_block: int
+
+
+@dataclass(frozen=True, kw_only=True)
+class NetworkSnapshot:
+    network: str
+    elapsed: float
+    native_balance: Optional['Wei'] = None
+    token_balances: dict[ChecksumAddress, int] = field(default_factory=dict)
+    token_errors: dict[ChecksumAddress, str] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True, kw_only=True)
+class PortfolioSnapshot:
+    account: ChecksumAddress
+    elapsed: float
+    networks: dict[str, NetworkSnapshot]
+
+    @property
+    def failed(self) -> list[str]:
+        """
+        Names of networks, which could not be queried
+        :return: List of network names
+        """
+        return [name for name, snapshot in self.networks.items() if not snapshot.ok]
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class BroadcastResult:
+    index: int
+    tx_hash: HexBytes
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True, kw_only=True)
+class EndpointStats:
+    rpc: str
+    samples: int
+    errors: int
+    latency: Optional[float] = None
+    head: Optional[int] = None
+    lag: Optional[int] = None
+    healthy: bool = False
+    error: Optional[str] = None
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.samples if self.samples else 1.0
+
 
 class NetworkInfo(TypedDict):
     network: str
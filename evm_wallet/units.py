@@ -0,0 +1,82 @@
+import numbers
+from decimal import Context, Decimal, Inexact, Rounded
+from functools import lru_cache
+from typing import Any, Iterable
+
+NATIVE_DECIMALS = 18
+
+_CONTEXT = Context(prec=100, traps=[Inexact, Rounded])
+
+AnyAmount = Decimal | int | str | float
+
+
+@lru_cache(maxsize=None)
+def _get_scale(decimals: int) -> int:
+    return 10 ** decimals
+
+
+def _is_scalar_amount(amount: Any) -> bool:
+    return isinstance(amount, (numbers.Number, str))
+
+
+def _to_list(amounts: Iterable[Any]) -> list[Any]:
+    to_list = getattr(amounts, 'tolist', None)
+    return to_list() if to_list is not None else list(amounts)
+
+
+def from_base_units(amount: int, decimals: int = NATIVE_DECIMALS) -> Decimal:
+    """
+    Converts integer amount in base units, e.g. Wei, into exact decimal amount
+    :param amount: Amount in base units
+    :param decimals: Number of decimals of the token (default: 18)
+    :return: Exact decimal amount
+    """
+    return Decimal(int(amount)).scaleb(-decimals, _CONTEXT)
+
+
+def to_base_units(amount: AnyAmount, decimals: int = NATIVE_DECIMALS) -> int:
+    """
+    Converts decimal amount into integer amount in base units, e.g. Wei. Floats are converted through their shortest
+    string representation, so 0.1 becomes exactly 0.1. Numpy scalars are accepted as well
+    :param amount: Decimal amount
+    :param decimals: Number of decimals of the token (default: 18)
+    :return: Amount in base units. Raises ValueError if the amount has more decimal places than the token
+    """
+    if isinstance(amount, numbers.Integral):
+        return int(amount) * _get_scale(decimals)
+
+    value = Decimal(str(amount)) if isinstance(amount, numbers.Real) else Decimal(amount)
+    scaled = value.scaleb(decimals, _CONTEXT)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f'Amount {amount} has more than {decimals} decimal places')
+
+    return int(scaled)
+
+
+def from_base_units_many(amounts: Iterable[int], decimals: int = NATIVE_DECIMALS) -> list[Decimal]:
+    """
+    Converts many integer amounts in base units into exact decimal amounts. Accepts any iterable, including arrays
+    having tolist method
+    :param amounts: Amounts in base units
+    :param decimals: Number of decimals of the token (default: 18)
+    :return: List of exact decimal amounts
+    """
+    exponent = -decimals
+    scaleb = Decimal.scaleb
+    return [scaleb(Decimal(amount), exponent, _CONTEXT) for amount in _to_list(amounts)]
+
+
+def to_base_units_many(amounts: Iterable[AnyAmount], decimals: int = NATIVE_DECIMALS) -> list[int]:
+    """
+    Converts many decimal amounts into integer amounts in base units. Accepts any iterable, including arrays having
+    tolist method
+    :param amounts: Decimal amounts
+    :param decimals: Number of decimals of the token (default: 18)
+    :return: List of amounts in base units
+    """
+    amounts = _to_list(amounts)
+    if all(type(amount) is int for amount in amounts):
+        scale = _get_scale(decimals)
+        return [amount * scale for amount in amounts]
+
+    return [to_base_units(amount, decimals) for amount in amounts]
@@ -1,12 +1,43 @@
-from typing import Optional
-from eth_typing import HexStr
+import threading
+from decimal import Decimal
+from typing import Any, Optional, Iterable, Self
+from concurrent.futures import Executor, ThreadPoolExecutor
+from eth_typing import ChecksumAddress, HexStr
 from hexbytes import HexBytes
+from eth_account.datastructures import SignedTransaction
 from web3 import Web3
 from web3.contract.contract import ContractFunction, Contract
 from web3.types import TxParams, Wei
 from evm_wallet._base_wallet import _BaseWallet
-from evm_wallet.types import Network, NetworkInfo, TokenAmount, AnyAddress, ERC20Token
+from evm_wallet.journal import NonceJournal
+from evm_wallet.gas import GasEstimateCache
+from evm_wallet.retry import RetryPolicy, DEFAULT_RETRY_POLICY, is_transient_error
+from evm_wallet._rpc import (batch_request, release_transport, is_duplicate_transaction_error, _estimate_gas_calls,
+                             _simulation_calls, _to_simulation_result)
+from evm_wallet.types import (Network, NetworkInfo, TokenAmount, AnyAddress, ERC20Token, SimulationResult,
+                              BroadcastResult)
 from evm_wallet.utils import is_checksum_address
+from evm_wallet.units import from_base_units
+from evm_wallet.erc20 import encode_transfer, encode_approve, encode_balance_of, decode_uint256
+
+MAX_WORKERS = 32
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """
+    Returns thread pool shared by bulk methods of all wallets. Every worker thread keeps its own pooled HTTP session
+    per endpoint, so connections are reused across calls
+    :return: ThreadPoolExecutor instance
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(MAX_WORKERS, thread_name_prefix='evm_wallet')
+
+    return _executor
 
 
 class Wallet(_BaseWallet):
@@ -19,31 +50,100 @@ class Wallet(_BaseWallet):
             self,
             private_key: str,
             network: Network | NetworkInfo = 'Ethereum',
+            journal: Optional[NonceJournal] = None,
+            gas_cache: Optional[GasEstimateCache] = None,
+            retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY,
+            executor: Optional[Executor] = None
     ):
         """
         :param private_key: Private key of existing account
         :param network: Name of supported network to be interacted or custom information about network represented as
         type NetworkInfo
+        :param journal: Durable journal of nonces and signed transactions. If provided, the nonce is reconciled with
+        the journal and the pending transaction count on creation. Unconfirmed transactions of the journal are sent
+        again by rebroadcast
+        :param gas_cache: Cache of gas estimates per call shape, used by build_and_transact and estimate_gas_many
+        :param retry_policy: Policy of retrying transient RPC failures, shared by wallets using the same endpoints.
+        Requests are not retried if None is provided
+        :param executor: Executor used by bulk methods. The thread pool shared by all wallets is used if not provided
         """
-        super().__init__(private_key, network, False)
+        self._executor = executor
+        super().__init__(private_key, network, False, journal, gas_cache, retry_policy)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
 
     @property
     def provider(self) -> Web3:
         return self._provider
 
+    def close(self) -> None:
+        """
+        Releases connections of the wallet. HTTP sessions shared with other wallets are closed by the last of them.
+        Shared thread pool and nonce journal are left open
+        :return: None
+        """
+        if not self._closed:
+            self._closed = True
+            release_transport(self.provider)
+
+    @property
+    def executor(self) -> Executor:
+        return self._executor or get_shared_executor()
+
     def _load_token_contract(self, address: AnyAddress) -> Contract:
         return super()._load_token_contract(address)
 
-    def get_balance(self, from_wei: bool = False) -> float | Wei:
+    def get_balance(self, from_wei: bool = False) -> Decimal | Wei:
         """
         Returns the balance of the current account in ethereum or wei units.
-        :param from_wei: Whether to convert balance to Ether units (default: False)
+        :param from_wei: Whether to convert balance to Ether units exactly (default: False)
         :return: Balance of the current account in ethereum units
         """
         provider = self.provider
         balance = provider.eth.get_balance(self.public_key)
 
-        return balance if not from_wei else provider.from_wei(balance, 'ether')
+        return balance if not from_wei else from_base_units(balance)
+
+    def map_balances(
+            self,
+            accounts: Iterable[AnyAddress],
+            token: Optional[ERC20Token] = None,
+            convert: bool = False
+    ) -> list[int | Decimal]:
+        """
+        Returns balances of many accounts in network currency or the token. Requests are sent concurrently through the
+        thread pool of the wallet
+        :param accounts: Addresses of accounts
+        :param token: ERC20Token instance. Balances in network currency are returned if not provided
+        :param convert: Whether to convert balances to exact decimal amounts (default: False)
+        :return: Balances in the same order as the given accounts
+        """
+        provider = self.provider
+        accounts = [provider.to_checksum_address(account) for account in accounts]
+
+        if token is None:
+            balances = self.executor.map(provider.eth.get_balance, accounts)
+        else:
+            balances = self.executor.map(
+                lambda account: self._call_uint256({'to': token.address, 'data': encode_balance_of(account)}),
+                accounts
+            )
+
+        balances = list(balances)
+        return self.from_base_units(balances, token) if convert else balances
+
+    def get_tokens(self, addresses: Iterable[AnyAddress]) -> list[ERC20Token]:
+        """
+        Returns many ERC20 tokens, containing information about them. Requests are sent concurrently through the thread
+        pool of the wallet
+        :param addresses: Addresses of tokens
+        :return: List of ERC20Token in the same order as the given addresses
+        """
+        return list(self.executor.map(self.get_token, addresses))
 
     def estimate_gas(self, tx_params: TxParams, from_wei: bool = False) -> Wei:
         """
@@ -56,12 +156,27 @@ class Wallet(_BaseWallet):
         gas = Wei(int(provider.eth.estimate_gas(tx_params)))
         return gas if not from_wei else provider.from_wei(gas, 'ether')
 
+    def estimate_gas_many(self, tx_params_list: list[TxParams], use_cache: bool = True) -> list[Wei]:
+        """
+        Returns estimated gas of many transactions in Wei units. Estimates absent in the gas cache are requested in one
+        batch request and stored in the cache. If the wallet has a gas cache, all estimates are multiplied by its
+        safety multiplier
+        :param tx_params_list: Params of built transactions
+        :param use_cache: Whether to take estimates from the gas cache, if the wallet has one (default: True)
+        :return: Estimated gas in the same order as the given params
+        """
+        estimates = [self._get_cached_gas(tx_params) if use_cache else None for tx_params in tx_params_list]
+        missing = [tx_params for tx_params, gas in zip(tx_params_list, estimates) if gas is None]
+        responses = batch_request(self.provider, _estimate_gas_calls(missing))
+        return self._merge_gas_estimates(tx_params_list, estimates, responses)
+
     def build_and_transact(
             self,
             closure: ContractFunction,
             value: TokenAmount = 0,
             gas: Optional[int] = None,
-            gas_price: Optional[Wei] = None
+            gas_price: Optional[Wei] = None,
+            simulate: bool = False
     ) -> HexBytes:
         """
         If you don't need to check estimated gas or directly use transact, you can call build_and_transact. It's based on getting
@@ -82,18 +197,47 @@ class Wallet(_BaseWallet):
         :param value: Quantity of network currency to be paid in Wei units
         :param gas: Quantity of gas to be spent
         :param gas_price: Price of gas in Wei units
+        :param simulate: Whether to dry-run the transaction against the pending block before signing. Raises
+        ContractLogicError with the decoded revert reason if it would revert (default: False)
         :return: Transaction's hash
         """
         gas_ = Wei(300_000) if not gas else gas
         tx_params = self.build_tx_params(value=value, gas=gas_, gas_price=gas_price)
         tx_params = closure.build_transaction(tx_params)
+        return self._transact_built(tx_params, gas, simulate)
+
+    def _transact_calldata(
+            self,
+            to: ChecksumAddress,
+            data: HexStr,
+            gas: Optional[Wei] = None,
+            gas_price: Optional[Wei] = None
+    ) -> HexBytes:
+        tx_params = self.build_tx_params(Wei(0), to, data, gas or Wei(300_000), gas_price)
+        return self._transact_built(tx_params, gas)
+
+    def _transact_built(self, tx_params: TxParams, gas: Optional[int], simulate: bool = False) -> HexBytes:
+        if simulate:
+            result, = self.simulate_many([self._simulation_params(tx_params, gas)])
+            self._raise_for_simulation(result)
 
         if not gas:
-            gas = self.estimate_gas(tx_params)
+            gas = self._get_cached_gas(tx_params)
+            if gas is None:
+                gas = self._cache_gas(tx_params, self.estimate_gas(tx_params))
             tx_params['gas'] = gas
 
         return self.transact(tx_params)
 
+    def simulate_many(self, tx_params_list: list[TxParams]) -> list[SimulationResult]:
+        """
+        Dry-runs transactions with eth_call against the pending block. All simulations are sent in one batch request
+        :param tx_params_list: Params of built transactions
+        :return: Simulation results in the same order as the given params, containing decoded revert reasons
+        """
+        responses = batch_request(self.provider, _simulation_calls(tx_params_list))
+        return [_to_simulation_result(response) for response in responses]
+
     def approve(
             self,
             token: ERC20Token,
@@ -110,11 +254,8 @@ class Wallet(_BaseWallet):
         if not is_checksum_address(contract_address):
             raise ValueError('Invalid contract address is provided')
 
-        token = self._load_token_contract(token.address)
         contract_address = self.provider.to_checksum_address(contract_address)
-        return self.build_and_transact(
-            token.functions.approve(contract_address, token_amount)
-        )
+        return self._transact_calldata(token.address, encode_approve(contract_address, token_amount))
 
     def build_tx_params(
             self,
@@ -158,13 +299,90 @@ class Wallet(_BaseWallet):
         :param tx_params: Built transaction's params
         :return: Transaction hash
         """
-        provider = self.provider
-        signed_transaction = provider.eth.account.sign_transaction(tx_params, self.private_key)
-        tx_hash = provider.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        tx_hash = self._send_transaction(tx_params)
         self._nonce += 1
 
         return tx_hash
 
+    def transact_many(self, tx_params_list: list[TxParams]) -> list[BroadcastResult]:
+        """
+        Performs many transactions. Nonces are allocated and transactions are signed sequentially, then broadcast
+        concurrently through the thread pool of the wallet. Rejected transactions are discarded from the nonce journal
+        and nonces of the last ones are released. A rejected transaction followed by accepted ones leaves a nonce gap,
+        which has to be filled, e.g. by transact with the nonce of the failed result
+        :param tx_params_list: Built transactions' params. Their nonces are replaced by the next nonces of the wallet
+        :return: Results in the same order as the given params, containing transaction hashes and errors
+        """
+        provider = self.provider
+        first_nonce = self._nonce
+        signed_transactions = []
+        rejected = set()
+
+        for tx_params in tx_params_list:
+            tx_params = {**tx_params, 'nonce': self._nonce}
+            signed_transaction = provider.eth.account.sign_transaction(tx_params, self.private_key)
+            self._record_transaction(tx_params, signed_transaction)
+            signed_transactions.append(signed_transaction)
+            self._nonce += 1
+
+        def send(index: int, signed_transaction: SignedTransaction) -> BroadcastResult:
+            try:
+                provider.eth.send_raw_transaction(signed_transaction.rawTransaction)
+            except Exception as e:
+                if not is_duplicate_transaction_error(e):
+                    self._discard_rejected(signed_transaction.hash, e)
+                    if not is_transient_error(e):
+                        rejected.add(index)
+                    return BroadcastResult(index=index, tx_hash=signed_transaction.hash, error=repr(e))
+
+            return BroadcastResult(index=index, tx_hash=signed_transaction.hash)
+
+        results = list(self.executor.map(send, range(len(signed_transactions)), signed_transactions))
+
+        # Transactions after a transient error may have reached the node, so only rejected ones are released
+        sent = len(signed_transactions)
+        if self._nonce == first_nonce + sent:
+            while sent and sent - 1 in rejected:
+                sent -= 1
+            self._nonce = first_nonce + sent
+
+        return results
+
+    def _send_transaction(self, tx_params: TxParams) -> HexBytes:
+        provider = self.provider
+        signed_transaction = provider.eth.account.sign_transaction(tx_params, self.private_key)
+        self._record_transaction(tx_params, signed_transaction)
+        try:
+            return provider.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        except Exception as e:
+            self._discard_rejected(signed_transaction.hash, e)
+            raise
+
+    def rebroadcast(self) -> list[HexBytes]:
+        """
+        Broadcasts again signed transactions from the nonce journal, which are not confirmed yet, e.g. after a restart.
+        Transactions are sent in nonce order as they were signed, so their nonces and hashes don't change. If the node
+        rejects one, it and all later transactions are discarded from the journal, the nonce of the wallet is moved
+        back to it and the error is raised. After transient errors transactions are kept to be rebroadcast again
+        :return: Hashes of rebroadcast transactions
+        """
+        journal = self._get_journal()
+        provider = self.provider
+        chain_id = self.network['chain_id']
+
+        journal.confirm(chain_id, self.public_key, provider.eth.get_transaction_count(self.public_key))
+        entries = journal.unconfirmed(chain_id, self.public_key)
+
+        for entry in entries:
+            try:
+                provider.eth.send_raw_transaction(entry.raw_tx)
+            except Exception as e:
+                if not is_duplicate_transaction_error(e):
+                    self._release_unsent(entry, e)
+                    raise
+
+        return [entry.tx_hash for entry in entries]
+
     def transfer(
             self,
             token: ERC20Token,
@@ -185,23 +403,51 @@ class Wallet(_BaseWallet):
         if not is_checksum_address(recipient):
             raise ValueError('Invalid recipient address is provided')
 
-        token_contract = self._load_token_contract(token.address)
         recipient = self.provider.to_checksum_address(recipient)
-        closure = token_contract.functions.transfer(recipient, token_amount)
-        return self.build_and_transact(closure, Wei(0), gas, gas_price)
+        return self._transact_calldata(token.address, encode_transfer(recipient, token_amount), gas, gas_price)
+
+    def transfer_many(
+            self,
+            token: ERC20Token,
+            transfers: list[tuple[AnyAddress, TokenAmount]],
+            gas_price: Optional[Wei] = None
+    ) -> list[BroadcastResult]:
+        """
+        Transfers token amounts to many recipients. Gas of all transfers is estimated in one batch request, then the
+        transactions are sent by transact_many
+        :param token: ERC20Token instance
+        :param transfers: Pairs of recipient address and quantity of token in Wei units
+        :param gas_price: Price of gas in Wei units
+        :return: Results in the same order as the given transfers, containing transaction hashes and errors
+        """
+        base_params = self.build_tx_params(Wei(0), token.address, gas_price=gas_price)
+
+        tx_params_list = []
+        for recipient, token_amount in transfers:
+            if not is_checksum_address(recipient):
+                raise ValueError(f'Invalid recipient address is provided: {recipient}')
+
+            tx_params_list.append({**base_params, 'data': encode_transfer(recipient, token_amount)})
+
+        for tx_params, gas in zip(tx_params_list, self.estimate_gas_many(tx_params_list)):
+            tx_params['gas'] = gas
+
+        return self.transact_many(tx_params_list)
+
+    def _call_uint256(self, call: TxParams) -> int:
+        return decode_uint256(self.provider.eth.call(call))
 
-    def get_balance_of(self, token: ERC20Token, convert: bool = False) -> float:
+    def get_balance_of(self, token: ERC20Token, convert: bool = False) -> int | Decimal:
         """
         Returns balance of specified token in ethereum or wei units
         :param token: ERC20Token instance
-        :param convert: Whether to divide token balance by its decimals (default: False)
+        :param convert: Whether to divide token balance by its decimals exactly (default: False)
         :return: Balance of specified token in ethereum or wei units
         """
-        token_contract = self._load_token_contract(token.address)
-        balance = token_contract.functions.balanceOf(self.public_key).call()
+        balance = self._call_uint256({'to': token.address, 'data': encode_balance_of(self.public_key)})
 
         if convert:
-            balance /= 10 ** token.decimals
+            balance = token.from_base_units(balance)
 
         return balance
 
@@ -1,8 +1,16 @@
+import asyncio
+import threading
 import pytest
 from dotenv import dotenv_values
+from web3._utils.caching import generate_cache_key
+from web3._utils.request import _async_session_cache
+from evm_wallet import AsyncWallet
+from tests.utils import serve_rpc
 
 dotenv_values = dotenv_values()
 
+_PRIVATE_KEY = '0x' + '11' * 32
+
 
 @pytest.fixture()
 def wallet(make_wallet):
@@ -37,3 +45,59 @@ async def test_transaction(wallet, eth_amount):
 async def test_transfer(wallet, eth_amount, usdc):
     recipient = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
     return await wallet.transfer(usdc, recipient, 10 ** (usdc.decimals - 2))
+
+
+@pytest.mark.asyncio
+async def test_simulate_many(wallet, eth_amount):
+    recipient = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+    params = await wallet.build_tx_params(eth_amount, recipient=recipient)
+    results = await wallet.simulate_many([params, params])
+    assert len(results) == 2 and all(result.success for result in results)
+
+
+@pytest.mark.asyncio
+async def test_context_manager(make_wallet):
+    async with make_wallet(network='BSC', is_async=True, private_key=dotenv_values.get('TEST_PRIVATE_KEY')) as wallet:
+        assert isinstance(await wallet.get_balance(), int)
+
+    assert wallet.closed
+
+
+def _stub_network(rpc: str) -> dict:
+    return {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+def _get_session(rpc: str):
+    return _async_session_cache.get_cache_entry(generate_cache_key(f'{threading.get_ident()}:{rpc}'))
+
+
+@pytest.mark.asyncio
+async def test_last_close_releases_shared_session():
+    rpc = serve_rpc({'eth_getBalance': hex(10 ** 18)})
+
+    async with AsyncWallet(_PRIVATE_KEY, _stub_network(rpc)) as wallet:
+        async with AsyncWallet(_PRIVATE_KEY, _stub_network(rpc)) as other_wallet:
+            assert await wallet.get_balance() == await other_wallet.get_balance() == 10 ** 18
+            session = _get_session(rpc)
+
+        assert other_wallet.closed and not session.closed
+        assert await wallet.get_balance() == 10 ** 18
+
+    assert wallet.closed and session.closed and _get_session(rpc) is None
+
+
+@pytest.mark.asyncio
+async def test_network_setter_releases_old_provider():
+    rpc, new_rpc = serve_rpc({'eth_getBalance': hex(1)}), serve_rpc({'eth_getBalance': hex(2)})
+
+    async with AsyncWallet(_PRIVATE_KEY, _stub_network(rpc)) as wallet:
+        assert await wallet.get_balance() == 1
+        session = _get_session(rpc)
+
+        wallet.network = _stub_network(new_rpc)
+        assert wallet._pending_releases
+        assert await wallet.get_balance() == 2
+        new_session = _get_session(new_rpc)
+
+    assert not wallet._pending_releases
+    assert session.closed and new_session.closed
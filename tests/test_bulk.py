@@ -0,0 +1,110 @@
+import rlp
+import time
+import asyncio
+import pytest
+from evm_wallet import AsyncWallet, BulkSender, NonceJournal
+from tests.utils import DropConnection, RPCError, serve_rpc, stub_receipt, stub_tx_hash
+
+_PRIVATE_KEY = '0x' + '11' * 32
+_RECIPIENT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+
+
+def _serve(broadcasts: list[str], calls: list[tuple[str, list]], accepted: int = 100) -> dict:
+    def send_raw_transaction(raw_tx: str) -> str:
+        broadcasts.append(raw_tx)
+        if len(broadcasts) > accepted:
+            raise RPCError('insufficient funds for gas * price + value')
+        return stub_tx_hash(raw_tx)
+
+    def estimate_gas(tx_params: dict, *args) -> str:
+        if tx_params.get('data') == '0xdead':
+            raise RPCError('execution reverted', 3)
+        return '0x5208'
+
+    rpc = serve_rpc({
+        'eth_getTransactionCount': '0x5',
+        'eth_sendRawTransaction': send_raw_transaction,
+        'eth_estimateGas': estimate_gas,
+        'eth_getTransactionReceipt': stub_receipt
+    }, calls=calls)
+    return {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+@pytest.mark.asyncio
+async def test_bulk_sender():
+    broadcasts = []
+    calls = []
+
+    async with AsyncWallet(_PRIVATE_KEY, _serve(broadcasts, calls)) as wallet:
+        started = time.monotonic()
+        sender = BulkSender(wallet, rate=50, burst=5, queue_size=4, batch_size=3, receipt_poll_interval=0.05)
+        async with sender:
+            queued = [await sender.submit({'to': _RECIPIENT, 'value': index}, wait_for_receipt=index < 3)
+                      for index in range(15)]
+            failed = await sender.submit({'to': _RECIPIENT, 'data': '0xdead'})
+
+        assert time.monotonic() - started >= (15 - 5) / 50
+        assert [transaction.nonce for transaction in queued] == list(range(5, 20))
+        assert wallet.nonce == 20 and len(broadcasts) == 15
+
+        assert all(transaction.tx_hash.done() for transaction in queued)
+        assert (await queued[0].receipt)['status'] == 1 and queued[3].receipt is None
+        assert sum(method == 'eth_getTransactionReceipt' for method, _ in calls) == 3
+        with pytest.raises(ValueError):
+            await failed.tx_hash
+
+        stats = sender.stats
+        assert stats['build'].processed == 15 and stats['build'].errors == 1
+        assert stats['broadcast'].processed == 15 and stats['receipt'].processed == 3
+        assert not sender.running
+
+
+@pytest.mark.asyncio
+async def test_bulk_sender_stop_keeps_nonce_consistent():
+    broadcasts = []
+
+    async with AsyncWallet(_PRIVATE_KEY, _serve(broadcasts, [], accepted=3)) as wallet:
+        with pytest.raises(RuntimeError):
+            async with BulkSender(wallet, rate=50, broadcast_concurrency=1) as sender:
+                queued = [await sender.submit({'to': _RECIPIENT, 'value': index, 'gas': 21_000}) for index in range(6)]
+                await asyncio.sleep(0.01)
+                raise RuntimeError
+
+        assert all(transaction.tx_hash.done() for transaction in queued)
+        signed = [transaction for transaction in queued if not transaction.tx_hash.cancelled()]
+        accepted = [transaction for transaction in signed if transaction.tx_hash.exception() is None]
+
+        assert len(broadcasts) == len(signed) and len(accepted) == min(3, len(signed))
+        assert wallet.nonce == 5 + len(accepted)
+        assert not sender.running
+
+
+@pytest.mark.asyncio
+async def test_bulk_sender_keeps_nonces_of_transient_failures(tmp_path):
+    journal = NonceJournal(str(tmp_path / 'journal.sqlite3'))
+    errors = {
+        6: DropConnection(),
+        7: RPCError('nonce too low'),
+        8: RPCError('insufficient funds for gas * price + value')
+    }
+
+    def send_raw_transaction(raw_tx: str) -> str:
+        nonce = int.from_bytes(rlp.decode(bytes.fromhex(raw_tx[2:]))[0], 'big')
+        if nonce in errors:
+            raise errors[nonce]
+        return stub_tx_hash(raw_tx)
+
+    rpc = serve_rpc({'eth_getTransactionCount': '0x5', 'eth_sendRawTransaction': send_raw_transaction})
+    network = {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+    async with AsyncWallet(_PRIVATE_KEY, network, journal=journal, retry_policy=None) as wallet:
+        async with BulkSender(wallet, broadcast_concurrency=1) as sender:
+            queued = [await sender.submit({'to': _RECIPIENT, 'value': index, 'gas': 21_000}) for index in range(4)]
+
+        await queued[0].tx_hash
+        for transaction in queued[1:]:
+            with pytest.raises(Exception):
+                await transaction.tx_hash
+
+        assert wallet.nonce == 7
+        assert [entry.nonce for entry in journal.unconfirmed(1, wallet.public_key)] == [5, 6]
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from evm_wallet import ReadCache
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    cache = ReadCache()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(cache.get((1, 'eth_getBalance', 'account', 10), fetch) for _ in range(10)))
+    assert results == [42] * 10 and calls == 1
+
+    assert await cache.get((1, 'eth_getBalance', 'account', 10), fetch) == 42
+    assert calls == 1
+    assert cache.stats.hits == 1 and cache.stats.joined == 9 and cache.stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_new_head_invalidates():
+    cache = ReadCache()
+    cache.advance(1, 10)
+
+    async def fetch():
+        return 1
+
+    await cache.get((1, 'eth_getBalance', 'account', 10), fetch)
+    cache.advance(1, 11)
+    await cache.get((1, 'eth_getBalance', 'account', 10), fetch)
+    assert cache.stats.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_joined_reads():
+    cache = ReadCache()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return 42
+
+    key = (1, 'eth_getBalance', 'account', 10)
+    leader = asyncio.create_task(cache.get(key, fetch))
+    await asyncio.sleep(0)
+    joined = asyncio.create_task(cache.get(key, fetch))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    assert await joined == 42 and calls == 1
+    assert leader.cancelled()
+    assert cache.stats.misses == 1 and cache.stats.joined == 1
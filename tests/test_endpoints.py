@@ -0,0 +1,38 @@
+import pytest
+from evm_wallet import Wallet
+from evm_wallet.endpoints import rank_endpoints, select_endpoint
+from tests.utils import serve_rpc
+
+_PRIVATE_KEY = '0x' + '11' * 32
+
+
+def _serve(delay: float = 0.0, head: int = 100, status: int = 200, chain_id: int = 1) -> str:
+    return serve_rpc({'eth_chainId': hex(chain_id), 'eth_blockNumber': hex(head)}, delay, status)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('EVM_WALLET_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_rank_endpoints(cache_dir):
+    fast = _serve()
+    slow = _serve(delay=0.05)
+    failing = _serve(status=502)
+    lagging = _serve(head=90)
+    wrong_chain = _serve(chain_id=56)
+
+    ranking = await rank_endpoints('Ethereum', [failing, slow, lagging, fast, wrong_chain], samples=3, timeout=1)
+
+    assert [stats.rpc for stats in ranking[:2]] == [fast, slow]
+    assert all(stats.healthy for stats in ranking[:2]) and not any(stats.healthy for stats in ranking[2:])
+    assert {stats.rpc: stats.lag for stats in ranking}[lagging] == 10
+    assert {stats.rpc: stats.error_rate for stats in ranking}[failing] == 1.0
+
+    assert (cache_dir / 'endpoints.json').exists()
+    assert select_endpoint('Ethereum', 'default') == fast
+    assert select_endpoint('Polygon', 'default') == 'default'
+    with Wallet(_PRIVATE_KEY, 'Ethereum') as wallet:
+        assert wallet.provider.provider.endpoint_uri == fast
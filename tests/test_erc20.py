@@ -0,0 +1,43 @@
+import pytest
+from web3 import Web3
+from eth_utils import function_signature_to_4byte_selector
+from evm_wallet._base_wallet import _BaseWallet
+from evm_wallet.erc20 import (encode_transfer, encode_approve, encode_balance_of, encode_allowance, decode_uint256,
+                              TRANSFER_SELECTOR, APPROVE_SELECTOR, BALANCE_OF_SELECTOR, ALLOWANCE_SELECTOR, MAX_UINT256)
+
+TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+ACCOUNT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+
+
+@pytest.fixture(scope='module')
+def contract():
+    return Web3().eth.contract(address=TOKEN, abi=_BaseWallet._get_erc20_abi())
+
+
+def test_selectors():
+    for selector, signature in [
+        (TRANSFER_SELECTOR, 'transfer(address,uint256)'),
+        (APPROVE_SELECTOR, 'approve(address,uint256)'),
+        (BALANCE_OF_SELECTOR, 'balanceOf(address)'),
+        (ALLOWANCE_SELECTOR, 'allowance(address,address)')
+    ]:
+        assert selector == '0x' + function_signature_to_4byte_selector(signature).hex()
+
+
+@pytest.mark.parametrize('amount', [0, 1, 10 ** 18, MAX_UINT256])
+def test_matches_web3(contract, amount):
+    functions = contract.functions
+    assert encode_transfer(ACCOUNT, amount) == functions.transfer(ACCOUNT, amount)._encode_transaction_data()
+    assert encode_approve(ACCOUNT, amount) == functions.approve(ACCOUNT, amount)._encode_transaction_data()
+    assert encode_balance_of(ACCOUNT) == functions.balanceOf(ACCOUNT)._encode_transaction_data()
+    assert encode_allowance(ACCOUNT, TOKEN) == functions.allowance(ACCOUNT, TOKEN)._encode_transaction_data()
+    assert decode_uint256(amount.to_bytes(32, 'big')) == decode_uint256(hex(amount)[2:].rjust(64, '0')) == amount
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        encode_transfer(ACCOUNT, MAX_UINT256 + 1)
+    with pytest.raises(ValueError):
+        encode_balance_of(ACCOUNT[:-1])
+    with pytest.raises(TypeError):
+        encode_transfer(ACCOUNT, 1.5)
@@ -0,0 +1,99 @@
+import csv
+import pytest
+from typing import Optional
+from eth_abi import encode
+from evm_wallet import ColumnarWriter, TransferEvent, export_balances, export_transfers
+from evm_wallet.export import BALANCE_COLUMNS, TRANSFER_COLUMNS
+from tests.utils import ZERO_ADDRESS, RPCError, serve_rpc
+
+_TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+_FAILING_TOKEN = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+_ACCOUNTS = ['0x' + f'{index:040x}' for index in range(1, 8)]
+
+
+def _network(malformed_account: Optional[str] = None) -> dict:
+    def get_balance(account: str, *args) -> str:
+        return '0xmalformed' if account.lower() == malformed_account else hex(10 ** 18)
+
+    def call(tx_params: dict, *args) -> str:
+        if tx_params['to'] == _FAILING_TOKEN:
+            raise RPCError('execution reverted', 3)
+        return '0x' + encode(['uint256'], [2 ** 200]).hex()
+
+    rpc = serve_rpc({'eth_getBalance': get_balance, 'eth_call': call})
+    return {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+async def _transfers(count: int):
+    for index in range(count):
+        yield TransferEvent(
+            token='0xdAC17F958D2ee523a2206206994597C13D831ec7',
+            sender='0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f',
+            recipient='0xdAC17F958D2ee523a2206206994597C13D831ec7',
+            amount=2 ** 255 + index,
+            block_number=index,
+            log_index=0,
+            tx_hash='0x' + '00' * 32
+        )
+
+
+@pytest.mark.asyncio
+async def test_export_transfers_csv(tmp_path):
+    path = str(tmp_path / 'transfers.csv')
+    assert await export_transfers(path, _transfers(25), buffer_size=10) == 25
+
+    with open(path, newline='') as file:
+        rows = list(csv.DictReader(file))
+
+    assert len(rows) == 25 and int(rows[-1]['amount']) == 2 ** 255 + 24
+
+
+@pytest.mark.asyncio
+async def test_export_transfers_parquet(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'transfers.parquet')
+    assert await export_transfers(path, _transfers(25), buffer_size=10) == 25
+
+    table = parquet.read_table(path)
+    assert table.column_names == list(TRANSFER_COLUMNS) and table.num_rows == 25
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarWriter(str(tmp_path / 'transfers.txt'), TRANSFER_COLUMNS)
+
+
+@pytest.mark.asyncio
+async def test_export_balances_csv(tmp_path):
+    path = str(tmp_path / 'balances.csv')
+    tokens = {'Stub': [_TOKEN, _FAILING_TOKEN]}
+    assert await export_balances(path, _ACCOUNTS, [_network()], tokens, batch_size=6, concurrency=2) == 21
+
+    with open(path, newline='') as file:
+        rows = list(csv.DictReader(file))
+
+    assert len(rows) == 21 and {row['account'].lower() for row in rows} == set(_ACCOUNTS)
+    by_token = {
+        token: [row for row in rows if row['token'] == token] for token in (ZERO_ADDRESS, _TOKEN, _FAILING_TOKEN)
+    }
+    assert all(row['balance'] == str(10 ** 18) and not row['error'] for row in by_token[ZERO_ADDRESS])
+    assert all(row['balance'] == str(2 ** 200) and not row['error'] for row in by_token[_TOKEN])
+    assert all(not row['balance'] and row['error'] == 'execution reverted' for row in by_token[_FAILING_TOKEN])
+
+
+@pytest.mark.asyncio
+async def test_export_balances_parquet(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'balances.parquet')
+    assert await export_balances(path, _ACCOUNTS, [_network()], {'Stub': [_TOKEN]}, batch_size=4) == 14
+
+    table = parquet.read_table(path)
+    assert table.column_names == list(BALANCE_COLUMNS) and table.num_rows == 14
+    assert set(table.column('balance').to_pylist()) == {str(10 ** 18), str(2 ** 200)}
+
+
+@pytest.mark.asyncio
+async def test_export_balances_raises_failures(tmp_path):
+    network = _network(malformed_account=_ACCOUNTS[0])
+    with pytest.raises(ValueError, match='0xmalformed'):
+        await export_balances(str(tmp_path / 'balances.csv'), _ACCOUNTS, [network], batch_size=2, concurrency=1)
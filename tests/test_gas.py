@@ -0,0 +1,65 @@
+import time
+import pytest
+from evm_wallet import GasEstimateCache, Wallet
+from tests.utils import RPCError, serve_rpc
+
+PRIVATE_KEY = '0x' + '11' * 32
+TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+TRANSFER = {'to': TOKEN, 'data': '0xa9059cbb' + '00' * 64}
+APPROVE = {'to': TOKEN, 'data': '0x095ea7b3' + '00' * 64}
+REVERTING = {'to': TOKEN, 'data': '0xdeadbeef'}
+
+
+def test_cache_applies_multiplier_and_revalidates():
+    cache = GasEstimateCache(multiplier=1.5, revalidate_after=2)
+    assert cache.get(1, TRANSFER) is None
+
+    assert cache.put(1, TRANSFER, 40_000) == 60_000
+    assert cache.put(1, {'data': '0x6080'}, 1_000_000) == 1_500_000
+    assert cache.get(1, {**TRANSFER, 'data': '0xa9059cbb' + '11' * 64}) == 60_000
+    assert cache.get(1, TRANSFER) == 60_000
+    assert cache.get(1, TRANSFER) is None
+
+    assert cache.get(1, APPROVE) is None and cache.get(56, TRANSFER) is None
+    assert cache.get(1, {'data': '0x6080'}) is None
+    assert cache.stats.hits == 2 and cache.stats.misses == 5
+
+    cache.put(1, TRANSFER, 50_000)
+    assert cache.get(1, TRANSFER) == 75_000
+
+
+def test_cache_expires_estimates():
+    cache = GasEstimateCache(ttl=0.05)
+    cache.put(1, TRANSFER, 40_000)
+    assert cache.get(1, TRANSFER) == 60_000
+
+    time.sleep(0.06)
+    assert cache.get(1, TRANSFER) is None
+
+
+def test_estimate_gas_many_merges_batch_into_cache():
+    calls = []
+
+    def estimate_gas(tx_params: dict, *args) -> str:
+        if tx_params['data'] == REVERTING['data']:
+            raise RPCError('execution reverted', 3)
+        return hex(50_000) if tx_params['data'].startswith('0x095ea7b3') else hex(40_000)
+
+    rpc = serve_rpc({'eth_estimateGas': estimate_gas}, calls=calls)
+    network = {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+    cache = GasEstimateCache(multiplier=1.5)
+    cache.put(1, TRANSFER, 30_000)
+
+    with Wallet(PRIVATE_KEY, network, gas_cache=cache) as wallet:
+        calls.clear()
+        assert wallet.estimate_gas_many([TRANSFER, APPROVE, APPROVE]) == [45_000, 75_000, 75_000]
+        assert [method for method, _ in calls] == ['eth_estimateGas', 'eth_estimateGas']
+
+        calls.clear()
+        assert wallet.estimate_gas_many([TRANSFER, APPROVE]) == [45_000, 75_000]
+        assert wallet.estimate_gas_many([TRANSFER], use_cache=False) == [60_000]
+        assert [method for method, _ in calls] == ['eth_estimateGas']
+        assert cache.get(1, TRANSFER) == 60_000
+
+        with pytest.raises(ValueError, match='transaction 1'):
+            wallet.estimate_gas_many([TRANSFER, REVERTING])
@@ -0,0 +1,30 @@
+import sys
+import subprocess
+
+
+def _imported_modules(statement: str) -> set[str]:
+    script = f'import sys\n{statement}\nprint(" ".join(sys.modules))'
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', script], text=True)
+    return set(output.split())
+
+
+def test_package_import_is_lazy():
+    modules = _imported_modules('import evm_wallet\nfrom evm_wallet import ERC20Token, NetworkInfo, ReadCache')
+    assert 'web3' not in modules and 'eth_account' not in modules
+
+
+def test_wallet_import_skips_async_stack():
+    modules = _imported_modules('from evm_wallet import Wallet')
+    assert 'evm_wallet.async_wallet' not in modules and 'evm_wallet._websocket' not in modules
+
+    # web3 6 imports its async providers, aiohttp and websockets in its own __init__, so only modules the package
+    # would add on top of it are checked
+    web3_modules = _imported_modules('import web3, eth_account')
+    for name in ('aiohttp', 'websockets', 'web3.providers.async_rpc', 'web3.providers.websocket'):
+        assert name not in modules or name in web3_modules
+
+
+def test_import_keeps_warning_filters():
+    modules = _imported_modules('import warnings\nfilters = list(warnings.filters)\nimport evm_wallet\n'
+                                'assert warnings.filters == filters')
+    assert 'evm_wallet' in modules
@@ -0,0 +1,91 @@
+import pytest
+from contextlib import aclosing
+from evm_wallet import AsyncWallet, TransferCheckpoint
+from evm_wallet._rpc import make_async_provider, async_release_transport
+from evm_wallet.indexer import TransferIndexer, _address_to_topic, _get_event_topic
+from tests.utils import RPCError, serve_rpc
+
+_PRIVATE_KEY = '0x' + '11' * 32
+_ACCOUNT = '0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A'
+_OTHER = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+_TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+_MAX_RANGE = 100
+
+
+def _log(block_number: int, sender: str, recipient: str) -> dict:
+    return {
+        'address': _TOKEN.lower(),
+        'topics': [_get_event_topic('Transfer'), _address_to_topic(sender), _address_to_topic(recipient)],
+        'data': hex(block_number),
+        'blockNumber': hex(block_number),
+        'logIndex': '0x0',
+        'transactionHash': '0x' + f'{block_number:064x}',
+        'removed': False
+    }
+
+
+_LOGS = [_log(10, _ACCOUNT, _OTHER), _log(150, _OTHER, _ACCOUNT), _log(250, _ACCOUNT, _ACCOUNT), _log(390, _OTHER, _ACCOUNT)]
+
+
+def _serve(ranges: list[tuple[int, int]]) -> str:
+    def get_logs(log_filter: dict) -> list[dict]:
+        start, end = int(log_filter['fromBlock'], 16), int(log_filter['toBlock'], 16)
+        ranges.append((start, end))
+        if end - start + 1 > _MAX_RANGE:
+            raise RPCError('query exceeds max block range 100', -32005)
+
+        topics = log_filter['topics']
+        return [
+            log for log in _LOGS
+            if start <= int(log['blockNumber'], 16) <= end and
+            all(topic is None or topic == log_topic for topic, log_topic in zip(topics, log['topics']))
+        ]
+
+    return serve_rpc({'eth_getLogs': get_logs, 'eth_blockNumber': hex(399)})
+
+
+@pytest.mark.asyncio
+async def test_indexer_splits_windows_on_range_errors():
+    ranges = []
+    provider = make_async_provider(_serve(ranges))
+    indexer = TransferIndexer(provider, _ACCOUNT, window=400)
+    events = [event async for event in indexer.stream(0, 399)]
+    await async_release_transport(provider)
+
+    assert [event.block_number for event in events] == [10, 150, 250, 390]
+    assert (events[2].sender, events[2].recipient) == (_ACCOUNT, _ACCOUNT)
+    assert (0, 399) in ranges and indexer.window <= 2 * _MAX_RANGE
+
+
+@pytest.mark.asyncio
+async def test_indexer_grows_window():
+    ranges = []
+    provider = make_async_provider(_serve(ranges))
+    indexer = TransferIndexer(provider, _ACCOUNT, window=10, max_window=50, concurrency=1)
+    events = [event async for event in indexer.stream(0, 399, direction='in')]
+    await async_release_transport(provider)
+
+    assert [event.block_number for event in events] == [150, 250, 390]
+    sizes = [end - start + 1 for start, end in ranges]
+    assert sizes[:3] == [10, 13, 17] and max(sizes) == 50
+    assert indexer.window == 50
+
+
+@pytest.mark.asyncio
+async def test_iter_transfers_resumes_from_checkpoint():
+    network = {'network': 'Stub', 'rpc': _serve([]), 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+    checkpoint = TransferCheckpoint(next_block=0)
+
+    async with AsyncWallet(_PRIVATE_KEY, network) as wallet:
+        assert wallet.public_key == _ACCOUNT
+        seen = []
+        async with aclosing(wallet.iter_transfers(checkpoint=checkpoint, window=100, concurrency=1)) as transfers:
+            async for event in transfers:
+                seen.append(event.block_number)
+                if event.block_number >= 150:
+                    break
+
+        assert seen == [10, 150] and checkpoint.next_block == 100
+
+        resumed = [event.block_number async for event in wallet.iter_transfers(checkpoint=checkpoint, window=100)]
+        assert resumed == [150, 250, 390] and checkpoint.next_block == 400
@@ -0,0 +1,95 @@
+import pytest
+import requests
+from eth_account import Account
+from evm_wallet import NonceJournal, Wallet
+from tests.utils import DropConnection, RPCError, serve_rpc, stub_tx_hash
+
+ADDRESS = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+PRIVATE_KEY = '0x' + '11' * 32
+
+
+def test_journal_survives_restart(tmp_path):
+    path = str(tmp_path / 'journal.sqlite3')
+    journal = NonceJournal(path)
+    journal.record(1, ADDRESS, 5, b'\x01' * 32, b'\xaa')
+    journal.record(1, ADDRESS, 6, b'\x02' * 32, b'\xbb')
+    journal.record(1, ADDRESS, 6, b'\x03' * 32, b'\xcc')
+    journal.close()
+
+    journal = NonceJournal(path)
+    assert journal.last_nonce(1, ADDRESS) == 6
+
+    journal.confirm(1, ADDRESS, 6)
+    entries = journal.unconfirmed(1, ADDRESS)
+    assert [(entry.nonce, bytes(entry.raw_tx)) for entry in entries] == [(6, b'\xcc')]
+
+
+def _serve_node(broadcasts: list[str], accepted: set[str]) -> dict:
+    def send_raw_transaction(raw_tx: str) -> str:
+        broadcasts.append(raw_tx)
+        if raw_tx not in accepted:
+            raise RPCError('insufficient funds for gas * price + value')
+        return stub_tx_hash(raw_tx)
+
+    rpc = serve_rpc({'eth_getTransactionCount': '0x5', 'eth_sendRawTransaction': send_raw_transaction})
+    return {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+def test_rejected_broadcast_leaves_no_gap(tmp_path):
+    journal = NonceJournal(str(tmp_path / 'journal.sqlite3'))
+    network = _serve_node([], set())
+
+    with Wallet(PRIVATE_KEY, network, journal=journal) as wallet:
+        with pytest.raises(ValueError, match='insufficient funds'):
+            wallet.transact(wallet.build_tx_params(1, ADDRESS, gas=21_000))
+
+        assert wallet.nonce == 5
+        assert journal.unconfirmed(1, wallet.public_key) == []
+
+    with Wallet(PRIVATE_KEY, network, journal=journal) as wallet:
+        assert wallet.nonce == 5
+
+
+def test_restart_rebroadcasts_journaled_transactions(tmp_path):
+    journal = NonceJournal(str(tmp_path / 'journal.sqlite3'))
+    account = Account.from_key(PRIVATE_KEY)
+    raw_txs = []
+    for nonce in (5, 6, 7):
+        tx_params = {'to': ADDRESS, 'value': 1, 'gas': 21_000, 'gasPrice': 100, 'nonce': nonce, 'chainId': 1}
+        signed_transaction = account.sign_transaction(tx_params)
+        journal.record(1, account.address, nonce, signed_transaction.hash, signed_transaction.rawTransaction)
+        raw_txs.append('0x' + bytes(signed_transaction.rawTransaction).hex())
+
+    broadcasts = []
+    with Wallet(PRIVATE_KEY, _serve_node(broadcasts, {raw_txs[0]}), journal=journal) as wallet:
+        assert wallet.nonce == 8 and broadcasts == []
+
+        with pytest.raises(ValueError, match='insufficient funds'):
+            wallet.rebroadcast()
+        assert wallet.nonce == 6
+
+    assert broadcasts == raw_txs[:2]
+    assert [entry.nonce for entry in journal.unconfirmed(1, account.address)] == [5]
+
+
+def test_transient_errors_keep_journaled_transactions(tmp_path):
+    journal = NonceJournal(str(tmp_path / 'journal.sqlite3'))
+
+    def send_raw_transaction(raw_tx: str) -> str:
+        raise DropConnection
+
+    rpc = serve_rpc({'eth_getTransactionCount': '0x5', 'eth_sendRawTransaction': send_raw_transaction})
+    network = {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+    with Wallet(PRIVATE_KEY, network, journal=journal, retry_policy=None) as wallet:
+        with pytest.raises(requests.ConnectionError):
+            wallet.transact(wallet.build_tx_params(1, ADDRESS, gas=21_000))
+        assert [entry.nonce for entry in journal.unconfirmed(1, wallet.public_key)] == [5]
+
+    with Wallet(PRIVATE_KEY, network, journal=journal, retry_policy=None) as wallet:
+        assert wallet.nonce == 6
+
+        with pytest.raises(requests.ConnectionError):
+            wallet.rebroadcast()
+        assert wallet.nonce == 6
+        assert [entry.nonce for entry in journal.unconfirmed(1, wallet.public_key)] == [5]
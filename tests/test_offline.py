@@ -0,0 +1,64 @@
+import pytest
+from eth_account import Account
+from evm_wallet import OfflineWallet, broadcast_raw_file
+from evm_wallet.offline import read_raw_transactions, write_raw_transactions, _decode_sender_and_nonce
+from tests.utils import RPCError, serve_rpc, stub_tx_hash
+
+PRIVATE_KEY = '0x' + '11' * 32
+RECIPIENT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+
+
+def test_sign_many(tmp_path):
+    path = str(tmp_path / 'transactions.raw')
+    wallet = OfflineWallet(PRIVATE_KEY, chain_id=56, nonce=7, gas_price=10 ** 9)
+
+    transactions = ({'to': RECIPIENT, 'value': value, 'gas': 21_000} for value in range(5))
+    assert wallet.sign_many(transactions, path, processes=1, chunk_size=2) == 5
+    assert wallet.nonce == 12
+
+    raw_transactions = list(read_raw_transactions(path))
+    decoded = [Account.recover_transaction(raw) for raw in raw_transactions]
+    assert decoded == [wallet.public_key] * 5
+
+
+def test_sign_many_in_processes(tmp_path):
+    path = str(tmp_path / 'transactions.raw')
+    wallet = OfflineWallet(PRIVATE_KEY, chain_id=56, nonce=0, gas_price=10 ** 9)
+
+    transactions = ({'to': RECIPIENT, 'value': value, 'gas': 21_000} for value in range(50))
+    assert wallet.sign_many(transactions, path, processes=2, chunk_size=3) == 50
+    assert [_decode_sender_and_nonce(raw)[1] for raw in read_raw_transactions(path)] == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_broadcast_raw_file(tmp_path):
+    path = str(tmp_path / 'transactions.raw')
+    wallets = [OfflineWallet(private_key, chain_id=1, nonce=0, gas_price=10 ** 9)
+               for private_key in (PRIVATE_KEY, '0x' + '22' * 32)]
+    raw_transactions = [
+        bytes(wallets[index % 2].sign({'to': RECIPIENT, 'value': index, 'gas': 21_000}).rawTransaction)
+        for index in range(40)
+    ]
+    # Nonces of both senders are reversed within every batch of 10
+    batches = [reversed(raw_transactions[offset:offset + 10]) for offset in range(0, 40, 10)]
+    write_raw_transactions(path, (raw for batch in batches for raw in batch))
+
+    received = []
+
+    def send_raw_transaction(raw_tx: str) -> str:
+        sender, nonce = _decode_sender_and_nonce(bytes.fromhex(raw_tx[2:]))
+        received.append((sender, nonce))
+        if nonce == 0:
+            raise RPCError('already known')
+        elif nonce == 1:
+            raise RPCError('nonce too low')
+        return stub_tx_hash(raw_tx)
+
+    results = await broadcast_raw_file(path, serve_rpc({'eth_sendRawTransaction': send_raw_transaction}), 4, 10)
+
+    for wallet in wallets:
+        assert [nonce for sender, nonce in received if sender == wallet.public_key] == list(range(20))
+
+    errors = {_decode_sender_and_nonce(raw)[1] for raw, result in zip(read_raw_transactions(path), results)
+              if result.error}
+    assert errors == {1} and sum(result.error is not None for result in results) == 2
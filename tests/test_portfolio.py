@@ -0,0 +1,44 @@
+import pytest
+from evm_wallet import AsyncWallet
+from evm_wallet._rpc import _get_transport_key, _transport_users
+from tests.utils import RPCError, serve_rpc
+
+_PRIVATE_KEY = '0x' + '11' * 32
+_GOOD_TOKEN = '0xdAC17F958D2ee523a2206206994597C13D831ec7'
+_BAD_TOKEN = '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48'
+
+
+def _network(name: str, rpc: str) -> dict:
+    return {'network': name, 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+def _call(tx_params: dict, *args) -> str:
+    if tx_params['to'].lower() == _BAD_TOKEN.lower():
+        raise RPCError('execution reverted', 3)
+    return hex(42)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reports_timeouts_and_token_errors():
+    fast = serve_rpc({'eth_getBalance': hex(10 ** 18), 'eth_call': _call})
+    slow = serve_rpc({'eth_getBalance': hex(1)}, delay=1.0)
+
+    async with AsyncWallet(_PRIVATE_KEY, _network('Fast', fast)) as wallet:
+        snapshot = await wallet.snapshot(
+            [_network('Fast', fast), _network('Slow', slow)],
+            {'Fast': [_GOOD_TOKEN, _BAD_TOKEN]},
+            timeout=0.3
+        )
+
+        fast_snapshot = snapshot.networks['Fast']
+        assert fast_snapshot.ok and fast_snapshot.native_balance == 10 ** 18
+        assert fast_snapshot.token_balances == {_GOOD_TOKEN: 42}
+        assert 'execution reverted' in fast_snapshot.token_errors[_BAD_TOKEN]
+
+        assert not snapshot.networks['Slow'].ok
+        assert snapshot.failed == ['Slow']
+        assert set(wallet._snapshot_providers) == {fast, slow}
+        providers = list(wallet._snapshot_providers.values())
+
+    assert not wallet._snapshot_providers
+    assert all(_get_transport_key(provider) not in _transport_users for provider in providers)
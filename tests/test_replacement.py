@@ -0,0 +1,79 @@
+import pytest
+from hexbytes import HexBytes
+from evm_wallet import AsyncWallet, ReplacementManager
+from tests.utils import serve_rpc, stub_tx_hash
+
+_PRIVATE_KEY = '0x' + '11' * 32
+_RECIPIENT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+
+
+def _serve(state: dict, broadcasts: list[str]) -> dict:
+    def send_raw_transaction(raw_tx: str) -> str:
+        broadcasts.append(raw_tx)
+        return stub_tx_hash(raw_tx)
+
+    rpc = serve_rpc({
+        'eth_getTransactionCount': lambda *args: hex(state['nonce']),
+        'eth_gasPrice': hex(1_000),
+        'eth_maxPriorityFeePerGas': hex(100),
+        'eth_sendRawTransaction': send_raw_transaction
+    })
+    return {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+def _tx_params(wallet: AsyncWallet, **fees) -> dict:
+    return {
+        'from': wallet.public_key, 'to': _RECIPIENT, 'value': 1, 'gas': 21_000, 'nonce': wallet.nonce, 'chainId': 1,
+        **fees
+    }
+
+
+@pytest.mark.asyncio
+async def test_speed_up_bumps_fees():
+    broadcasts = []
+
+    async with AsyncWallet(_PRIVATE_KEY, _serve({'nonce': 5}, broadcasts)) as wallet:
+        manager = ReplacementManager(max_gas_price=2_500)
+        legacy = await manager.transact(wallet, _tx_params(wallet, gasPrice=2_000))
+        await manager.speed_up(wallet, legacy.nonce)
+        assert legacy.tx_params['gasPrice'] == 2_250 and legacy.replacements == 1 and len(legacy.hashes) == 2
+
+        dynamic = manager.track(wallet, _tx_params(wallet, maxFeePerGas=2_000), HexBytes(b'\x01' * 32))
+        await manager.speed_up(wallet, dynamic.nonce)
+        assert (dynamic.tx_params['maxPriorityFeePerGas'], dynamic.tx_params['maxFeePerGas']) == (113, 2_250)
+
+        with pytest.raises(ValueError):
+            await manager.speed_up(wallet, dynamic.nonce)
+
+        assert len(broadcasts) == 3 and wallet.nonce == 6
+
+
+@pytest.mark.asyncio
+async def test_cancel_sends_zero_value_transfer_to_itself():
+    async with AsyncWallet(_PRIVATE_KEY, _serve({'nonce': 5}, [])) as wallet:
+        manager = ReplacementManager()
+        pending = await manager.transact(wallet, _tx_params(wallet, maxFeePerGas=2_000, maxPriorityFeePerGas=200))
+        await manager.cancel(wallet, pending.nonce)
+
+        tx_params = pending.tx_params
+        assert (tx_params['to'], tx_params['value'], tx_params['gas'], tx_params['nonce']) == (wallet.public_key, 0,
+                                                                                               21_000, 5)
+        assert (tx_params['maxPriorityFeePerGas'], tx_params['maxFeePerGas']) == (225, 2_250)
+        assert len(pending.hashes) == 2
+
+
+@pytest.mark.asyncio
+async def test_check_replaces_stuck_and_drops_mined_transactions():
+    state = {'nonce': 5}
+
+    async with AsyncWallet(_PRIVATE_KEY, _serve(state, [])) as wallet:
+        manager = ReplacementManager(timeout=0, max_replacements=1)
+        pending = await manager.transact(wallet, _tx_params(wallet, gasPrice=1_000))
+
+        await manager.check()
+        await manager.check()
+        assert pending.replacements == 1 and pending.tx_params['gasPrice'] == 1_125 and not pending.mined.done()
+
+        state['nonce'] = 6
+        await manager.check()
+        assert pending.mined.done() and not manager.pending
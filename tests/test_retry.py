@@ -0,0 +1,90 @@
+import pytest
+import requests
+from eth_utils import keccak
+from web3 import Web3
+from web3.providers import HTTPProvider
+from evm_wallet.retry import RetryPolicy, CircuitOpenError, is_transient_error
+from evm_wallet._rpc import batch_request, get_result
+from tests.utils import RPCError, serve_rpc
+
+ADDRESS = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+
+
+def _make_middleware(policy: RetryPolicy, responses: list):
+    calls = []
+
+    def make_request(method, params):
+        calls.append(method)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return policy.middleware(make_request, Web3(HTTPProvider('http://127.0.0.1:1'))), calls
+
+
+def test_retries_transient_reads():
+    policy = RetryPolicy(base_delay=0)
+    middleware, calls = _make_middleware(policy, [
+        requests.ConnectionError(),
+        {'id': 1, 'error': {'code': -32000, 'message': 'header not found'}},
+        {'id': 1, 'result': '0x1'}
+    ])
+    assert middleware('eth_getBalance', []) == {'id': 1, 'result': '0x1'}
+    assert len(calls) == 3
+
+    middleware, calls = _make_middleware(policy, [{'id': 1, 'error': {'code': 3, 'message': 'execution reverted'}}])
+    assert 'error' in middleware('eth_call', [])
+    assert len(calls) == 1
+
+
+def test_transient_errors():
+    assert is_transient_error(requests.Timeout()) and is_transient_error(CircuitOpenError('http://node', 1.0))
+    assert is_transient_error(ValueError({'code': -32000, 'message': 'header not found'}))
+    assert not is_transient_error(ValueError({'code': -32000, 'message': 'insufficient funds'}))
+    assert not is_transient_error(ValueError('Invalid address'))
+
+
+def test_rebroadcast_already_known():
+    raw = '0x' + '01' * 32
+    middleware, calls = _make_middleware(RetryPolicy(base_delay=0), [
+        requests.Timeout(),
+        {'id': 1, 'error': {'code': -32000, 'message': 'already known'}}
+    ])
+    assert middleware('eth_sendRawTransaction', [raw])['result'] == '0x' + keccak(hexstr=raw).hex()
+
+    middleware, calls = _make_middleware(RetryPolicy(base_delay=0), [
+        requests.Timeout(),
+        {'id': 1, 'error': {'code': -32000, 'message': 'nonce too low'}}
+    ])
+    assert middleware('eth_sendRawTransaction', [raw])['error']['message'] == 'nonce too low'
+
+
+def test_circuit_breaker():
+    policy = RetryPolicy(base_delay=0, max_attempts=1, failure_threshold=2)
+    middleware, calls = _make_middleware(policy, [requests.ConnectionError()] * 2)
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            middleware('eth_blockNumber', [])
+
+    with pytest.raises(CircuitOpenError):
+        middleware('eth_blockNumber', [])
+    assert len(calls) == 2
+
+
+def test_batch_retries_only_failed_calls():
+    failures = [RPCError('header not found')]
+
+    def get_balance(*params):
+        if failures:
+            raise failures.pop()
+        return '0x10'
+
+    calls = []
+    provider = Web3(HTTPProvider(serve_rpc({'eth_getBalance': get_balance}, calls=calls)))
+    RetryPolicy(base_delay=0).install(provider)
+
+    responses = batch_request(provider, [('eth_chainId', []), ('eth_getBalance', [ADDRESS, 'latest'])])
+    assert [get_result(response) for response in responses] == ['0x1', '0x10']
+    assert [method for method, _ in calls] == ['eth_chainId', 'eth_getBalance', 'eth_getBalance']
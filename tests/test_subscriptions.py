@@ -0,0 +1,146 @@
+import json
+import asyncio
+import threading
+import pytest
+import websockets
+from evm_wallet import AsyncWallet
+from tests.utils import ZERO_ADDRESS, STUB_RESULTS, stub_receipt
+
+_PRIVATE_KEY = '0x' + '11' * 32
+_RECIPIENT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+_TX_HASH = '0x' + 'ab' * 32
+_SUBSCRIPTION = '0x' + 'cd' * 16
+
+
+class _WebsocketNode:
+    """
+    Local WebSocket stand-in of a node, serving requests and pushing newHeads notifications to subscribers. It runs in
+    its own event loop, since wallets validate the chain id with blocking requests on creation
+    """
+
+    def __init__(self):
+        self.gas_price = 100
+        self.mined = False
+        self.receipt_errors = 0
+        self.subscribed = threading.Event()
+        self.subscriptions = 0
+        self._connections = set()
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+
+    def __enter__(self) -> str:
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._server = self._call(self._serve()).result()
+        return f'ws://127.0.0.1:{self._server.sockets[0].getsockname()[1]}'
+
+    def __exit__(self, *args) -> None:
+        self._server.close()
+        self._call(self._server.wait_closed()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def wait_subscribed(self) -> None:
+        assert await asyncio.to_thread(self.subscribed.wait, 5)
+
+    async def push_head(self, number: int) -> None:
+        await asyncio.wrap_future(self._call(self._push_head(number)))
+
+    async def disconnect(self) -> None:
+        self.subscribed.clear()
+        await asyncio.wrap_future(self._call(self._disconnect()))
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _serve(self):
+        return await websockets.serve(self._handle, '127.0.0.1', 0)
+
+    async def _push_head(self, number: int) -> None:
+        header = {
+            'number': hex(number), 'hash': '0x' + f'{number:064x}', 'parentHash': '0x' + f'{number - 1:064x}',
+            'timestamp': hex(number), 'miner': ZERO_ADDRESS, 'gasLimit': hex(30_000_000), 'gasUsed': '0x0'
+        }
+        message = json.dumps({
+            'jsonrpc': '2.0', 'method': 'eth_subscription',
+            'params': {'subscription': _SUBSCRIPTION, 'result': header}
+        })
+        for connection in list(self._connections):
+            await connection.send(message)
+
+    async def _disconnect(self) -> None:
+        for connection in list(self._connections):
+            await connection.close()
+
+    def _respond(self, method: str, params: list):
+        if method == 'eth_subscribe':
+            self.subscriptions += 1
+            return _SUBSCRIPTION
+        elif method == 'eth_gasPrice':
+            return hex(self.gas_price)
+        elif method == 'eth_getTransactionReceipt':
+            return stub_receipt(params[0]) if self.mined else None
+
+        return STUB_RESULTS.get(method)
+
+    async def _handle(self, connection) -> None:
+        try:
+            async for message in connection:
+                request = json.loads(message)
+                response = {'jsonrpc': '2.0', 'id': request['id']}
+                if request['method'] == 'eth_getTransactionReceipt' and self.receipt_errors:
+                    self.receipt_errors -= 1
+                    response['error'] = {'code': -32000, 'message': 'header not found'}
+                else:
+                    response['result'] = self._respond(request['method'], request.get('params', []))
+                await connection.send(json.dumps(response))
+
+                if request['method'] == 'eth_subscribe':
+                    self._connections.add(connection)
+                    self.subscribed.set()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(connection)
+
+
+async def _wait_until(condition, timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_head_watcher_follows_heads_and_reconnects():
+    node = _WebsocketNode()
+
+    with node as rpc:
+        network = {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+        async with AsyncWallet(_PRIVATE_KEY, network) as wallet:
+            tx_params = await wallet.build_tx_params(1, _RECIPIENT)
+            watcher = wallet.head_watcher
+            assert tx_params['gasPrice'] == 100 and watcher.running
+            await node.wait_subscribed()
+
+            node.gas_price = 200
+            await node.push_head(101)
+            await _wait_until(lambda: watcher.head == 101 and wallet._gas_price == 200)
+            assert (await wallet.build_tx_params(1, _RECIPIENT))['gasPrice'] == 200
+
+            receipt = asyncio.create_task(wallet.wait_for_receipt(_TX_HASH, timeout=5))
+            await _wait_until(lambda: wallet._receipt_waiters)
+            node.mined = True
+            node.receipt_errors = 1
+            await node.push_head(102)
+            await _wait_until(lambda: watcher.head == 102 and not node.receipt_errors)
+            assert not receipt.done()
+
+            await node.push_head(103)
+            assert (await receipt)['status'] == 1
+
+            node.gas_price = 300
+            await node.disconnect()
+            await node.wait_subscribed()
+            await node.push_head(104)
+            await _wait_until(lambda: watcher.head == 104 and wallet._gas_price == 300)
+            assert node.subscriptions == 2
+
+        assert not watcher.running and not wallet._receipt_waiters
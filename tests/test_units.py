@@ -0,0 +1,53 @@
+import numbers
+import pytest
+from decimal import Decimal
+from evm_wallet import ERC20Token, Wallet, from_base_units, to_base_units, to_base_units_many, from_base_units_many
+
+USDC = ERC20Token(address='0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48', symbol='USDC', decimals=6)
+
+
+def test_round_trip():
+    max_uint = 2 ** 256 - 1
+    assert to_base_units(from_base_units(max_uint)) == max_uint
+    assert to_base_units(0.1) == 10 ** 17
+    assert to_base_units('1.5', 6) == 1_500_000
+    assert from_base_units(1, 6) == Decimal('0.000001')
+
+    with pytest.raises(ValueError):
+        to_base_units('0.0000001', 6)
+
+
+def test_bulk():
+    amounts = [1, '2.5', Decimal('0.000001'), 0.3]
+    assert to_base_units_many(amounts, 6) == [1_000_000, 2_500_000, 1, 300_000]
+    assert USDC.from_base_units_many(USDC.to_base_units_many(amounts)) == [Decimal(str(a)) for a in amounts]
+    assert from_base_units_many(range(3), 0) == [0, 1, 2]
+
+
+class _Int64:
+    """Stand-in of numpy.int64, an integer scalar which is not int but is registered as numbers.Integral"""
+
+    def __init__(self, value: int):
+        self._value = value
+
+    def __int__(self) -> int:
+        return self._value
+
+    __index__ = __int__
+
+
+numbers.Integral.register(_Int64)
+
+
+def test_integer_scalars():
+    assert Wallet.from_base_units(_Int64(10 ** 18)) == Decimal(1)
+    assert Wallet.to_base_units(_Int64(2)) == 2 * 10 ** 18
+    assert Wallet.from_base_units([10 ** 18, 2 * 10 ** 18]) == [Decimal(1), Decimal(2)]
+
+
+def test_numpy_scalars():
+    numpy = pytest.importorskip('numpy')
+    assert Wallet.from_base_units(numpy.int64(10 ** 6), USDC) == Decimal(1)
+    assert Wallet.to_base_units(numpy.int64(3), USDC) == 3_000_000
+    assert Wallet.to_base_units(numpy.float64(0.1), USDC) == 100_000
+    assert Wallet.from_base_units(numpy.array([10 ** 6, 2 * 10 ** 6]), USDC) == [Decimal(1), Decimal(2)]
@@ -1,4 +1,17 @@
+import rlp
 import pytest
+from typing import Optional
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3.exceptions import ContractLogicError
+from evm_wallet import NonceJournal, Wallet
+from evm_wallet._rpc import _to_simulation_result
+from evm_wallet.types import ERC20Token
+from tests.utils import DropConnection, RPCError, serve_rpc, stub_tx_hash
+
+PRIVATE_KEY = '0x' + '11' * 32
+RECIPIENT = '0xe977Fa8D8AE7D3D6e28c17A868EF04bD301c583f'
+TOKEN = ERC20Token(address='0xdAC17F958D2ee523a2206206994597C13D831ec7', symbol='USDT', decimals=6)
 
 
 @pytest.fixture
@@ -9,3 +22,135 @@ def wallet(make_wallet):
 def test_get_balance(wallet):
     balance = wallet.get_balance()
     assert balance
+
+
+def _revert_data(selector: str, abi_type: str, value) -> str:
+    return selector + encode([abi_type], [value]).hex()
+
+
+def _serve_node(errors: dict[int, Exception], broadcasts: list[int], calls: Optional[list] = None) -> dict:
+    def send_raw_transaction(raw_tx: str) -> str:
+        nonce = int.from_bytes(rlp.decode(bytes.fromhex(raw_tx[2:]))[0], 'big')
+        broadcasts.append(nonce)
+        if nonce in errors:
+            raise errors[nonce]
+        return stub_tx_hash(raw_tx)
+
+    def call(tx_params: dict, *args) -> str:
+        selector = tx_params['data'][:10]
+        if selector == '0x95d89b41':
+            return '0x' + encode(['string'], [TOKEN.symbol]).hex()
+        elif selector == '0x313ce567':
+            return '0x' + encode(['uint8'], [TOKEN.decimals]).hex()
+        return '0x' + encode(['uint256'], [7]).hex()
+
+    rpc = serve_rpc({
+        'eth_getTransactionCount': '0x5',
+        'eth_getBalance': hex(10 ** 18),
+        'eth_call': call,
+        'eth_estimateGas': hex(50_000),
+        'eth_sendRawTransaction': send_raw_transaction
+    }, calls=calls)
+    return {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+
+def test_map_balances():
+    with Wallet(PRIVATE_KEY, _serve_node({}, [])) as wallet:
+        assert wallet.map_balances([RECIPIENT] * 3) == [10 ** 18] * 3
+        assert wallet.map_balances([RECIPIENT] * 2, TOKEN, convert=True) == [TOKEN.from_base_units(7)] * 2
+        assert wallet.get_tokens([TOKEN.address] * 2) == [TOKEN] * 2
+
+
+def test_simulation_result_decodes_reverts():
+    error_data = _revert_data('0x08c379a0', 'string', 'insufficient balance')
+    result = _to_simulation_result({'error': {'code': 3, 'message': 'execution reverted', 'data': error_data}})
+    assert not result.success and result.revert_reason == 'insufficient balance'
+    assert result.output == HexBytes(error_data)
+
+    panic_data = _revert_data('0x4e487b71', 'uint256', 0x11)
+    error = {'code': 3, 'message': 'execution reverted', 'data': {'data': panic_data}}
+    result = _to_simulation_result({'error': error})
+    assert not result.success and result.revert_reason == 'Panic(0x11)'
+
+    result = _to_simulation_result({'error': {'code': -32000, 'message': 'out of gas'}})
+    assert not result.success and result.revert_reason == 'out of gas'
+    assert _to_simulation_result({'result': '0x01'}).success
+
+
+def test_build_and_transact_simulates_without_placeholder_gas():
+    calls, broadcasts = [], []
+
+    with Wallet(PRIVATE_KEY, _serve_node({}, broadcasts, calls)) as wallet:
+        closure = wallet.provider.eth.contract(TOKEN.address, abi=wallet._get_erc20_abi()).functions.transfer(
+            RECIPIENT, 1
+        )
+        calls.clear()
+        wallet.build_and_transact(closure, simulate=True)
+
+        simulations = [params[0] for method, params in calls if method == 'eth_call']
+        assert len(simulations) == 1 and 'gas' not in simulations[0] and broadcasts == [5]
+
+        calls.clear()
+        wallet.build_and_transact(closure, gas=70_000, simulate=True)
+        simulations = [params[0] for method, params in calls if method == 'eth_call']
+        assert simulations[0]['gas'] == hex(70_000)
+
+
+def test_build_and_transact_raises_decoded_revert():
+    def call(*args) -> str:
+        raise RPCError('execution reverted', 3, _revert_data('0x08c379a0', 'string', 'transfer amount exceeds balance'))
+
+    rpc = serve_rpc({'eth_call': call, 'eth_estimateGas': hex(50_000)})
+    network = {'network': 'Stub', 'rpc': rpc, 'token': 'ETH', 'chain_id': 1, 'explorer': 'https://etherscan.io'}
+
+    with Wallet(PRIVATE_KEY, network) as wallet:
+        closure = wallet.provider.eth.contract(TOKEN.address, abi=wallet._get_erc20_abi()).functions.transfer(
+            RECIPIENT, 1
+        )
+        with pytest.raises(ContractLogicError, match='transfer amount exceeds balance'):
+            wallet.build_and_transact(closure, simulate=True)
+
+
+def test_transact_many_releases_rejected_nonces(tmp_path):
+    journal = NonceJournal(str(tmp_path / 'journal.sqlite3'))
+    errors = {
+        5: RPCError('already known'),
+        6: RPCError('insufficient funds for gas * price + value'),
+        7: RPCError('nonce too low'),
+        8: RPCError('insufficient funds for gas * price + value')
+    }
+
+    with Wallet(PRIVATE_KEY, _serve_node(errors, []), journal=journal) as wallet:
+        tx_params = wallet.build_tx_params(1, RECIPIENT, gas=21_000)
+        results = wallet.transact_many([tx_params] * 4)
+
+        assert [result.ok for result in results] == [True, False, False, False]
+        assert 'nonce too low' in results[2].error
+        assert wallet.nonce == 6
+        assert [entry.nonce for entry in journal.unconfirmed(1, wallet.public_key)] == [5]
+
+
+def test_transact_many_keeps_nonces_after_transient_errors(tmp_path):
+    journal = NonceJournal(str(tmp_path / 'journal.sqlite3'))
+    network = _serve_node({6: DropConnection()}, [])
+
+    with Wallet(PRIVATE_KEY, network, journal=journal, retry_policy=None) as wallet:
+        tx_params = wallet.build_tx_params(1, RECIPIENT, gas=21_000)
+        results = wallet.transact_many([tx_params] * 2)
+
+        assert [result.ok for result in results] == [True, False]
+        assert wallet.nonce == 7
+        assert [entry.nonce for entry in journal.unconfirmed(1, wallet.public_key)] == [5, 6]
+
+
+def test_transfer_many():
+    broadcasts = []
+
+    with Wallet(PRIVATE_KEY, _serve_node({}, broadcasts)) as wallet:
+        results = wallet.transfer_many(TOKEN, [(RECIPIENT, 1), (RECIPIENT, 2), (RECIPIENT, 3)])
+
+        assert all(result.ok for result in results) and [result.index for result in results] == [0, 1, 2]
+        assert sorted(broadcasts) == [5, 6, 7] and wallet.nonce == 8
+
+        with pytest.raises(ValueError):
+            wallet.transfer_many(TOKEN, [('0x1234', 1)])
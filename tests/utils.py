@@ -1,4 +1,19 @@
+import json
+import time
+import threading
 from functools import wraps
+from typing import Any, Callable, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from eth_utils import keccak
+
+ZERO_ADDRESS = '0x' + '00' * 20
+
+STUB_RESULTS = {
+    'eth_chainId': '0x1',
+    'eth_blockNumber': '0x64',
+    'eth_getTransactionCount': '0x0',
+    'eth_gasPrice': '0x64'
+}
 
 
 def validate_status(func):
@@ -11,3 +26,88 @@ def validate_status(func):
         assert status
 
     return wrapper
+
+
+class RPCError(Exception):
+    def __init__(self, message: str, code: int = -32000, data: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.data = data
+
+
+class DropConnection(Exception):
+    pass
+
+
+def serve_rpc(
+        results: Optional[dict[str, Any | Callable[..., Any]]] = None,
+        delay: float = 0.0,
+        status: int = 200,
+        calls: Optional[list[tuple[str, list]]] = None
+) -> str:
+    """
+    Starts local JSON-RPC stand-in of a node in a daemon thread. Batch requests are supported
+    :param results: Results per method, merged with STUB_RESULTS. A callable is called with params of the request and
+    can raise RPCError to respond with an error or DropConnection to close the connection without a response
+    :param delay: Seconds to wait before every response
+    :param status: HTTP status of responses
+    :param calls: List, to which method and params of every request are appended
+    :return: URL of the stand-in
+    """
+    results = {**STUB_RESULTS, **(results or {})}
+
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self, request: dict) -> dict:
+            method, params = request['method'], request.get('params', [])
+            if calls is not None:
+                calls.append((method, params))
+
+            response = {'jsonrpc': '2.0', 'id': request['id']}
+            result = results.get(method)
+            try:
+                response['result'] = result(*params) if callable(result) else result
+            except RPCError as e:
+                response['error'] = {'code': e.code, 'message': e.message}
+                if e.data is not None:
+                    response['error']['data'] = e.data
+
+            return response
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(delay)
+
+            try:
+                responses = [self.respond(request) for request in body] if isinstance(body, list) else self.respond(body)
+            except DropConnection:
+                self.close_connection = True
+                return
+
+            data = json.dumps(responses).encode()
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def stub_tx_hash(raw_tx: str) -> str:
+    return '0x' + keccak(hexstr=raw_tx).hex()
+
+
+def stub_receipt(tx_hash: str, block_number: int = 101, status: int = 1) -> dict:
+    return {
+        'transactionHash': tx_hash, 'status': hex(status), 'blockNumber': hex(block_number),
+        'blockHash': '0x' + '00' * 32, 'transactionIndex': '0x0', 'logs': [], 'gasUsed': '0x5208',
+        'cumulativeGasUsed': '0x5208', 'from': ZERO_ADDRESS, 'to': ZERO_ADDRESS, 'contractAddress': None,
+        'logsBloom': '0x' + '00' * 256, 'effectiveGasPrice': '0x64', 'type': '0x0'
+    }